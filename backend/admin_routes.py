@@ -0,0 +1,147 @@
+import os
+import hmac
+from flask import Blueprint, request, jsonify
+
+
+def configured_admin_token():
+    """
+    Token the /admin routes require
+
+    Read on every request so a token from .env (loaded after the imports) is honoured.
+
+    Returns:
+        str: ADMIN_TOKEN, or an empty string when admin routes are disabled
+    """
+    return os.environ.get('ADMIN_TOKEN', '').strip()
+
+
+def presented_admin_token():
+    """Token sent as "Authorization: Bearer <token>" or in the X-Admin-Token header"""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() == 'bearer' and token.strip():
+        return token.strip()
+    return request.headers.get('X-Admin-Token', '').strip()
+
+
+def json_body():
+    """
+    The request's JSON object
+
+    Returns:
+        dict: Parsed body, or None when the body is missing, not JSON or not an object
+    """
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
+
+
+def create_admin_blueprint(chatbot):
+    """
+    Admin routes for the past case corpus and the response cache
+
+    Every route requires ADMIN_TOKEN. Without a configured token the routes
+    answer 404, so an open CORS policy cannot expose them to other sites.
+
+    Args:
+        chatbot: LegalAnalysisChatbot serving the app
+
+    Returns:
+        Blueprint: Routes under /admin
+    """
+    admin = Blueprint('admin', __name__, url_prefix='/admin')
+
+    @admin.before_request
+    def require_admin_token():
+        # CORS preflights carry no credentials; flask-cors answers them
+        if request.method == 'OPTIONS':
+            return None
+        expected = configured_admin_token()
+        if not expected:
+            return jsonify({"status": "error", "message": "Not found"}), 404
+        if not hmac.compare_digest(presented_admin_token().encode('utf-8'), expected.encode('utf-8')):
+            return jsonify({"status": "error", "message": "Invalid or missing admin token"}), 401
+        return None
+
+    @admin.route('/cases', methods=['POST'])
+    def add_cases():
+        """
+        Flask route to ingest new past cases
+        """
+        data = json_body()
+        if data is None:
+            return jsonify({"status": "error", "message": "Request body must be a JSON object"}), 400
+        try:
+            cases = data.get('cases', [])
+            if not cases or not isinstance(cases, list) or not all(isinstance(case, dict) for case in cases):
+                return jsonify({
+                    "status": "error",
+                    "message": "Please provide a list of cases"
+                }), 400
+
+            case_ids = chatbot.add_past_cases(cases)
+            return jsonify({"status": "success", "ids": case_ids})
+
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        except Exception as e:
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    @admin.route('/cases', methods=['DELETE'])
+    def remove_cases():
+        """
+        Flask route to delete past cases by id
+        """
+        data = json_body()
+        if data is None:
+            return jsonify({"status": "error", "message": "Request body must be a JSON object"}), 400
+        try:
+            case_ids = data.get('ids', [])
+            if not case_ids or not isinstance(case_ids, list):
+                return jsonify({
+                    "status": "error",
+                    "message": "Please provide a list of case ids"
+                }), 400
+
+            result = chatbot.remove_past_cases(case_ids)
+            return jsonify(dict(result, status="success"))
+
+        except Exception as e:
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    @admin.route('/cases/compact', methods=['POST'])
+    def compact_cases():
+        """
+        Flask route to compact the past case stores
+        """
+        try:
+            result = chatbot.compact_past_cases()
+            return jsonify(dict(result, status="success"))
+        except Exception as e:
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    @admin.route('/response-cache', methods=['GET'])
+    def response_cache_stats():
+        """
+        Flask route exposing persistent response cache statistics
+        """
+        if chatbot.response_cache is None:
+            return jsonify({"status": "error", "message": "Response cache is disabled"}), 404
+        return jsonify(chatbot.response_cache.stats())
+
+    @admin.route('/response-cache', methods=['DELETE'])
+    def purge_response_cache():
+        """
+        Flask route to purge cached responses, optionally by kind or only expired ones
+        """
+        if chatbot.response_cache is None:
+            return jsonify({"status": "error", "message": "Response cache is disabled"}), 404
+        try:
+            data = request.get_json(silent=True) or {}
+            deleted = chatbot.response_cache.purge(
+                kind=data.get('kind'),
+                expired_only=bool(data.get('expired_only', False))
+            )
+            return jsonify({"status": "success", "deleted": deleted})
+        except Exception as e:
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    return admin
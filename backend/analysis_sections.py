@@ -0,0 +1,95 @@
+import os
+import json
+import uuid
+
+# Token budgets for the tiered mode: a fast core analysis, then sections on demand
+CORE_MAX_TOKENS = int(os.environ.get('CORE_ANALYSIS_MAX_TOKENS', 1024))
+SECTION_MAX_TOKENS = int(os.environ.get('SECTION_MAX_TOKENS', 2048))
+
+# How long an analysis id can be expanded after the core call
+ANALYSIS_TTL_SECONDS = float(os.environ.get('ANALYSIS_TTL_SECONDS', 6 * 3600))
+
+# Route name -> (key in the full analysis, instructions, JSON template)
+EXPANDABLE_SECTIONS = {
+    'guidance': (
+        'step_by_step_guidance',
+        """Provide a comprehensive legal strategy including:
+                1. Immediate actionable steps
+                2. Evidence collection strategy
+                3. Potential legal actions
+                4. Recommended documentation
+                5. Statute of limitations
+                6. Potential legal resources""",
+        """{
+                    "step_by_step_guidance": {
+                        "immediate_steps": ["..."],
+                        "evidence_collection": ["..."],
+                        "legal_actions": ["..."],
+                        "documentation": ["..."],
+                        "statute_of_limitations": "...",
+                        "legal_resources": ["..."]
+                    }
+                }"""
+    ),
+    'clauses': (
+        'legal_clauses',
+        """1. Identify specific legal statutes relevant to the case
+                2. Provide explanation of each applicable clause
+                3. Demonstrate direct relevance to the current case""",
+        """{
+                    "legal_clauses": {
+                        "statutes": [
+                            {
+                                "name": "...",
+                                "explanation": "...",
+                                "relevance": "..."
+                            }
+                        ]
+                    }
+                }"""
+    )
+}
+
+
+def new_analysis_id():
+    """Random id under which a tiered analysis and its expanded sections are kept"""
+    return uuid.uuid4().hex
+
+
+def section_messages(section, input_text, core_analysis):
+    """
+    Build the chat messages that expand one section of a tiered analysis
+
+    Args:
+        section (str): Key of EXPANDABLE_SECTIONS
+        input_text (str): Original case description
+        core_analysis (dict): Result of the core call
+
+    Returns:
+        list: System and user messages
+    """
+    key, instructions, template = EXPANDABLE_SECTIONS[section]
+    return [
+        {
+            "role": "system",
+            "content": f"""You are an advanced multilingual legal analysis AI assistant specializing in Indian law.
+                The case has already been categorised and its key details extracted.
+                {instructions}
+
+                ADDITIONAL REQUIREMENTS:
+                - If the input is in Hindi, respond in Hindi; otherwise, use English
+                - Respond professionally and precisely
+                - Use Indian legal context
+
+                OUTPUT JSON TEMPLATE:
+                {template}
+                """
+        },
+        {
+            "role": "user",
+            "content": (
+                f"Case description:\n{input_text}\n\n"
+                f"Existing analysis:\n{json.dumps(core_analysis, ensure_ascii=False, separators=(',', ':'))}"
+            )
+        }
+    ]
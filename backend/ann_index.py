@@ -0,0 +1,234 @@
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:  # Optional dependency, exact search is used without it
+    hnswlib = None
+
+# Retrieval backend: 'auto' uses HNSW for large corpora, 'exact' or 'hnsw' force one
+INDEX_BACKEND = os.environ.get('CASE_INDEX_BACKEND', 'auto')
+
+# Below this many cases brute force is both exact and fast enough
+MIN_ANN_ROWS = int(os.environ.get('CASE_INDEX_MIN_ROWS', 50000))
+
+# HNSW graph parameters: M and ef_construction trade build time/memory for recall,
+# ef_search trades query latency for recall
+HNSW_M = int(os.environ.get('CASE_INDEX_M', 16))
+HNSW_EF_CONSTRUCTION = int(os.environ.get('CASE_INDEX_EF_CONSTRUCTION', 200))
+HNSW_EF_SEARCH = int(os.environ.get('CASE_INDEX_EF_SEARCH', 64))
+
+
+def ann_available():
+    """Return True if an approximate-nearest-neighbour library is installed"""
+    return hnswlib is not None
+
+
+class ReadWriteLock:
+    def __init__(self):
+        """
+        Many readers or one writer; waiting writers block new readers so they are not starved
+
+        Not reentrant: a thread must not take the lock again while holding it.
+        """
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            while self._writing or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class HNSWIndex:
+    def __init__(self, dim, m=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION, ef_search=HNSW_EF_SEARCH):
+        """
+        CPU HNSW index over cosine similarity, backed by hnswlib
+
+        hnswlib does not make resize_index, set_ef or add_items safe to run
+        alongside knn_query, so searches hold the read side of a lock and
+        inserts, resizes and ef changes the write side. Searches only wait
+        for the insert of a batch, not for the whole ingest.
+
+        Args:
+            dim (int): Embedding dimension
+            m (int): Graph degree
+            ef_construction (int): Candidate list size while building
+            ef_search (int): Candidate list size while querying
+        """
+        if hnswlib is None:
+            raise ImportError("hnswlib is not installed; run `pip install hnswlib`")
+
+        self.dim = dim
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.index = hnswlib.Index(space='cosine', dim=dim)
+        self._lock = ReadWriteLock()
+
+    def __len__(self):
+        return self.index.get_current_count()
+
+    def build(self, matrix):
+        """
+        Build the graph from an embedding matrix; row numbers become labels
+
+        Args:
+            matrix (numpy.ndarray): Embedding matrix of shape (n, dim)
+        """
+        self.index.init_index(
+            max_elements=max(matrix.shape[0], 1),
+            ef_construction=self.ef_construction,
+            M=self.m
+        )
+        if matrix.shape[0]:
+            self.index.add_items(np.asarray(matrix, dtype=np.float32), np.arange(matrix.shape[0]))
+        self.set_ef(self.ef_search)
+
+    def add(self, matrix, start_label):
+        """
+        Insert rows into an existing graph, growing its capacity as needed
+
+        Args:
+            matrix (numpy.ndarray): Normalised rows to insert
+            start_label (int): Label (row number) of the first row
+        """
+        with self._lock.write():
+            needed = len(self) + matrix.shape[0]
+            if needed > self.index.get_max_elements():
+                self.index.resize_index(max(needed, 2 * self.index.get_max_elements()))
+            self.index.add_items(matrix, np.arange(start_label, start_label + matrix.shape[0]))
+
+    def save(self, path):
+        """
+        Atomically write the index to disk
+
+        Args:
+            path (str): Destination file
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.index.save_index(tmp_path)
+        os.replace(tmp_path, path)
+        print(f"Saved HNSW index: {path}")
+
+    def load(self, path, max_elements):
+        """
+        Load a previously saved index
+
+        Args:
+            path (str): Index file
+            max_elements (int): Capacity of the loaded index
+        """
+        self.index.load_index(path, max_elements=max_elements)
+        self.set_ef(self.ef_search)
+        print(f"Loaded HNSW index: {path}")
+
+    def set_ef(self, ef_search):
+        """
+        Change the query-time recall/latency knob
+
+        Args:
+            ef_search (int): Candidate list size; higher is slower but more accurate
+        """
+        with self._lock.write():
+            self.ef_search = ef_search
+            self.index.set_ef(ef_search)
+
+    def search(self, query, k):
+        """
+        Approximate top-k search
+
+        Args:
+            query (numpy.ndarray): Normalised query vector
+            k (int): Number of neighbours
+
+        Returns:
+            tuple: (row indices, cosine similarities), best first
+        """
+        k = min(k, len(self))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        # ef must be at least k for hnswlib to return k results; only ever raise it
+        # so concurrent queries never observe a smaller value
+        if self.ef_search < k:
+            with self._lock.write():
+                if self.ef_search < k:
+                    self.ef_search = k
+                    self.index.set_ef(k)
+        with self._lock.read():
+            labels, distances = self.index.knn_query(query.reshape(1, -1), k=k)
+
+        return labels[0].astype(np.int64), 1.0 - distances[0]
+
+
+def load_or_build_index(matrix, index_prefix=None, backend=INDEX_BACKEND, min_ann_rows=MIN_ANN_ROWS, **params):
+    """
+    Create the ANN index for a matrix, or None when exact search should be used
+
+    Args:
+        matrix (numpy.ndarray): Normalised embedding matrix
+        index_prefix (str, optional): Path prefix the index file is loaded from / saved to
+        backend (str): 'auto', 'exact' or 'hnsw'
+        min_ann_rows (int): Minimum corpus size for 'auto' to choose HNSW
+        **params: Extra HNSWIndex parameters (m, ef_construction, ef_search)
+
+    Returns:
+        HNSWIndex or None: Index to search, None for the exact fallback
+    """
+    if backend == 'exact':
+        return None
+    if backend == 'auto' and (matrix.shape[0] < min_ann_rows or not ann_available()):
+        return None
+
+    index = HNSWIndex(matrix.shape[1], **params)
+
+    # Graph parameters are part of the file name so changing them triggers a rebuild
+    index_path = None
+    if index_prefix:
+        index_path = f"{index_prefix}.hnsw-M{index.m}-efc{index.ef_construction}.bin"
+
+    if index_path and os.path.exists(index_path):
+        try:
+            index.load(index_path, max_elements=matrix.shape[0])
+            if len(index) == matrix.shape[0]:
+                return index
+            print(f"HNSW index has {len(index)} rows, expected {matrix.shape[0]}; rebuilding")
+            index = HNSWIndex(matrix.shape[1], **params)
+        except RuntimeError as e:
+            print(f"Error loading HNSW index: {e}")
+            index = HNSWIndex(matrix.shape[1], **params)
+
+    index.build(matrix)
+    if index_path:
+        index.save(index_path)
+    return index
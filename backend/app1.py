@@ -5,10 +5,15 @@ import sys
 import random
 from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
-from groq import Groq
 import speech_recognition as sr
 import langdetect
 from dotenv import load_dotenv
+from case_store import load_case_store
+from llm_metrics import METRICS, begin_request_summary, current_request_summary, parse_completion_json
+from llm_provider import LLM_MODEL, create_llm_client
+from resilient_llm import CircuitOpenError, ResilientLLM, degraded_response
+from retrieval import normalize_category, partition_by_category
+from parallel_calls import LLM_CALL_TIMEOUT_SECONDS, failed_sections, run_concurrently
 
 load_dotenv()
 maxInt = sys.maxsize
@@ -32,7 +37,10 @@ class ComprehensiveLegalAnalysisModel:
             api_key (str, optional): Groq API key. Defaults to environment variable.
         """
         self.api_key = os.environ.get('GROQ_API_KEY')
-        self.client = Groq(api_key=self.api_key)
+        self.client = create_llm_client(self.api_key)
+        
+        # Timeouts, retries, optional hedging and a circuit breaker around every completion
+        self.llm = ResilientLLM(self.client)
         
         # Predefined case categories
         self.case_categories = [
@@ -45,43 +53,49 @@ class ComprehensiveLegalAnalysisModel:
             "Immigration"
         ]
         
-        # Load past legal cases dataset
+        # Load past legal cases dataset and index rows by category
+        self.past_cases_path = os.path.join(os.path.dirname(__file__), 'train.csv')
         self.past_cases = self.load_past_cases()
+        self.category_partitions = partition_by_category(
+            case.get('category', '') for case in self.past_cases
+        )
     
     def load_past_cases(self):
         """
-        Load past legal cases from CSV
+        Load past legal cases from the columnar case store
+        
+        Only the id, category and outcome columns are held in memory; the other
+        columns are read lazily per case. train.csv is converted into the store
+        on first use (or after it changes).
         
         Returns:
-            list: List of past legal cases
+            Sequence: Past legal cases
         """
         try:
-            past_cases_path = os.path.join(os.path.dirname(__file__), 'train.csv')
-            with open(past_cases_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                print('Dataset loaded')
-                return list(reader)
+            cases = load_case_store(self.past_cases_path)
+            print(f'Dataset loaded: {len(cases)} cases')
+            return cases
         except Exception as e:
             print(f"Error loading past cases: {e}")
             return []
     
-    def find_similar_cases(self, case_category, key_details):
+    def find_similar_cases(self, case_category, key_details, k=3):
         """
         Find similar past legal cases
         
         Args:
             case_category (str): Case category
             key_details (dict): Key details of the current case
+            k (int): Maximum number of cases to return
         
         Returns:
             list: List of similar past cases
         """
-        similar_cases = [
-            case for case in self.past_cases 
-            if case.get('category', '').lower() == case_category.lower()
-        ]
+        # Look up the category partition built at load time instead of scanning every case
+        rows = self.category_partitions.get(normalize_category(case_category), [])
         
-        return random.sample(similar_cases, min(3, len(similar_cases)))
+        # Sample within the category, as before partitioning; these models have no embeddings to rank by
+        return [self.past_cases[row] for row in random.sample(rows, min(k, len(rows)))]
     
     def calculate_risk_probability(self, similar_cases, key_details):
         """
@@ -139,15 +153,17 @@ class ComprehensiveLegalAnalysisModel:
         ]
         
         try:
-            completion = self.client.chat.completions.create(
-                model="deepseek-r1-distill-llama-70b",
+            completion = self.llm.create(
+                metrics_kind='step_by_step_guidance',
+                model=LLM_MODEL,
                 messages=messages,
                 response_format={"type": "json_object"},
                 temperature=0.6,
-                max_tokens=4096
+                max_tokens=4096,
+                timeout=LLM_CALL_TIMEOUT_SECONDS
             )
             
-            return json.loads(completion.choices[0].message.content)
+            return parse_completion_json(completion.choices[0].message.content, 'step_by_step_guidance', LLM_MODEL)
         
         except Exception as e:
             return {"error": str(e)}
@@ -180,15 +196,17 @@ class ComprehensiveLegalAnalysisModel:
         ]
         
         try:
-            completion = self.client.chat.completions.create(
-                model="deepseek-r1-distill-llama-70b",
+            completion = self.llm.create(
+                metrics_kind='legal_clauses',
+                model=LLM_MODEL,
                 messages=messages,
                 response_format={"type": "json_object"},
                 temperature=0.6,
-                max_tokens=4096
+                max_tokens=4096,
+                timeout=LLM_CALL_TIMEOUT_SECONDS
             )
             
-            return json.loads(completion.choices[0].message.content)
+            return parse_completion_json(completion.choices[0].message.content, 'legal_clauses', LLM_MODEL)
         
         except Exception as e:
             return {"error": str(e)}
@@ -250,8 +268,9 @@ class ComprehensiveLegalAnalysisModel:
         
         try:
             # Create completion using Groq's DeepSeek model
-            completion = self.client.chat.completions.create(
-                model="deepseek-r1-distill-llama-70b",
+            completion = self.llm.create(
+                metrics_kind='understand_case',
+                model=LLM_MODEL,
                 messages=messages,
                 response_format={"type": "json_object"},
                 temperature=0.6,
@@ -264,7 +283,7 @@ class ComprehensiveLegalAnalysisModel:
             response_text = completion.choices[0].message.content
             
             # Parse the JSON response
-            result = json.loads(response_text)
+            result = parse_completion_json(response_text, 'understand_case', LLM_MODEL)
 
             if result['status'] == 'success':
                 case_details = result['analysis']
@@ -282,11 +301,17 @@ class ComprehensiveLegalAnalysisModel:
                 )
                 result['risk_assessment'] = risk_assessment
                 
-                # Step-by-step guidance
-                result['step_by_step_guidance'] = self.generate_step_by_step_guidance(case_details)
+                # Step-by-step guidance and legal clauses only depend on the analysis,
+                # so request them concurrently and keep whichever sections complete
+                sections = run_concurrently({
+                    'step_by_step_guidance': lambda: self.generate_step_by_step_guidance(case_details),
+                    'legal_clauses': lambda: self.retrieve_legal_clauses(case_details)
+                })
+                result.update(sections)
                 
-                # Legal clause retrieval
-                result['legal_clauses'] = self.retrieve_legal_clauses(case_details)
+                incomplete = failed_sections(sections)
+                if incomplete:
+                    result['incomplete_sections'] = incomplete
             
             return result
             
@@ -296,6 +321,8 @@ class ComprehensiveLegalAnalysisModel:
                 "analysis": result
             }
         
+        except CircuitOpenError as e:
+            return degraded_response(e)
         except Exception as e:
             return {
                 "status": "error",
@@ -327,8 +354,9 @@ class ComprehensiveLegalAnalysisModel:
         
         try:
             # Create streaming completion
-            completion = self.client.chat.completions.create(
-                model="deepseek-r1-distill-llama-70b",
+            completion = self.llm.create(
+                metrics_kind='stream_case_understanding',
+                model=LLM_MODEL,
                 messages=messages,
                 temperature=0.6,
                 max_tokens=4096,
@@ -351,6 +379,33 @@ CORS(app)
 # Initialize the model
 case_understanding_model = ComprehensiveLegalAnalysisModel()
 
+@app.before_request
+def start_llm_summary():
+    """
+    Collect the LLM calls made while serving each request
+    """
+    begin_request_summary()
+
+@app.after_request
+def attach_llm_summary(response):
+    """
+    Report the request's LLM calls, tokens and time in response headers
+    """
+    summary = current_request_summary()
+    if summary is not None and summary.calls:
+        totals = summary.as_dict()
+        response.headers['X-LLM-Summary'] = summary.header_value()
+        response.headers['Server-Timing'] = f"llm;dur={round(totals['llm_seconds'] * 1000)}"
+        print(f"{request.method} {request.path} LLM usage: {summary.header_value()}")
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Flask route exposing LLM call latency, token and failure metrics in Prometheus text format
+    """
+    return Response(METRICS.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/understand_case', methods=['POST'])
 def understand_case():
     """
@@ -393,8 +448,11 @@ def stream_case_understanding():
     case_text = request.json['text']
     
     def generate():
+        summary = begin_request_summary()
         for chunk in case_understanding_model.stream_case_understanding(case_text):
             yield f"data: {json.dumps({'chunk': chunk})}\n\n"
+        # Headers are sent before the body, so streamed LLM usage goes out as a final event
+        yield f"event: llm_summary\ndata: {json.dumps(summary.as_dict())}\n\n"
     
     return Response(generate(), mimetype='text/event-stream')
 
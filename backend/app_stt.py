@@ -1,19 +1,55 @@
 import os
 import json
-from flask import Flask, request, jsonify
+import copy
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
-from groq import Groq
 import csv
 import sys
+import threading
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import speech_recognition as sr
 import langdetect
 import io
 import tempfile
 import subprocess
+from collections import Counter
 from dotenv import load_dotenv
+from admin_routes import create_admin_blueprint
+from analysis_sections import (
+    ANALYSIS_TTL_SECONDS,
+    CORE_MAX_TOKENS,
+    EXPANDABLE_SECTIONS,
+    SECTION_MAX_TOKENS,
+    new_analysis_id,
+    section_messages
+)
+from audio_transcoding import (
+    SAMPLE_RATE,
+    SAMPLE_WIDTH,
+    TRANSCODE_IN_MEMORY,
+    TRANSCODE_TIMEOUT_SECONDS,
+    transcode_to_wav_buffer
+)
+from case_ingest import CaseIngestor, build_case_retriever, store_version
+from case_store import load_case_store
+from context_compaction import compact_context
+from embedding_batcher import EmbeddingBatcher
+from embedding_store import EmbeddingStore, compose_case_text
+from language_recognition import MultiLanguageRecognizer
+from lexical_index import text_values
+from llm_metrics import METRICS, begin_request_summary, current_request_summary, parse_completion_json
+from llm_provider import LLM_MODEL, create_llm_client
+from offline_stt import OfflineTranscriber
+from resilient_llm import CircuitOpenError, ResilientLLM, degraded_response
+from response_cache import RESPONSE_CACHE_ENABLED, ResponseCache, response_cache_key
+from retrieval import normalize_rows
+from semantic_cache import SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_FLAG, SemanticCache, shareable_analysis
+from single_flight import SingleFlight
+from streaming import JsonSectionParser, format_sse_event
+from transcoder import TranscoderBusyError, get_transcoder, probe_ffmpeg
+from ttl_cache import TTLCache, text_cache_key
+from vad_segmentation import SEGMENT_MIN_RECORDING_SECONDS, split_on_silence, transcribe_segments
 
 load_dotenv()
 
@@ -35,9 +71,25 @@ class LegalAnalysisChatbot:
         """
         Initialize the Legal Analysis Chatbot
         """
-        # Groq client initialization
+        # LLM client initialization (Groq unless LLM_PROVIDER says otherwise)
         self.api_key = os.environ.get('GROQ_API_KEY')
-        self.client = Groq(api_key=self.api_key)
+        self.client = create_llm_client(self.api_key)
+        
+        # Timeouts, retries, optional hedging and a circuit breaker around every completion
+        self.llm = ResilientLLM(self.client)
+        
+        # Model and sampling parameters shared by every completion
+        self.llm_model = LLM_MODEL
+        self.llm_params = {
+            "response_format": {"type": "json_object"},
+            "temperature": 0.6,
+            "max_tokens": 4096,
+            "top_p": 0.95,
+            "stream": False
+        }
+        
+        # Parsed responses persisted across restarts, keyed by input, model, parameters and prompt
+        self.response_cache = ResponseCache() if RESPONSE_CACHE_ENABLED else None
         
         # Case categories
         self.case_categories = [
@@ -51,46 +103,76 @@ class LegalAnalysisChatbot:
         ]
         
         # Initialize embedding model
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedding_model_name = 'all-MiniLM-L6-v2'
+        self.embedding_model = SentenceTransformer(self.embedding_model_name)
+        self.embedding_store = EmbeddingStore(self.embedding_model_name)
+        
+        # Query embeddings from concurrent requests are encoded together in micro-batches
+        self.query_encoder = EmbeddingBatcher(self.embedding_model.encode)
+        
+        # Repeated queries skip the transformer and the similarity scan
+        self.embedding_cache = TTLCache()
+        self.similar_cases_cache = TTLCache()
+        
+        # Analyses of earlier descriptions, matched by embedding similarity
+        self.semantic_cache = SemanticCache() if SEMANTIC_CACHE_ENABLED else None
+        
+        # Tiered analyses by id, with the sections expanded on demand
+        self.tiered_analyses = TTLCache(ttl_seconds=ANALYSIS_TTL_SECONDS)
+        
+        # Identical analyses requested concurrently share one completion
+        self.in_flight_analyses = SingleFlight()
         
         # Conversation state
         self.current_case_analysis = None
+        self.past_cases_path = os.path.join(os.path.dirname(__file__), 'train.csv')
         self.past_cases = self.load_past_cases()
         self.case_embeddings = self.generate_case_embeddings()
+        self.case_retriever = build_case_retriever(self, self.case_embeddings)
+        
+        # Held only while the past cases and their retriever are swapped together
+        self.case_swap_lock = threading.Lock()
+        self.case_ingestor = CaseIngestor(self)
 
     def generate_case_embeddings(self):
         """
         Generate embeddings for past cases
         
+        The matrix is persisted by the embedding store and only re-encoded when
+        the dataset, the embedding model or the text recipe changes. It covers
+        the cases written by the last conversion or compaction; cases ingested
+        since then are added by build_case_retriever.
+        
         Returns:
             numpy.ndarray: Embedding matrix for past cases
         """
-        # Combine relevant case details into a single text representation
-        case_texts = []
-        for case in self.past_cases:
-            # Combine key case details into a single text
-            case_text = " ".join([
-                str(case.get('category', '')),
-                str(case.get('description', '')),
-                str(case.get('key_details', '')),
-                str(case.get('outcome', ''))
-            ])
-            case_texts.append(case_text)
+        base_rows = getattr(self.past_cases, 'base_rows', len(self.past_cases))
+        
+        def encode_past_cases():
+            # Combine key case details into a single text per case
+            case_texts = [compose_case_text(self.past_cases[row]) for row in range(base_rows)]
+            return normalize_rows(self.embedding_model.encode(case_texts))
         
-        # Generate embeddings
-        embeddings = self.embedding_model.encode(case_texts)
-        return embeddings
+        return self.embedding_store.load_or_build(
+            self.past_cases_path,
+            encode_past_cases,
+            expected_rows=base_rows,
+            version=store_version(self.past_cases)
+        )
     
-    def find_similar_cases(self, case_category, key_details):
+    def find_similar_cases(self, case_category, key_details, k=3, threshold=0.5):
         """
         Find similar past legal cases using embedding similarity
         
         Args:
             case_category (str): Case category
             key_details (dict): Key details of the current case
+            k (int): Maximum number of similar cases to return
+            threshold (float): Minimum cosine similarity for a match (cases found
+                lexically must instead reach BM25_RELATIVE_MIN_SCORE of the best lexical hit)
         
         Returns:
-            list: List of similar past cases with similarity scores
+            list: List of similar past cases, most similar first
         """
         # Prepare the current case text for embedding
         current_case_text = " ".join([
@@ -98,62 +180,127 @@ class LegalAnalysisChatbot:
             json.dumps(key_details)
         ])
         
-        # Generate embedding for the current case
-        current_case_embedding = self.embedding_model.encode([current_case_text])
+        # Identical queries (retries, re-sends, double submits) are answered from the cache
+        results_key = text_cache_key(current_case_text, k, threshold)
+        cached_cases = self.similar_cases_cache.get(results_key)
+        if cached_cases is not None:
+            return list(cached_cases)
         
-        # Calculate cosine similarities
-        similarities = cosine_similarity(current_case_embedding, self.case_embeddings)[0]
+        # Generate embedding for the current case (cached, and batched with concurrent requests)
+        current_case_embedding = self.embedding_cache.get_or_compute(
+            text_cache_key(current_case_text),
+            lambda: self.query_encoder.encode(current_case_text)
+        )
         
-        # Create a list of cases with their similarity scores
-        scored_cases = [
-            {
-                'case': case, 
-                'similarity_score': score
-            } 
-            for case, score in zip(self.past_cases, similarities)
-        ]
+        # Take a consistent view of the cases and their index (compaction swaps both)
+        with self.case_swap_lock:
+            past_cases, case_retriever = self.past_cases, self.case_retriever
         
-        # Sort cases by similarity score in descending order
-        sorted_cases = sorted(
-            scored_cases, 
-            key=lambda x: x['similarity_score'], 
-            reverse=True
+        # Score the cases of the same category (or all cases if the category is unknown)
+        # with one matrix-vector product and keep the top k
+        # Statute names and section numbers are also matched lexically (BM25) on the
+        # values of the key details (not their field names)
+        matches = case_retriever.search(
+            current_case_embedding,
+            category=case_category,
+            k=k,
+            threshold=threshold,
+            query_text=" ".join([case_category, text_values(key_details)])
         )
         
-        # Filter and return top 3 similar cases
-        filtered_cases = [
-            case['case'] for case in sorted_cases 
-            if case['similarity_score'] > 0.5  # Adjust threshold as needed
-        ][:3]
+        similar_cases = [past_cases[row] for row, score in matches]
+        self.similar_cases_cache.put(results_key, similar_cases)
+        
+        return list(similar_cases)
+    
+    def add_past_cases(self, cases):
+        """
+        Add new past cases without re-encoding the existing ones
+        
+        Args:
+            cases (list): Case dicts with category, description, key_details and outcome
+        
+        Returns:
+            list: Ids assigned to the new cases
+        """
+        return self.case_ingestor.add_cases(cases)
+    
+    def remove_past_cases(self, case_ids):
+        """
+        Delete past cases by id (tombstoned until the next compaction)
+        
+        Args:
+            case_ids (list): Ids of the cases to delete
         
-        return filtered_cases
+        Returns:
+            dict: Deleted ids and ids that were not found
+        """
+        return self.case_ingestor.remove_cases(case_ids)
+    
+    def compact_past_cases(self):
+        """
+        Rewrite the case and embedding stores without deleted cases
+        
+        Returns:
+            dict: Row counts before and after compaction
+        """
+        return self.case_ingestor.compact()
     
     def load_past_cases(self):
         """
-        Load past legal cases from CSV with additional preprocessing
+        Load past legal cases from the columnar case store
+        
+        Only the id, category and outcome columns are held in memory; the other
+        columns are read lazily per case. train.csv is converted into the store
+        on first use (or after it changes).
         
         Returns:
-            list: List of past legal cases
+            Sequence: Past legal cases
         """
         try:
-            past_cases_path = os.path.join(os.path.dirname(__file__), 'train.csv')
-            with open(past_cases_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                cases = list(reader)
-                
-                # Preprocess cases
-                for case in cases:
-                    # Ensure all cases have a consistent structure
-                    case['description'] = case.get('description', '')
-                    case['key_details'] = case.get('key_details', '')
-                    case['outcome'] = case.get('outcome', '')
-                
-                print(f'Dataset loaded: {len(cases)} cases')
-                return cases
+            cases = load_case_store(self.past_cases_path)
+            print(f'Dataset loaded: {len(cases)} cases')
+            return cases
         except Exception as e:
             print(f"Error loading past cases: {e}")
             return []
 
+    def complete_json(self, kind, input_text, messages, **param_overrides):
+        """
+        Run a JSON chat completion, serving repeated requests from the response cache
+        
+        Args:
+            kind (str): Kind of request, part of the cache key
+            input_text (str): User input the messages were built from
+            messages (list): Chat messages, starting with the system prompt
+            **param_overrides: Sampling parameters replacing the defaults (e.g. max_tokens)
+        
+        Returns:
+            dict: Parsed JSON response
+        """
+        params = dict(self.llm_params, **param_overrides)
+        key = None
+        if self.response_cache is not None:
+            key = response_cache_key(kind, input_text, self.llm_model, params, messages[0]['content'])
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        # Create completion using Groq's DeepSeek model
+        completion = self.llm.create(
+            metrics_kind=kind,
+            model=self.llm_model,
+            messages=messages,
+            **params
+        )
+        
+        # Extract and parse the response
+        result = parse_completion_json(completion.choices[0].message.content, kind, self.llm_model)
+        
+        if key is not None:
+            self.response_cache.put(key, kind, self.llm_model, result)
+        return result
+
     def process_follow_up_question(self, input_text, previous_case_context):
         """
         Process follow-up questions with context awareness
@@ -165,6 +312,11 @@ class LegalAnalysisChatbot:
         Returns:
             dict: Contextual response or additional analysis
         """
+        # Only the parts of the analysis relevant to the question are sent, within a token budget
+        context_text, context_stats = compact_context(previous_case_context, input_text)
+        print(f"Follow-up context: {context_stats['original_tokens']} -> {context_stats['compact_tokens']} "
+              f"tokens (saved {context_stats['tokens_saved']}), fields {context_stats['fields']}")
+        
         # Prepare system message with context
         messages = [
             {
@@ -174,7 +326,7 @@ class LegalAnalysisChatbot:
                 related to {previous_case_context.get('case_category', 'a legal matter')}.
 
                 PREVIOUS CASE CONTEXT:
-                {json.dumps(previous_case_context, indent=2)}
+                {context_text}
 
                 Your task is to:
                 1. Understand the follow-up question
@@ -191,45 +343,26 @@ class LegalAnalysisChatbot:
         ]
         
         try:
-            # Create completion using Groq's DeepSeek model
-            completion = self.client.chat.completions.create(
-                model="deepseek-r1-distill-llama-70b",
-                messages=messages,
-                response_format={"type": "json_object"},
-                temperature=0.6,
-                max_tokens=4096,
-                top_p=0.95,
-                stream=False
-            )
-            
-            # Extract and parse the response
-            response_text = completion.choices[0].message.content
-            result = json.loads(response_text)
-            
-            return result
+            return self.complete_json('follow_up', input_text, messages)
         
+        except CircuitOpenError as e:
+            return degraded_response(e)
         except Exception as e:
             return {
                 "status": "error",
                 "message": str(e)
             }
 
-    def understand_case(self, input_text, previous_case_context=None):
+    def build_case_messages(self, input_text):
         """
-        Analyze the case details with optional context preservation
+        Build the chat messages for a full case analysis
         
         Args:
             input_text (str): User-provided case description
-            previous_case_context (dict, optional): Context from previous analysis
         
         Returns:
-            dict: Comprehensive case understanding
+            list: System and user messages
         """
-        # If previous context exists and input seems like a follow-up question
-        if previous_case_context and self.is_follow_up_question(input_text):
-            return self.process_follow_up_question(input_text, previous_case_context)
-        
-        # Standard case analysis logic (previous implementation)
         # Prepare system message with categories
         categories_str = ', '.join(self.case_categories)
 
@@ -313,33 +446,287 @@ class LegalAnalysisChatbot:
             }
         ]
         
+        return messages
+
+    def lookup_semantic_cache(self, input_text, messages):
+        """
+        Find an earlier analysis of a differently worded but similar description
+        
+        Args:
+            input_text (str): User-provided case description
+            messages (list): Messages built for the description
+        
+        Returns:
+            tuple: (cached analysis or None, description embedding, cache scope);
+                the embedding and scope are None when the semantic cache is disabled
+        """
+        if self.semantic_cache is None:
+            return None, None, None
+        
+        description_embedding = self.embedding_cache.get_or_compute(
+            text_cache_key(input_text),
+            lambda: self.query_encoder.encode(input_text)
+        )
+        scope = response_cache_key('understand_case', '', self.llm_model, self.llm_params, messages[0]['content'])
+        match = self.semantic_cache.lookup(description_embedding, scope)
+        if match is None:
+            return None, description_embedding, scope
+        
+        result, similarity = match
+        # The cached entry has no description of its own; restate this user's
+        if isinstance(result.get('key_details'), dict):
+            result['key_details'].setdefault('description', input_text)
+        if SEMANTIC_CACHE_FLAG:
+            result['cached'] = True
+            result['cache_similarity'] = round(similarity, 4)
+        return result, description_embedding, scope
+
+    def build_core_messages(self, input_text):
+        """
+        Build the chat messages for the core of a tiered analysis
+        
+        Only the fields most users read are requested, so the completion fits a
+        small token budget; guidance and legal clauses are expanded separately.
+        
+        Args:
+            input_text (str): User-provided case description
+        
+        Returns:
+            list: System and user messages
+        """
+        categories_str = ', '.join(self.case_categories)
+        
+        return [
+            {
+                "role": "system",
+                "content": f"""You are an advanced multilingual legal analysis AI assistant specializing in Indian law.
+                Identify the precise case category from: {categories_str}
+                Extract critical key details from the case description, give a brief
+                preliminary risk assessment and the recommended next steps.
+
+                ADDITIONAL REQUIREMENTS:
+                - If the input is in Hindi, respond in Hindi; otherwise, use English
+                - Respond professionally and precisely
+                - Use Indian legal context
+                - Keep every field brief
+
+                OUTPUT JSON TEMPLATE:
+                {{
+                    "case_category": "...",
+                    "input_language": "...",
+                    "key_details": {{
+                        "description": "...",
+                        "primary_issues": ["..."],
+                        "potential_violations": ["..."]
+                    }},
+                    "preliminary_risk_assessment": {{
+                        "complexity": "...",
+                        "potential_impact": "..."
+                    }},
+                    "recommended_next_steps": ["..."]
+                }}
+                """
+            },
+            {
+                "role": "user",
+                "content": f"Analyze this legal case description:\n{input_text}"
+            }
+        ]
+
+    def analyze_core(self, input_text):
+        """
+        Fast first tier of an analysis: category, key details and next steps
+        
+        Args:
+            input_text (str): User-provided case description
+        
+        Returns:
+            dict: Core analysis with an analysis_id for expanding the other sections
+        """
         try:
-            # Create completion using Groq's DeepSeek model
-            completion = self.client.chat.completions.create(
-                model="deepseek-r1-distill-llama-70b",
-                messages=messages,
-                response_format={"type": "json_object"},
-                temperature=0.6,
-                max_tokens=4096,
-                top_p=0.95,
-                stream=False
+            result = self.complete_json(
+                'understand_case_core',
+                input_text,
+                self.build_core_messages(input_text),
+                max_tokens=CORE_MAX_TOKENS
             )
+        except CircuitOpenError as e:
+            return degraded_response(e)
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": str(e)
+            }
+        
+        analysis_id = new_analysis_id()
+        self.tiered_analyses.put(analysis_id, {"input_text": input_text, "analysis": dict(result)})
+        self.current_case_analysis = result
+        
+        result['analysis_id'] = analysis_id
+        result['expandable_sections'] = sorted(EXPANDABLE_SECTIONS)
+        return result
+
+    def expand_analysis(self, analysis_id, section, input_text=None, core_analysis=None):
+        """
+        Generate (or return the cached) guidance or legal clauses of a tiered analysis
+        
+        Args:
+            analysis_id (str): Id returned by analyze_core
+            section (str): 'guidance' or 'clauses'
+            input_text (str, optional): Case description, used if the id has expired
+            core_analysis (dict, optional): Core analysis, used if the id has expired
+        
+        Returns:
+            dict: The requested section
+        
+        Raises:
+            KeyError: If the analysis id is unknown and no fallback was given
+        """
+        section_key = f"{analysis_id}:{section}"
+        cached_section = self.tiered_analyses.get(section_key)
+        if cached_section is not None:
+            return cached_section
+        
+        entry = self.tiered_analyses.get(analysis_id)
+        if entry is None:
+            if not input_text or not core_analysis:
+                raise KeyError(analysis_id)
+            entry = {"input_text": input_text, "analysis": core_analysis}
+            self.tiered_analyses.put(analysis_id, entry)
+        
+        key = EXPANDABLE_SECTIONS[section][0]
+        result = self.complete_json(
+            f"expand_{section}",
+            entry['input_text'],
+            section_messages(section, entry['input_text'], entry['analysis']),
+            max_tokens=SECTION_MAX_TOKENS
+        )
+        expanded = {key: result.get(key, result)}
+        self.tiered_analyses.put(section_key, expanded)
+        return expanded
+
+    def understand_case(self, input_text, previous_case_context=None):
+        """
+        Analyze the case details with optional context preservation
+        
+        Concurrent calls with the same input (double submits, webhook retries)
+        are coalesced so only one upstream request is made.
+        
+        Args:
+            input_text (str): User-provided case description
+            previous_case_context (dict, optional): Context from previous analysis
+        
+        Returns:
+            dict: Comprehensive case understanding
+        """
+        key = text_cache_key(
+            'understand_case',
+            input_text,
+            json.dumps(previous_case_context, sort_keys=True) if previous_case_context else ''
+        )
+        result, shared = self.in_flight_analyses.do(
+            key,
+            lambda: self._understand_case(input_text, previous_case_context)
+        )
+        # Every waiter gets its own copy of the shared result
+        return copy.deepcopy(result) if shared else result
+
+    def _understand_case(self, input_text, previous_case_context=None):
+        # If previous context exists and input seems like a follow-up question
+        if previous_case_context and self.is_follow_up_question(input_text):
+            return self.process_follow_up_question(input_text, previous_case_context)
+        
+        # Standard case analysis logic (previous implementation)
+        messages = self.build_case_messages(input_text)
+        
+        try:
+            # An identical description is answered without embedding it
+            key = response_cache_key('understand_case', input_text, self.llm_model, self.llm_params, messages[0]['content'])
+            cached = self.response_cache.get(key) if self.response_cache is not None else None
+            if cached is None:
+                # Differently worded descriptions of an already analysed case reuse its analysis
+                cached, description_embedding, scope = self.lookup_semantic_cache(input_text, messages)
+            if cached is not None:
+                self.current_case_analysis = cached
+                return cached
             
-            # Extract and parse the response
-            response_text = completion.choices[0].message.content
-            result = json.loads(response_text)
+            result = self.complete_json('understand_case', input_text, messages)
+            if self.semantic_cache is not None:
+                self.semantic_cache.add(description_embedding, shareable_analysis(result), scope)
             
             # Store current case analysis
             self.current_case_analysis = result
             
             return result
         
+        except CircuitOpenError as e:
+            return degraded_response(e)
         except Exception as e:
             return {
                 "status": "error",
                 "message": str(e)
             }
 
+    def stream_case_analysis(self, input_text):
+        """
+        Analyze a case, yielding each top-level section as soon as the model has written it
+        
+        Args:
+            input_text (str): User-provided case description
+        
+        Yields:
+            tuple: (event name, data) for every completed section, followed by
+                ('done', full analysis) or ('error', error dict)
+        """
+        messages = self.build_case_messages(input_text)
+        key = response_cache_key('understand_case', input_text, self.llm_model, self.llm_params, messages[0]['content'])
+        
+        # Cached analyses are replayed section by section
+        cached = self.response_cache.get(key) if self.response_cache is not None else None
+        description_embedding, scope = None, None
+        if cached is None:
+            cached, description_embedding, scope = self.lookup_semantic_cache(input_text, messages)
+        if cached is not None:
+            for section, value in cached.items():
+                yield section, value
+            self.current_case_analysis = cached
+            yield 'done', cached
+            return
+        
+        try:
+            stream = self.llm.create(
+                metrics_kind='understand_case_stream',
+                model=self.llm_model,
+                messages=messages,
+                **dict(self.llm_params, stream=True)
+            )
+            
+            parser = JsonSectionParser()
+            response_text = []
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    response_text.append(delta)
+                    for section, value in parser.feed(delta):
+                        yield section, value
+            
+            result = parse_completion_json(''.join(response_text), 'understand_case_stream', self.llm_model)
+        
+        except CircuitOpenError as e:
+            yield 'error', degraded_response(e)
+            return
+        except Exception as e:
+            yield 'error', {"status": "error", "message": str(e)}
+            return
+        
+        if self.response_cache is not None:
+            self.response_cache.put(key, 'understand_case', self.llm_model, result)
+        if self.semantic_cache is not None:
+            self.semantic_cache.add(description_embedding, shareable_analysis(result), scope)
+        
+        self.current_case_analysis = result
+        yield 'done', result
+
     def is_follow_up_question(self, input_text):
         """
         Determine if the input is likely a follow-up question
@@ -368,11 +755,54 @@ class LegalAnalysisChatbot:
         # Check if any follow-up indicator is in the input
         return any(indicator in lower_input for indicator in follow_up_indicators)
 
+# Local CPU recognition in worker processes (disabled unless OFFLINE_STT_ENGINE is set).
+# Started before the chatbot loads its models and starts its threads, so the workers
+# are forked from a single-threaded process.
+offline_transcriber = OfflineTranscriber()
+if offline_transcriber.start():
+    print(f"Offline speech recognition ready ({offline_transcriber.engine}, {offline_transcriber.workers} workers)")
+
 # Global chatbot instance
 chatbot = LegalAnalysisChatbot()
 
+# Case corpus and response cache administration, only served when ADMIN_TOKEN is set
+app.register_blueprint(create_admin_blueprint(chatbot))
+
 recognizer = sr.Recognizer()
 
+# Engines tried in order by transcribe_audio_file: google, offline (Vosk/Whisper on CPU), sphinx
+TRANSCRIPTION_METHODS = [
+    name.strip() for name in os.environ.get('TRANSCRIPTION_METHODS', 'google,offline,sphinx').split(',') if name.strip()
+]
+
+# Tries each recording in en-IN, hi-IN and en-US (concurrently unless RECOGNITION_CONCURRENT=0)
+language_recognizer = MultiLanguageRecognizer()
+
+def recognize_google_candidate(audio, language):
+    """
+    Google Speech Recognition for one language
+    
+    Args:
+        audio (sr.AudioData): Recorded audio
+        language (str): Language code, e.g. 'hi-IN'
+    
+    Returns:
+        tuple: (transcript or None, confidence or None)
+    """
+    # show_all returns [] when nothing was recognised, otherwise alternatives with a confidence
+    result = recognizer.recognize_google(audio, language=language, show_all=True)
+    if not result or not result.get('alternative'):
+        return None, None
+    best = result['alternative'][0]
+    return best.get('transcript'), best.get('confidence')
+
+# Probe ffmpeg once at startup instead of on every conversion
+ffmpeg_capabilities = probe_ffmpeg()
+if ffmpeg_capabilities["available"]:
+    print(f"FFmpeg {ffmpeg_capabilities['version']} (decoders: {', '.join(ffmpeg_capabilities['decoders'])})")
+else:
+    print("FFmpeg not found; audio uploads cannot be converted")
+
 def save_uploaded_file(uploaded_file):
     """
     Safely save uploaded file to a temporary location
@@ -421,13 +851,8 @@ def convert_audio_to_wav(input_path):
     output_path = os.path.join(temp_dir, output_filename)
     
     try:
-        # Check if FFmpeg is available
-        try:
-            subprocess.run(['ffmpeg', '-version'], 
-                           stdout=subprocess.PIPE, 
-                           stderr=subprocess.PIPE, 
-                           check=True)
-        except (subprocess.CalledProcessError, FileNotFoundError):
+        # FFmpeg availability is probed once at startup
+        if not ffmpeg_capabilities["available"]:
             raise ValueError("FFmpeg is not installed or not in system PATH")
         
         # Use FFmpeg to convert audio to WAV
@@ -441,13 +866,10 @@ def convert_audio_to_wav(input_path):
             output_path
         ]
         
-        # Run conversion with detailed error handling
-        result = subprocess.run(
-            conversion_cmd, 
-            capture_output=True, 
-            text=True, 
-            check=True
-        )
+        # Run conversion on the bounded transcoder pool with detailed error handling
+        result = get_transcoder().run(conversion_cmd, timeout=TRANSCODE_TIMEOUT_SECONDS, text=True)
+        if result.returncode != 0:
+            raise subprocess.CalledProcessError(result.returncode, conversion_cmd, result.stdout, result.stderr)
         
         # Verify output file exists
         if not os.path.exists(output_path):
@@ -464,13 +886,53 @@ def convert_audio_to_wav(input_path):
         print(f"Unexpected conversion error: {e}")
         raise
 
+def open_uploaded_audio(uploaded_file):
+    """
+    16 kHz mono WAV of an upload, transcoded in memory when possible
+    
+    The upload is piped through ffmpeg and the PCM wrapped in a BytesIO, so
+    no temp files are written. If that fails (or TRANSCODE_IN_MEMORY=0) the
+    upload goes through save_uploaded_file and convert_audio_to_wav instead.
+    
+    Args:
+        uploaded_file (FileStorage): Uploaded file from Flask request
+    
+    Returns:
+        tuple: (WAV path or file object for sr.AudioFile, temp paths to remove)
+    """
+    if TRANSCODE_IN_MEMORY:
+        data = uploaded_file.read()
+        try:
+            return transcode_to_wav_buffer(data), []
+        except ValueError as e:
+            print(f"In-memory transcoding failed ({e}); falling back to temp files")
+            uploaded_file.stream.seek(0)
+    
+    temp_audio_path = save_uploaded_file(uploaded_file)
+    try:
+        converted_audio_path = convert_audio_to_wav(temp_audio_path)
+    except Exception:
+        os.unlink(temp_audio_path)
+        raise
+    return converted_audio_path, [temp_audio_path, converted_audio_path]
+
+def remove_temp_files(paths):
+    """
+    Remove temp files left by the file-based conversion
+    """
+    for path in paths:
+        try:
+            if path and os.path.exists(path):
+                os.unlink(path)
+        except Exception as cleanup_error:
+            print(f"Error during cleanup: {cleanup_error}")
+
 @app.route('/transcribe', methods=['POST'])
 def transcribe_audio():
     """
     Robust route to handle audio transcription with conversion
     """
-    temp_audio_path = None
-    converted_audio_path = None
+    temp_paths = []
     
     try:
         # Check if audio file is present in the request
@@ -483,70 +945,44 @@ def transcribe_audio():
         # Get the audio file
         audio_file = request.files['audio']
         
-        # Save uploaded file to a temporary location
-        temp_audio_path = save_uploaded_file(audio_file)
-        
         try:
-            # Convert audio to WAV
-            converted_audio_path = convert_audio_to_wav(temp_audio_path)
+            # Convert audio to 16 kHz mono WAV (in memory unless that fails)
+            audio_source, temp_paths = open_uploaded_audio(audio_file)
             
             # Attempt transcription
-            with sr.AudioFile(converted_audio_path) as source:
-                # Adjust for ambient noise
-                recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                
-                # Record the audio
-                audio = recognizer.record(source)
-                
-                # Try multiple language options
-                language_options = ['en-IN', 'hi-IN', 'en-US']
-                transcription = None
-                
-                for lang in language_options:
-                    try:
-                        transcription = recognizer.recognize_google(audio, language=lang)
-                        if transcription and transcription.strip():
-                            break
-                    except sr.UnknownValueError:
-                        continue
-                    except sr.RequestError as e:
-                        print(f"Request error for {lang}: {e}")
-                        break
-                
-                # Clean up temporary files
-                try:
-                    if temp_audio_path and os.path.exists(temp_audio_path):
-                        os.unlink(temp_audio_path)
-                    if converted_audio_path and os.path.exists(converted_audio_path):
-                        os.unlink(converted_audio_path)
-                except Exception as cleanup_error:
-                    print(f"Error during cleanup: {cleanup_error}")
-                
-                if not transcription:
-                    return jsonify({
-                        "status": "error",
-                        "message": "Could not transcribe audio in any language"
-                    }), 400
-                
+            audio = record_audio(audio_source)
+            
+            # Try each configured engine (Google tries multiple language options);
+            # long recordings are split at silences and the chunks transcribed in parallel
+            try:
+                transcription, language = transcribe_segmented_audio(audio)
+            except ValueError:
                 return jsonify({
-                    "status": "success",
-                    "transcription": transcription
-                })
+                    "status": "error",
+                    "message": "Could not transcribe audio in any language"
+                }), 400
+            
+            return jsonify({
+                "status": "success",
+                "transcription": transcription,
+                "language": language
+            })
+        
+        except TranscoderBusyError as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 503, {'Retry-After': str(round(e.retry_after))}
         
         except Exception as e:
-            # Clean up temporary files in case of error
-            try:
-                if temp_audio_path and os.path.exists(temp_audio_path):
-                    os.unlink(temp_audio_path)
-                if converted_audio_path and os.path.exists(converted_audio_path):
-                    os.unlink(converted_audio_path)
-            except Exception as cleanup_error:
-                print(f"Error during error cleanup: {cleanup_error}")
-            
             return jsonify({
                 "status": "error", 
                 "message": f"Transcription failed: {str(e)}"
             }), 500
+        
+        finally:
+            # Clean up temporary files (only the file-based fallback creates any)
+            remove_temp_files(temp_paths)
     
     except Exception as e:
         return jsonify({
@@ -554,68 +990,205 @@ def transcribe_audio():
             "message": f"Server error: {str(e)}"
         }), 500
     
-def transcribe_audio_file(audio_path):
+def record_audio(audio_source):
     """
-    Attempt transcription using multiple methods
+    Record a WAV file into AudioData after calibrating for ambient noise
     
     Args:
-        audio_path (str): Path to the audio file
+        audio_source: WAV path or file object
     
     Returns:
-        str: Transcribed text
+        sr.AudioData: Recorded audio
     """
-    transcription_methods = [
-        google_transcription,
-        sphinx_transcription
-    ]
+    if hasattr(audio_source, 'seek'):
+        audio_source.seek(0)
+    with sr.AudioFile(audio_source) as source:
+        # Adjust for ambient noise
+        recognizer.adjust_for_ambient_noise(source, duration=0.5)
+        
+        # Record the audio
+        return recognizer.record(source)
+
+def transcribe_recorded_audio(audio):
+    """
+    Attempt transcription of recorded audio with the TRANSCRIPTION_METHODS in order
+    
+    Args:
+        audio (sr.AudioData): Recorded audio
+    
+    Returns:
+        tuple: (transcribed text, language code)
+    """
+    transcription_methods = {
+        'google': google_transcription,
+        'offline': offline_transcription,
+        'sphinx': sphinx_transcription
+    }
     
     # Try each transcription method
-    for method in transcription_methods:
+    for name in TRANSCRIPTION_METHODS:
+        method = transcription_methods.get(name)
+        if method is None:
+            print(f"Unknown transcription method: {name}")
+            continue
         try:
-            transcription = method(audio_path)
+            transcription, language = method(audio)
             if transcription and len(transcription.strip()) > 0:
-                return transcription
+                return transcription, language
         except Exception as e:
             print(f"Transcription method {method.__name__} failed: {e}")
     
     raise ValueError("All transcription methods failed")
 
-def google_transcription(audio_path):
+def transcribe_segmented_audio(audio):
+    """
+    Transcribe a recording, splitting long ones at silences into chunks transcribed in parallel
+    
+    A recording is split into at most SEGMENT_WORKERS chunks, which all run at
+    once; the recognition pool has a thread for every language of every chunk.
+    A recording Google answers (or times out on) therefore takes at most
+    RECOGNITION_TIMEOUT_SECONDS, plus the offline and Sphinx fallbacks of any
+    chunk Google fails on. Concurrent recordings share the recognition pool.
+    
+    Args:
+        audio (sr.AudioData): Recorded audio
+    
+    Returns:
+        tuple: (transcribed text, language code of most chunks)
+    """
+    pcm = audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=SAMPLE_WIDTH)
+    if len(pcm) < SEGMENT_MIN_RECORDING_SECONDS * SAMPLE_RATE * SAMPLE_WIDTH:
+        return transcribe_recorded_audio(audio)
+    
+    segments = split_on_silence(pcm, SAMPLE_RATE)
+    if len(segments) <= 1:
+        return transcribe_recorded_audio(audio)
+    
+    print(f"Transcribing {len(pcm) / (SAMPLE_RATE * SAMPLE_WIDTH):.0f}s recording as {len(segments)} segments")
+    results = transcribe_segments(
+        pcm,
+        segments,
+        lambda chunk: transcribe_recorded_audio(sr.AudioData(chunk, SAMPLE_RATE, SAMPLE_WIDTH))
+    )
+    
+    # Stitch the chunks back in order; a chunk that failed only loses its own words
+    transcribed = [result for result in results if result is not None]
+    if not transcribed:
+        raise ValueError("All transcription methods failed")
+    transcription = ' '.join(text.strip() for text, _ in transcribed)
+    language = Counter(language for _, language in transcribed).most_common(1)[0][0]
+    return transcription, language
+
+def transcribe_audio_file(audio_path):
+    """
+    Attempt transcription using multiple methods
+    
+    Args:
+        audio_path (str): Path to the audio file
+    
+    Returns:
+        str: Transcribed text
+    """
+    transcription, _ = transcribe_segmented_audio(record_audio(audio_path))
+    return transcription
+
+def google_transcription(audio):
     """
     Transcribe audio using Google Speech Recognition
     """
-    with sr.AudioFile(audio_path) as source:
-        # Adjust for ambient noise
-        recognizer.adjust_for_ambient_noise(source, duration=0.5)
-        
-        # Record the audio
-        audio = recognizer.record(source)
-        
-        # Attempt transcription with multiple language options
-        language_options = ['en-IN', 'hi-IN', 'en-US']
-        
-        for lang in language_options:
-            try:
-                return recognizer.recognize_google(audio, language=lang)
-            except sr.UnknownValueError:
-                continue
-            except sr.RequestError:
-                break
+    # Attempt transcription with multiple language options
+    transcription, language = language_recognizer.recognize(
+        recognize_google_candidate,
+        audio,
+        fatal_errors=(sr.RequestError,)
+    )
+    if transcription:
+        return transcription, language
     
     raise ValueError("Google transcription failed")
 
-def sphinx_transcription(audio_path):
+def offline_transcription(audio):
+    """
+    Transcribe audio with the local Vosk or Whisper engine (no network round-trip)
+    """
+    pcm = audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=SAMPLE_WIDTH)
+    return offline_transcriber.transcribe_pcm(pcm, SAMPLE_RATE)
+
+def sphinx_transcription(audio):
     """
     Transcribe audio using CMU Sphinx (offline method)
     """
-    with sr.AudioFile(audio_path) as source:
-        # Adjust for ambient noise
-        recognizer.adjust_for_ambient_noise(source, duration=0.5)
-        
-        # Record the audio
-        audio = recognizer.record(source)
-        
-        return recognizer.recognize_sphinx(audio)
+    return recognizer.recognize_sphinx(audio), 'en-US'
+
+@app.route('/stats/embeddings', methods=['GET'])
+def embedding_stats():
+    """
+    Flask route exposing query-embedding batch metrics
+    """
+    return jsonify(chatbot.query_encoder.stats())
+
+@app.route('/stats/transcoder', methods=['GET'])
+def transcoder_stats():
+    """
+    Flask route exposing ffmpeg capabilities and transcoder pool load
+    """
+    return jsonify({
+        "ffmpeg": ffmpeg_capabilities,
+        "pool": get_transcoder().stats()
+    })
+
+@app.route('/stats/recognition', methods=['GET'])
+def recognition_stats():
+    """
+    Flask route exposing per-language recognition latency and outcome counters
+    """
+    return jsonify(dict(language_recognizer.stats(), offline=offline_transcriber.stats()))
+
+@app.route('/stats/llm', methods=['GET'])
+def llm_stats():
+    """
+    Flask route exposing LLM retry, hedging and circuit breaker counters
+    """
+    return jsonify(chatbot.llm.stats())
+
+@app.before_request
+def start_llm_summary():
+    """
+    Collect the LLM calls made while serving each request
+    """
+    begin_request_summary()
+
+@app.after_request
+def attach_llm_summary(response):
+    """
+    Report the request's LLM calls, tokens and time in response headers
+    """
+    summary = current_request_summary()
+    if summary is not None and summary.calls:
+        totals = summary.as_dict()
+        response.headers['X-LLM-Summary'] = summary.header_value()
+        response.headers['Server-Timing'] = f"llm;dur={round(totals['llm_seconds'] * 1000)}"
+        print(f"{request.method} {request.path} LLM usage: {summary.header_value()}")
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Flask route exposing LLM call latency, token and failure metrics in Prometheus text format
+    """
+    return Response(METRICS.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/stats/cache', methods=['GET'])
+def cache_stats():
+    """
+    Flask route exposing query cache hit and miss counters
+    """
+    return jsonify({
+        "query_embeddings": chatbot.embedding_cache.stats(),
+        "similar_cases": chatbot.similar_cases_cache.stats(),
+        "semantic_answers": chatbot.semantic_cache.stats() if chatbot.semantic_cache is not None else None,
+        "in_flight_analyses": chatbot.in_flight_analyses.stats()
+    })
 
 @app.route('/analyze', methods=['POST', 'GET'])
 def analyze_case():
@@ -656,5 +1229,94 @@ def analyze_case():
             "message": str(e)
         }), 500
 
+@app.route('/analyze/core', methods=['POST'])
+def analyze_case_core():
+    """
+    Flask route for the fast first tier of an analysis
+    """
+    try:
+        data = request.json or {}
+        input_text = data.get('case_description', '')
+        if not input_text:
+            return jsonify({
+                "status": "error",
+                "message": "Please provide a case description"
+            }), 400
+        
+        return jsonify(chatbot.analyze_core(input_text))
+    
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/analysis/<analysis_id>/<section>', methods=['GET', 'POST'])
+def expand_analysis_section(analysis_id, section):
+    """
+    Flask route generating guidance or legal clauses for a tiered analysis on demand
+    """
+    if section not in EXPANDABLE_SECTIONS:
+        return jsonify({
+            "status": "error",
+            "message": f"Unknown section, expected one of {sorted(EXPANDABLE_SECTIONS)}"
+        }), 404
+    try:
+        # Clients may resend the description and core analysis in case the id has expired
+        data = request.get_json(silent=True) or {}
+        result = chatbot.expand_analysis(
+            analysis_id,
+            section,
+            input_text=data.get('case_description'),
+            core_analysis=data.get('analysis')
+        )
+        return jsonify(dict(result, analysis_id=analysis_id))
+    
+    except KeyError:
+        return jsonify({
+            "status": "error",
+            "message": "Unknown or expired analysis id"
+        }), 404
+    except CircuitOpenError as e:
+        return jsonify(degraded_response(e)), 503
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_case_stream():
+    """
+    Flask route streaming the analysis as server-sent events, one per completed section
+    """
+    data = request.json or {}
+    input_text = data.get('case_description', '')
+    previous_case_context = data.get('previous_case_context', None)
+    
+    # Parse previous case context if it's a string
+    if isinstance(previous_case_context, str):
+        try:
+            previous_case_context = json.loads(previous_case_context)
+        except json.JSONDecodeError:
+            previous_case_context = None
+    
+    if not input_text:
+        return jsonify({
+            "status": "error",
+            "message": "Please provide a case description"
+        }), 400
+    
+    def generate():
+        # Headers are sent before the body, so streamed LLM usage goes out as a final event
+        summary = begin_request_summary()
+        # Follow-up answers are short, so they are sent as a single event
+        if previous_case_context and chatbot.is_follow_up_question(input_text):
+            yield format_sse_event('done', chatbot.process_follow_up_question(input_text, previous_case_context))
+        else:
+            for event, payload in chatbot.stream_case_analysis(input_text):
+                yield format_sse_event(event, payload)
+        yield format_sse_event('llm_summary', summary.as_dict())
+    
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,103 @@
+import io
+import os
+import wave
+import subprocess
+from transcoder import get_transcoder, probe_ffmpeg
+
+# Pipe uploads through ffmpeg in memory instead of temp files (falls back to files on failure)
+TRANSCODE_IN_MEMORY = os.environ.get('TRANSCODE_IN_MEMORY', '1') == '1'
+
+# Seconds a single ffmpeg conversion may take
+TRANSCODE_TIMEOUT_SECONDS = float(os.environ.get('TRANSCODE_TIMEOUT_SECONDS', 60))
+
+# Format expected by the speech recognizers: 16 kHz, 16-bit, mono
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+CHANNELS = 1
+
+
+def pcm_command(sample_rate=SAMPLE_RATE):
+    """ffmpeg arguments reading any container from stdin and writing raw s16le PCM to stdout"""
+    return [
+        'ffmpeg',
+        '-hide_banner',
+        '-loglevel', 'error',
+        '-i', 'pipe:0',
+        '-vn',
+        '-acodec', 'pcm_s16le',
+        '-ar', str(sample_rate),
+        '-ac', str(CHANNELS),
+        '-f', 's16le',
+        'pipe:1'
+    ]
+
+
+def transcode_to_pcm(data, timeout=TRANSCODE_TIMEOUT_SECONDS, transcoder=None):
+    """
+    Decode an uploaded recording to 16 kHz mono PCM without touching the disk
+
+    Containers that need seeking (e.g. MP4 with the index at the end) cannot
+    be read from a pipe; those raise ValueError so the caller can fall back
+    to the temp-file conversion.
+
+    Args:
+        data (bytes): Uploaded audio in any container ffmpeg understands
+        timeout (float): Seconds the conversion may take
+        transcoder (Transcoder, optional): Pool to run ffmpeg on; defaults to the shared one
+
+    Returns:
+        bytes: Raw signed 16-bit little-endian PCM
+
+    Raises:
+        ValueError: If ffmpeg is missing, fails or produces no audio
+        TranscoderBusyError: If the transcoder pool is saturated
+    """
+    if not probe_ffmpeg()["available"]:
+        raise ValueError("FFmpeg is not installed or not in system PATH")
+    try:
+        result = (transcoder or get_transcoder()).run(pcm_command(), input=data, timeout=timeout)
+    except FileNotFoundError:
+        raise ValueError("FFmpeg is not installed or not in system PATH")
+    except subprocess.TimeoutExpired:
+        raise ValueError(f"FFmpeg conversion timed out after {timeout:g}s")
+
+    if result.returncode != 0:
+        raise ValueError(f"Could not convert audio: {result.stderr.decode('utf-8', 'replace').strip()}")
+    if not result.stdout:
+        raise ValueError("Audio conversion produced no audio")
+    return result.stdout
+
+
+def pcm_to_wav_buffer(pcm, sample_rate=SAMPLE_RATE):
+    """
+    Wrap raw PCM in an in-memory WAV file, readable by sr.AudioFile
+
+    Args:
+        pcm (bytes): Signed 16-bit mono PCM
+        sample_rate (int): Sample rate of the PCM
+
+    Returns:
+        io.BytesIO: WAV file positioned at the start
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(CHANNELS)
+        wav.setsampwidth(SAMPLE_WIDTH)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    buffer.seek(0)
+    return buffer
+
+
+def transcode_to_wav_buffer(data, timeout=TRANSCODE_TIMEOUT_SECONDS):
+    """
+    Uploaded audio to an in-memory 16 kHz mono WAV
+
+    Args:
+        data (bytes): Uploaded audio
+        timeout (float): Seconds the conversion may take
+
+    Returns:
+        io.BytesIO: WAV file for sr.AudioFile
+    """
+    return pcm_to_wav_buffer(transcode_to_pcm(data, timeout))
@@ -0,0 +1,134 @@
+import os
+import time
+import argparse
+import numpy as np
+from retrieval import PartitionedCaseRetriever, normalize_rows, top_k_indices
+
+STORAGE_MODES = ['float32', 'float16', 'int8', 'pca']
+
+
+def load_dataset_matrix(csv_path, model_name):
+    """
+    Load (or encode once) the persisted past-case matrix for a dataset
+
+    Args:
+        csv_path (str): Past cases CSV
+        model_name (str): SentenceTransformer model used for the case embeddings
+
+    Returns:
+        tuple: (normalised float32 matrix, memory-mapped when cached; category of each row)
+    """
+    from case_ingest import store_version
+    from case_store import load_case_store
+    from embedding_store import EmbeddingStore, compose_case_text
+
+    cases = load_case_store(csv_path)
+    base_rows = getattr(cases, 'base_rows', len(cases))
+
+    def encode_past_cases():
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_name)
+        texts = [compose_case_text(cases[row]) for row in range(base_rows)]
+        return normalize_rows(model.encode(texts))
+
+    matrix = EmbeddingStore(model_name).load_or_build(
+        csv_path,
+        encode_past_cases,
+        expected_rows=base_rows,
+        version=store_version(cases)
+    )
+    return matrix, cases.column('category')[:base_rows]
+
+
+def resident_bytes(retriever):
+    """
+    Bytes the app keeps resident for the first-pass scan
+
+    Sums the compact copies of the global retriever and every category
+    partition; in float32 mode the scan reads the matrix itself.
+
+    Args:
+        retriever (PartitionedCaseRetriever): Retriever built as the app builds it
+
+    Returns:
+        int: Resident bytes, or None when nothing is compressed
+    """
+    retrievers = [retriever.global_retriever] + [partition for rows, partition in retriever.partitions.values()]
+    compressed = [r.compressed for r in retrievers if r.compressed is not None]
+    if not compressed:
+        return None
+    return sum(c.nbytes for c in compressed)
+
+
+def recall_at_k(retriever, matrix, query_rows, k):
+    """
+    Mean recall@k of a retriever against exact float32 search
+
+    Each query is a case's own embedding with that case left out of both
+    result lists, so the ranking covers its nearest other cases.
+
+    Returns:
+        tuple: (recall, median search ms)
+    """
+    hits, timings = 0, []
+    for row in query_rows:
+        query = np.asarray(matrix[row])
+        expected = [int(r) for r in top_k_indices(np.asarray(matrix @ query), k + 1) if r != row][:k]
+
+        start = time.perf_counter()
+        found = retriever.search(query, k=k + 1, threshold=-1.0, exact=True)
+        timings.append((time.perf_counter() - start) * 1000)
+
+        found = [r for r, score in found if r != row][:k]
+        hits += len(set(found) & set(expected))
+    return hits / (k * len(query_rows)), float(np.median(timings))
+
+
+def main():
+    """
+    Report resident memory saved versus recall@k lost for each storage mode
+
+    Uses the cached embedding matrix of a past-cases CSV, or synthetic
+    clustered embeddings when no dataset is given. The retriever is built
+    as the app builds it, with one partition per category, and the resident
+    size counts the global compact copy plus whatever the partitions keep.
+    """
+    parser = argparse.ArgumentParser(description='Quantised case-matrix storage report')
+    parser.add_argument('--dataset', help='Past cases CSV (default: synthetic embeddings)')
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--size', type=int, default=100_000, help='Synthetic rows')
+    parser.add_argument('--dim', type=int, default=384, help='Synthetic dimension')
+    parser.add_argument('--categories', type=int, default=8, help='Synthetic case categories')
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--pca-dim', type=int, default=128)
+    parser.add_argument('-k', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.dataset:
+        matrix, categories = load_dataset_matrix(os.path.abspath(args.dataset), args.model)
+        print(f"Dataset: {args.dataset} ({matrix.shape[0]} cases, dim {matrix.shape[1]})")
+    else:
+        # Clustered vectors resemble sentence embeddings better than isotropic noise
+        centers = rng.standard_normal((max(1, args.size // 200), args.dim), dtype=np.float32)
+        labels = rng.integers(0, centers.shape[0], args.size)
+        matrix = normalize_rows(centers[labels] + 0.6 * rng.standard_normal((args.size, args.dim), dtype=np.float32))
+        categories = [f"category-{label % args.categories}" for label in labels]
+        print(f"Synthetic: {matrix.shape[0]} cases, dim {matrix.shape[1]}")
+
+    query_rows = rng.choice(matrix.shape[0], min(args.queries, matrix.shape[0]), replace=False)
+    float32_bytes = matrix.shape[0] * matrix.shape[1] * 4
+
+    print(f"{'storage':>8} {'resident MB':>12} {'saved':>7} {f'recall@{args.k}':>10} {'search ms':>10}")
+    for storage in STORAGE_MODES:
+        retriever = PartitionedCaseRetriever(matrix, categories, backend='exact', storage=storage, pca_dim=args.pca_dim)
+        resident = resident_bytes(retriever) or float32_bytes
+        recall, search_ms = recall_at_k(retriever, matrix, query_rows, args.k)
+        print(
+            f"{storage:>8} {resident / 2**20:>12.1f} {1 - resident / float32_bytes:>6.0%} "
+            f"{recall:>10.4f} {search_ms:>10.2f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import time
+import argparse
+import numpy as np
+from retrieval import CaseRetriever
+
+
+def legacy_find_similar(query, embeddings, cases, k=3, threshold=0.5):
+    """
+    Previous find_similar_cases logic: score, build a dict per case, sort everything in Python
+    """
+    # Equivalent of sklearn's cosine_similarity, which re-normalises both sides on every call
+    matrix = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    similarities = matrix @ (query / np.linalg.norm(query))
+
+    scored_cases = [
+        {
+            'case': case,
+            'similarity_score': score
+        }
+        for case, score in zip(cases, similarities)
+    ]
+    sorted_cases = sorted(
+        scored_cases,
+        key=lambda x: x['similarity_score'],
+        reverse=True
+    )
+    return [
+        case['case'] for case in sorted_cases
+        if case['similarity_score'] > threshold
+    ][:k]
+
+
+def time_call(fn, repeats):
+    """Return the median wall-clock time of fn in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def main():
+    """
+    Compare the legacy sort-based search with the vectorised top-k retriever
+    on synthetic 384-dim embeddings
+    """
+    parser = argparse.ArgumentParser(description='Case retrieval micro-benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('-k', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'cases':>10} {'legacy ms':>12} {'top-k ms':>10} {'speedup':>9}")
+
+    for size in args.sizes:
+        embeddings = rng.standard_normal((size, args.dim), dtype=np.float32)
+        cases = [{'id': i} for i in range(size)]
+        query = rng.standard_normal(args.dim, dtype=np.float32)
+
+        retriever = CaseRetriever(embeddings)
+
+        # Both implementations must agree on the winners (threshold disabled for random data)
+        expected = [case['id'] for case in legacy_find_similar(query, embeddings, cases, args.k, -1.0)]
+        actual = [row for row, score in retriever.search(query, k=args.k, threshold=-1.0)]
+        assert expected == actual, (expected, actual)
+
+        legacy_ms = time_call(lambda: legacy_find_similar(query, embeddings, cases, args.k), args.repeats)
+        topk_ms = time_call(lambda: retriever.search(query, k=args.k), args.repeats)
+        print(f"{size:>10} {legacy_ms:>12.2f} {topk_ms:>10.2f} {legacy_ms / topk_ms:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
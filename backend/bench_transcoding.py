@@ -0,0 +1,132 @@
+import os
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+import numpy as np
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from audio_transcoding import SAMPLE_RATE, pcm_to_wav_buffer, transcode_to_pcm
+from transcoder import Transcoder
+
+
+def synthetic_upload(seconds):
+    """
+    Encode a synthetic voice-note-like recording (tone plus noise) the way browsers upload it
+
+    Returns:
+        tuple: (bytes, container name)
+    """
+    for codec, container in (('libopus', 'webm'), ('pcm_s16le', 'wav')):
+        result = subprocess.run(
+            [
+                'ffmpeg', '-hide_banner', '-loglevel', 'error',
+                '-f', 'lavfi', '-i', f'sine=frequency=220:duration={seconds}',
+                '-f', 'lavfi', '-i', f'anoisesrc=amplitude=0.05:duration={seconds}',
+                '-filter_complex', 'amix=inputs=2',
+                '-ar', '48000', '-acodec', codec, '-f', container, 'pipe:1'
+            ],
+            capture_output=True
+        )
+        if result.returncode == 0 and result.stdout:
+            return result.stdout, container
+    raise SystemExit(f"ffmpeg could not generate test audio: {result.stderr.decode(errors='replace')}")
+
+
+def file_round_trip(data, transcoder):
+    """The temp-file path: save the upload, convert file to file, read the WAV back"""
+    temp_dir = tempfile.gettempdir()
+    input_path = os.path.join(temp_dir, f"audio_{os.urandom(8).hex()}.webm")
+    output_path = os.path.join(temp_dir, f"converted_{os.urandom(8).hex()}.wav")
+    try:
+        with open(input_path, 'wb') as f:
+            f.write(data)
+        result = transcoder.run(
+            ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-i', input_path,
+             '-acodec', 'pcm_s16le', '-ar', str(SAMPLE_RATE), '-ac', '1', output_path]
+        )
+        if result.returncode != 0:
+            raise ValueError(f"Could not convert audio: {result.stderr.decode('utf-8', 'replace').strip()}")
+        with open(output_path, 'rb') as f:
+            return f.read()
+    finally:
+        for path in (input_path, output_path):
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+def memory_round_trip(data, transcoder):
+    """The in-memory path: stdin to ffmpeg, PCM from stdout into a BytesIO"""
+    return pcm_to_wav_buffer(transcode_to_pcm(data, transcoder=transcoder)).getvalue()
+
+
+def block_io():
+    """Block input and output operations of this process and its waited-for children"""
+    usage = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    return sum(u.ru_inblock + u.ru_oublock for u in usage)
+
+
+def run(mode, fn, data, requests, concurrency):
+    latencies = []
+
+    def one(_):
+        start = time.perf_counter()
+        fn(data)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    io_before = block_io()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    io_ops = block_io() - io_before
+
+    latencies = np.array(latencies)
+    print(
+        f"{mode:>7} {np.percentile(latencies, 50):>8.1f} {np.percentile(latencies, 95):>8.1f} "
+        f"{requests / elapsed:>8.1f} {io_ops / requests:>10.1f} {io_ops / elapsed:>8.1f}"
+    )
+
+
+def main():
+    """
+    Compare per-request latency and disk I/O of temp-file and in-memory transcoding
+
+    Block I/O comes from getrusage and only counts operations that reached
+    the block device, so run it on a cold or busy disk for realistic numbers.
+    Both paths run ffmpeg on the same kind of bounded Transcoder pool, sized
+    to --concurrency, so neither gets more ffmpeg processes than the other.
+    """
+    parser = argparse.ArgumentParser(description='Upload transcoding latency and I/O report')
+    parser.add_argument('--audio', help='Recording to transcode (default: synthetic webm/opus)')
+    parser.add_argument('--seconds', type=float, default=30, help='Synthetic recording length')
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    if args.audio:
+        with open(args.audio, 'rb') as f:
+            data = f.read()
+        print(f"Audio: {args.audio} ({len(data) / 1024:.0f} KB)")
+    else:
+        data, container = synthetic_upload(args.seconds)
+        print(f"Synthetic {container}: {args.seconds:g}s ({len(data) / 1024:.0f} KB)")
+
+    # Every request queues for a worker instead of being shed, as the comparison needs all of them
+    transcoders = {
+        mode: Transcoder(workers=args.concurrency, queue_size=args.requests, queue_timeout=None)
+        for mode in ('file', 'memory')
+    }
+
+    # Warm up both paths (and check that the pipe path accepts this container)
+    file_round_trip(data, transcoders['file'])
+    memory_round_trip(data, transcoders['memory'])
+
+    print(f"{'mode':>7} {'p50 ms':>8} {'p95 ms':>8} {'req/s':>8} {'IO ops/req':>10} {'IOPS':>8}")
+    run('file', partial(file_round_trip, transcoder=transcoders['file']), data, args.requests, args.concurrency)
+    run('memory', partial(memory_round_trip, transcoder=transcoders['memory']), data, args.requests, args.concurrency)
+
+
+if __name__ == '__main__':
+    main()
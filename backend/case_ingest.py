@@ -0,0 +1,208 @@
+import os
+import threading
+import numpy as np
+from embedding_store import compose_case_text
+from lexical_index import load_or_build_bm25
+from retrieval import HYBRID_RETRIEVAL, PartitionedCaseRetriever, normalize_rows
+
+# Compact automatically once this fraction of the rows are tombstones
+COMPACT_TOMBSTONE_RATIO = float(os.environ.get('COMPACT_TOMBSTONE_RATIO', 0.1))
+
+
+def store_version(cases):
+    """Embedding-store version string for a case store (changes on compaction)"""
+    return f"gen{getattr(cases, 'generation', 0)}"
+
+
+def build_case_retriever(chatbot, base_embeddings, cases=None):
+    """
+    Build the partitioned (and, if enabled, hybrid) retriever for past cases
+
+    The persisted matrix covers the rows written by the last conversion or
+    compaction; rows ingested since then come from the embedding store's
+    append-only segment (re-encoded if that segment is missing rows) and
+    tombstoned rows are excluded.
+
+    Args:
+        chatbot: Object with past_cases, past_cases_path, embedding_model and embedding_store
+        base_embeddings (numpy.ndarray): Matrix for the first base_rows cases
+        cases (Sequence, optional): Cases to index instead of chatbot.past_cases
+
+    Returns:
+        PartitionedCaseRetriever: Retriever over every live past case
+    """
+    cases = chatbot.past_cases if cases is None else cases
+    base_rows = getattr(cases, 'base_rows', len(cases))
+    version = store_version(cases)
+    categories = [case.get('category', '') for case in cases]
+    index_prefix = chatbot.embedding_store.artifact_prefix(chatbot.past_cases_path, version)
+
+    retriever = PartitionedCaseRetriever(
+        base_embeddings,
+        categories[:base_rows],
+        index_prefix=index_prefix
+    )
+
+    if HYBRID_RETRIEVAL:
+        retriever.lexical_index = load_or_build_bm25(
+            lambda: (compose_case_text(cases[row]) for row in range(base_rows)),
+            base_rows,
+            index_prefix
+        )
+
+    if len(cases) > base_rows:
+        dim = retriever.global_retriever.matrix.shape[1]
+        appended = chatbot.embedding_store.load_appended(chatbot.past_cases_path, dim, version)
+        missing = len(cases) - base_rows - appended.shape[0]
+        if missing > 0:
+            # A previous ingest stopped between the case store and the embedding store
+            print(f"Encoding {missing} ingested cases missing from the embedding store")
+            texts = [compose_case_text(cases[row]) for row in range(len(cases) - missing, len(cases))]
+            vectors = normalize_rows(chatbot.embedding_model.encode(texts))
+            chatbot.embedding_store.append(chatbot.past_cases_path, vectors, version)
+            appended = np.vstack([appended, vectors]) if appended.shape[0] else vectors
+        appended = appended[:len(cases) - base_rows]
+        texts = [compose_case_text(cases[row]) for row in range(base_rows, len(cases))]
+        retriever.add(appended, categories[base_rows:], texts)
+
+    tombstones = getattr(cases, 'tombstones', None)
+    if tombstones:
+        retriever.delete(tombstones)
+
+    return retriever
+
+
+class CaseIngestor:
+    def __init__(self, chatbot):
+        """
+        Add and remove past cases while the chatbot keeps serving
+
+        Only new cases are encoded. They are appended to the case store, the
+        embedding store's append-only segment and the in-memory indexes.
+        Deletes are tombstones until a compaction rewrites the stores and
+        swaps in fresh indexes.
+
+        Args:
+            chatbot: Object with past_cases, past_cases_path, embedding_model,
+                embedding_store, case_retriever and similar_cases_cache
+        """
+        self.chatbot = chatbot
+        self._lock = threading.Lock()
+        self._compaction_thread = None
+
+    def add_cases(self, cases):
+        """
+        Ingest new past cases
+
+        Args:
+            cases (list): Case dicts with at least category and description
+
+        Returns:
+            list: Ids assigned to the new cases
+        """
+        cases = [dict(case) for case in cases]
+        for case in cases:
+            if not case.get('description'):
+                raise ValueError("Every case needs a description")
+
+        # Encode outside the lock; this is the slow part
+        texts = [compose_case_text(case) for case in cases]
+        vectors = normalize_rows(self.chatbot.embedding_model.encode(texts))
+
+        with self._lock:
+            store = self.chatbot.past_cases
+            if not hasattr(store, 'append'):
+                raise RuntimeError("Past cases are not loaded from a case store")
+
+            # Persist first, then make the rows searchable
+            rows = store.append(cases)
+            self.chatbot.embedding_store.append(self.chatbot.past_cases_path, vectors, store_version(store))
+            self.chatbot.case_retriever.add(vectors, [case.get('category', '') for case in cases], texts)
+            self.chatbot.similar_cases_cache.clear()
+
+            print(f"Ingested {len(rows)} cases")
+            return [store[row]['id'] for row in rows]
+
+    def remove_cases(self, case_ids):
+        """
+        Tombstone past cases by id
+
+        Args:
+            case_ids (list): Ids of the cases to delete
+
+        Returns:
+            dict: Deleted ids and ids that were not found
+        """
+        with self._lock:
+            store = self.chatbot.past_cases
+            if not hasattr(store, 'delete'):
+                raise RuntimeError("Past cases are not loaded from a case store")
+
+            rows, missing = [], []
+            for case_id in case_ids:
+                row = store.row_for_id(case_id)
+                if row is None:
+                    missing.append(case_id)
+                else:
+                    rows.append(row)
+
+            if rows:
+                store.delete(rows)
+                self.chatbot.case_retriever.delete(rows)
+                self.chatbot.similar_cases_cache.clear()
+
+            if len(store) and len(store.tombstones) / len(store) >= COMPACT_TOMBSTONE_RATIO:
+                self.compact_in_background()
+
+            return {
+                "deleted": [case_id for case_id in case_ids if case_id not in missing],
+                "not_found": missing
+            }
+
+    def compact_in_background(self):
+        """Start a compaction thread unless one is already running"""
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        self._compaction_thread = threading.Thread(target=self.compact, name='case-compaction', daemon=True)
+        self._compaction_thread.start()
+
+    def compact(self):
+        """
+        Drop tombstoned cases and fold appended rows into the base matrix
+
+        The new case store, embedding matrix and indexes are built alongside
+        the live ones and swapped in at the end, so searches continue meanwhile.
+
+        Returns:
+            dict: Row counts before and after compaction
+        """
+        with self._lock:
+            chatbot = self.chatbot
+            store = chatbot.past_cases
+            rows_before = len(store)
+            live_rows = [row for row in range(rows_before) if row not in store.tombstones]
+
+            # Persist the compacted matrix for the next generation before switching the store
+            matrix = chatbot.case_retriever.global_retriever.vectors(live_rows)
+            next_version = f"gen{store.generation + 1}"
+            key = chatbot.embedding_store.cache_key(chatbot.past_cases_path, next_version)
+            chatbot.embedding_store.save(key, matrix, chatbot.past_cases_path)
+
+            new_store, _ = store.compact()
+            new_embeddings = chatbot.embedding_store.load_or_build(
+                chatbot.past_cases_path,
+                lambda: matrix,
+                expected_rows=new_store.base_rows,
+                version=store_version(new_store)
+            )
+            new_retriever = build_case_retriever(chatbot, new_embeddings, new_store)
+
+            with chatbot.case_swap_lock:
+                chatbot.past_cases = new_store
+                chatbot.case_embeddings = new_embeddings
+                chatbot.case_retriever = new_retriever
+            chatbot.similar_cases_cache.clear()
+            chatbot.embedding_store.remove(chatbot.past_cases_path, store_version(store))
+
+            print(f"Compacted past cases: {rows_before} -> {len(new_store)} rows")
+            return {"rows_before": rows_before, "rows_after": len(new_store)}
@@ -0,0 +1,520 @@
+import os
+import re
+import csv
+import sys
+import json
+import mmap
+import uuid
+import argparse
+import threading
+from collections.abc import Mapping, Sequence
+import numpy as np
+from embedding_store import sha256_file
+
+# Directory holding converted case stores
+DEFAULT_STORE_DIR = os.environ.get(
+    'CASE_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.case_store')
+)
+
+# Columns kept in memory; everything else stays on disk until a row is read
+RESIDENT_COLUMNS = ('id', 'category', 'outcome')
+
+# Columns every case is guaranteed to have (empty string when missing from the CSV)
+REQUIRED_COLUMNS = ('category', 'description', 'key_details', 'outcome')
+
+STORE_FORMAT_VERSION = 3
+
+# Files belonging to one generation of a store
+_GENERATION_FILE = re.compile(r'^(?:records|offsets|resident|appended|tombstones)-(\d+)\.(?:bin|npy|json|jsonl)$')
+
+
+def _raise_csv_field_limit():
+    # Judgment texts exceed the default csv field size limit
+    max_int = sys.maxsize
+    while True:
+        try:
+            csv.field_size_limit(max_int)
+            break
+        except OverflowError:
+            max_int = int(max_int / 10)
+
+
+def _write_json(path, data, **kwargs):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, **kwargs)
+    os.replace(tmp_path, path)
+
+
+def _save_npy(path, array):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+class LazyCase(Mapping):
+    def __init__(self, store, row):
+        """
+        Read-only view of one past case
+
+        Resident columns are served from memory; the remaining columns are
+        decoded from the memory-mapped records file on first access.
+
+        Args:
+            store (CaseStore): Store the case belongs to
+            row (int): Row number in the store
+        """
+        self._store = store
+        self._row = row
+        self._details = None
+
+    def _load_details(self):
+        if self._details is None:
+            self._details = self._store.fetch_details(self._row)
+        return self._details
+
+    def __getitem__(self, key):
+        if key in self._store.resident:
+            return self._store.resident[key][self._row]
+        details = self._load_details()
+        if key in details:
+            return details[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._store.columns)
+
+    def __len__(self):
+        return len(self._store.columns)
+
+    def __repr__(self):
+        return f"LazyCase(row={self._row}, id={self.get('id')!r}, category={self.get('category')!r})"
+
+    def to_dict(self):
+        """Materialise every column into a plain dict (e.g. for JSON responses)"""
+        return {column: self[column] for column in self._store.columns}
+
+
+class CaseStore(Sequence):
+    def __init__(self, store_dir):
+        """
+        Columnar, offset-indexed store of past cases
+
+        Layout of store_dir, where <gen> is the compaction generation:
+            meta.json              schema, row counts, generation and source fingerprint
+            resident-<gen>.json    resident columns of the base rows as lists (id, category, outcome)
+            records-<gen>.bin      UTF-8 JSON blob of the other columns, one per row
+            offsets-<gen>.npy      int64 byte offsets into records (base rows + 1 entries)
+            appended-<gen>.jsonl   end offset and resident columns of each appended row
+            tombstones-<gen>.json  rows deleted since the last compaction
+
+        Appends only add to records and appended, then commit by raising
+        meta['rows']; anything past the committed rows (left by an append
+        that died) is ignored on load and overwritten by the next append.
+        Rows are tombstoned in place; compaction writes a new generation and
+        switches meta.json over to it.
+
+        Args:
+            store_dir (str): Directory created by convert_csv
+        """
+        self.store_dir = store_dir
+        self._write_lock = threading.Lock()
+        self._id_to_row = None
+
+        with open(os.path.join(store_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        with open(self._path('resident', 'json'), 'r', encoding='utf-8') as f:
+            resident = json.load(f)
+
+        self.columns = self.meta['columns']
+        self.resident = {column: values[:self.base_rows] for column, values in resident.items()}
+        self._base_offsets = np.load(self._path('offsets', 'npy'), mmap_mode='r')
+        self._appended_ends = []
+        self._appended_bytes = 0
+        self._load_appended()
+        self.tombstones = frozenset()
+        if os.path.exists(self._path('tombstones', 'json')):
+            with open(self._path('tombstones', 'json'), 'r', encoding='utf-8') as f:
+                self.tombstones = frozenset(json.load(f))
+
+        self._open_records()
+
+    def _path(self, name, extension, generation=None):
+        generation = self.meta['generation'] if generation is None else generation
+        return os.path.join(self.store_dir, f"{name}-{generation}.{extension}")
+
+    def _load_appended(self):
+        # Committed appended rows only: lines past meta['rows'] belong to an append that never committed
+        committed = len(self) - self.base_rows
+        if committed <= 0:
+            return
+        with open(self._path('appended', 'jsonl'), 'rb') as f:
+            for line in f:
+                if len(self._appended_ends) == committed or not line.endswith(b'\n'):
+                    break
+                entry = json.loads(line)
+                self._appended_ends.append(int(entry['end']))
+                for column, values in self.resident.items():
+                    values.append(entry['resident'][column])
+                self._appended_bytes += len(line)
+        if len(self._appended_ends) != committed:
+            raise ValueError(f"Case store {self.store_dir} is missing appended rows")
+
+    def _open_records(self):
+        # Re-mapped after every append so new rows become readable
+        records_path = self._path('records', 'bin')
+        records_file = open(records_path, 'rb')
+        if os.path.getsize(records_path):
+            self._records = mmap.mmap(records_file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._records = b''
+        records_file.close()
+
+    @property
+    def generation(self):
+        """Compaction generation; changes whenever rows are renumbered"""
+        return self.meta['generation']
+
+    @property
+    def base_rows(self):
+        """Number of rows written by the last conversion or compaction"""
+        return self.meta['base_rows']
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [LazyCase(self, i) for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return LazyCase(self, row)
+
+    def column(self, name):
+        """
+        Values of a resident column for every row
+
+        Args:
+            name (str): Resident column name
+
+        Returns:
+            list: Column values in row order
+        """
+        return self.resident[name][:len(self)]
+
+    def _offset(self, row):
+        # Byte offset where a row starts (row == len(self) gives the end of the last row)
+        base_rows = self.base_rows
+        if row <= base_rows:
+            return int(self._base_offsets[row])
+        return self._appended_ends[row - base_rows - 1]
+
+    def fetch_details(self, row):
+        """
+        Decode the non-resident columns of a row from the records file
+
+        Args:
+            row (int): Row number
+
+        Returns:
+            dict: Column name -> value
+        """
+        start, end = self._offset(row), self._offset(row + 1)
+        return json.loads(bytes(self._records[start:end]).decode('utf-8'))
+
+    def row_for_id(self, case_id):
+        """
+        Find the live row holding a case id
+
+        Args:
+            case_id (str): Value of the id column
+
+        Returns:
+            int or None: Row number, None if unknown or deleted
+        """
+        if self._id_to_row is None or len(self._id_to_row) != len(self):
+            self._id_to_row = {str(case_id): row for row, case_id in enumerate(self.column('id'))}
+        row = self._id_to_row.get(str(case_id))
+        return None if row is None or row in self.tombstones else row
+
+    def append(self, cases):
+        """
+        Append new cases to the end of the store
+
+        Only the new rows are written: their blobs go to the records file and
+        one line each to the appended sidecar. Raising meta['rows'] is the
+        commit point; the in-memory columns are extended only after it.
+
+        Args:
+            cases (list): Case dicts; an id is generated for cases without one
+
+        Returns:
+            list: Row numbers assigned to the cases
+        """
+        with self._write_lock:
+            first_row = len(self)
+            end = self._offset(first_row)
+
+            blobs, entries = [], []
+            for case in cases:
+                details = {
+                    column: case.get(column) or ''
+                    for column in self.columns
+                    if column not in self.resident
+                }
+                blob = json.dumps(details, ensure_ascii=False).encode('utf-8')
+                end += len(blob)
+                resident = {}
+                for column in self.resident:
+                    value = case.get(column) or ''
+                    if column == 'id' and not value:
+                        value = f"case-{uuid.uuid4().hex[:12]}"
+                    resident[column] = str(value)
+                blobs.append(blob)
+                entries.append({"end": end, "resident": resident})
+
+            # Write from the committed ends, over whatever an interrupted append left behind
+            with open(self._path('records', 'bin'), 'r+b') as records:
+                records.seek(self._offset(first_row))
+                for blob in blobs:
+                    records.write(blob)
+                records.flush()
+                os.fsync(records.fileno())
+
+            lines = b''.join(json.dumps(entry, ensure_ascii=False).encode('utf-8') + b'\n' for entry in entries)
+            with open(self._path('appended', 'jsonl'), 'ab') as sidecar:
+                sidecar.truncate(self._appended_bytes)
+                sidecar.write(lines)
+                sidecar.flush()
+                os.fsync(sidecar.fileno())
+
+            meta = dict(self.meta, rows=first_row + len(cases))
+            _write_json(os.path.join(self.store_dir, 'meta.json'), meta, indent=2)
+
+            # Committed: publish the rows, extending the columns before the row count
+            for entry in entries:
+                self._appended_ends.append(entry["end"])
+                for column, values in self.resident.items():
+                    values.append(entry["resident"][column])
+            self._appended_bytes += len(lines)
+            self._open_records()
+            self.meta = meta
+
+            return list(range(first_row, first_row + len(cases)))
+
+    def delete(self, rows):
+        """
+        Tombstone rows; they stay on disk until the next compaction
+
+        Args:
+            rows (iterable): Row numbers to delete
+        """
+        with self._write_lock:
+            self.tombstones = self.tombstones | frozenset(int(row) for row in rows)
+            _write_json(self._path('tombstones', 'json'), sorted(self.tombstones))
+
+    def compact(self):
+        """
+        Rewrite the store without tombstoned rows as a new generation
+
+        Returns:
+            tuple: (new CaseStore, list of old row numbers kept, in new row order)
+        """
+        with self._write_lock:
+            generation = self.generation + 1
+            kept_rows = [row for row in range(len(self)) if row not in self.tombstones]
+
+            offsets = [0]
+            with open(self._path('records', 'bin', generation), 'wb') as records:
+                for row in kept_rows:
+                    blob = bytes(self._records[self._offset(row):self._offset(row + 1)])
+                    records.write(blob)
+                    offsets.append(offsets[-1] + len(blob))
+
+            _save_npy(self._path('offsets', 'npy', generation), np.asarray(offsets, dtype=np.int64))
+            _write_json(self._path('resident', 'json', generation), {
+                column: [values[row] for row in kept_rows]
+                for column, values in self.resident.items()
+            })
+
+            # Switching meta.json over is the commit point of the compaction.
+            # The old generation stays on disk: this store and in-flight readers
+            # still have it mapped (and Windows cannot delete a mapped file), so
+            # sweep_old_generations removes it on the next startup.
+            meta = dict(self.meta, generation=generation, rows=len(kept_rows), base_rows=len(kept_rows))
+            _write_json(os.path.join(self.store_dir, 'meta.json'), meta, indent=2)
+
+            return CaseStore(self.store_dir), kept_rows
+
+
+def sweep_old_generations(store_dir):
+    """
+    Delete the files of generations older than the one meta.json points at
+
+    Files another process still has mapped (on Windows) are left for the next sweep.
+
+    Args:
+        store_dir (str): Store directory
+
+    Returns:
+        int: Number of files deleted
+    """
+    try:
+        with open(os.path.join(store_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            current = json.load(f)['generation']
+    except (OSError, ValueError, KeyError):
+        return 0
+
+    deleted = 0
+    for name in os.listdir(store_dir):
+        match = _GENERATION_FILE.match(name)
+        if match and int(match.group(1)) < current:
+            try:
+                os.unlink(os.path.join(store_dir, name))
+                deleted += 1
+            except OSError as e:
+                print(f"Could not delete old case store file {name}: {e}")
+    return deleted
+
+
+def store_dir_for(csv_path, store_root=None):
+    """Directory a CSV is converted into"""
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(store_root or DEFAULT_STORE_DIR, name)
+
+
+def convert_csv(csv_path, store_dir, resident_columns=RESIDENT_COLUMNS):
+    """
+    One-time conversion of a cases CSV into a CaseStore directory
+
+    Rows are streamed, so the CSV is never fully materialised in memory.
+    Cases ingested into a previous store for this CSV are discarded.
+
+    Args:
+        csv_path (str): Source CSV (e.g. train.csv)
+        store_dir (str): Destination directory
+        resident_columns (tuple): Columns to keep in memory when loaded
+
+    Returns:
+        str: store_dir
+    """
+    _raise_csv_field_limit()
+
+    # Build into a temporary directory and swap it in, so readers never see a half-written store
+    tmp_dir = f"{store_dir}.{os.getpid()}.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    resident = {column: [] for column in resident_columns}
+    offsets = [0]
+
+    with open(csv_path, 'r', encoding='utf-8') as f, \
+            open(os.path.join(tmp_dir, 'records-0.bin'), 'wb') as records:
+        reader = csv.DictReader(f)
+        columns = list(reader.fieldnames or [])
+        for column in REQUIRED_COLUMNS + tuple(resident_columns):
+            if column not in columns:
+                columns.append(column)
+
+        for row, case in enumerate(reader):
+            for column in resident_columns:
+                value = case.get(column)
+                # Fall back to the row number when the CSV has no id column
+                if column == 'id' and not value:
+                    value = str(row)
+                resident[column].append(value or '')
+
+            details = {
+                column: case.get(column) or ''
+                for column in columns
+                if column not in resident
+            }
+            blob = json.dumps(details, ensure_ascii=False).encode('utf-8')
+            records.write(blob)
+            offsets.append(offsets[-1] + len(blob))
+
+    np.save(os.path.join(tmp_dir, 'offsets-0.npy'), np.asarray(offsets, dtype=np.int64))
+    with open(os.path.join(tmp_dir, 'resident-0.json'), 'w', encoding='utf-8') as f:
+        json.dump(resident, f, ensure_ascii=False)
+
+    stat = os.stat(csv_path)
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            "format_version": STORE_FORMAT_VERSION,
+            "columns": columns,
+            "resident_columns": list(resident_columns),
+            "generation": 0,
+            "rows": len(offsets) - 1,
+            "base_rows": len(offsets) - 1,
+            "source_path": os.path.abspath(csv_path),
+            "source_size": stat.st_size,
+            "source_mtime_ns": stat.st_mtime_ns,
+            "source_sha256": sha256_file(csv_path)
+        }, f, indent=2)
+
+    if os.path.isdir(store_dir):
+        for name in os.listdir(store_dir):
+            os.unlink(os.path.join(store_dir, name))
+    os.makedirs(store_dir, exist_ok=True)
+    # meta.json is moved last so the store only becomes valid once complete
+    for name in sorted(os.listdir(tmp_dir), key=lambda name: name == 'meta.json'):
+        os.replace(os.path.join(tmp_dir, name), os.path.join(store_dir, name))
+    os.rmdir(tmp_dir)
+
+    print(f"Converted {len(offsets) - 1} cases from {csv_path} into {store_dir}")
+    return store_dir
+
+
+def _store_is_current(csv_path, store_dir):
+    try:
+        with open(os.path.join(store_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    if meta.get('format_version') != STORE_FORMAT_VERSION:
+        return False
+
+    stat = os.stat(csv_path)
+    if meta.get('source_size') == stat.st_size and meta.get('source_mtime_ns') == stat.st_mtime_ns:
+        return True
+    # The file was touched; only a content change requires reconversion
+    return meta.get('source_sha256') == sha256_file(csv_path)
+
+
+def load_case_store(csv_path, store_root=None):
+    """
+    Open the case store for a CSV, converting the CSV first if needed
+
+    Args:
+        csv_path (str): Source CSV (e.g. train.csv)
+        store_root (str, optional): Directory holding case stores
+
+    Returns:
+        CaseStore: Lazily loaded past cases
+    """
+    store_dir = store_dir_for(csv_path, store_root)
+    if not _store_is_current(csv_path, store_dir):
+        convert_csv(csv_path, store_dir)
+    # Generations left behind by compactions of a previous run
+    sweep_old_generations(store_dir)
+    return CaseStore(store_dir)
+
+
+def main():
+    """
+    Convert a cases CSV into the columnar case store
+    """
+    parser = argparse.ArgumentParser(description='Convert past cases CSV into a columnar case store')
+    parser.add_argument('csv_path', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'train.csv'))
+    parser.add_argument('-o', '--output', help='Destination directory (defaults to .case_store/<csv name>)')
+    args = parser.parse_args()
+
+    convert_csv(args.csv_path, args.output or store_dir_for(args.csv_path))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,13 +3,16 @@ import json
 import csv
 import sys
 import random
-from groq import Groq
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 import speech_recognition as sr
 import langdetect
 from dotenv import load_dotenv
+from context_compaction import compact_context
+from llm_metrics import begin_request_summary, parse_completion_json
+from llm_provider import LLM_MODEL, create_llm_client
+from resilient_llm import CircuitOpenError, ResilientLLM, degraded_response
 import argparse
 
 load_dotenv()
@@ -19,9 +22,12 @@ class LegalAnalysisChatbot:
         """
         Initialize the Legal Analysis Chatbot
         """
-        # Groq client initialization
+        # LLM client initialization (Groq unless LLM_PROVIDER says otherwise)
         self.api_key = os.environ.get('GROQ_API_KEY')
-        self.client = Groq(api_key=self.api_key)
+        self.client = create_llm_client(self.api_key)
+        
+        # Timeouts, retries, optional hedging and a circuit breaker around every completion
+        self.llm = ResilientLLM(self.client)
         
         # Case categories
         self.case_categories = [
@@ -64,6 +70,11 @@ class LegalAnalysisChatbot:
                 "message": "No previous case analysis available. Please start with a new case description."
             }
         
+        # Only the parts of the analysis relevant to the question are sent, within a token budget
+        context_text, context_stats = compact_context(self.current_case_analysis, input_text)
+        print(f"Follow-up context: {context_stats['original_tokens']} -> {context_stats['compact_tokens']} "
+              f"tokens (saved {context_stats['tokens_saved']}), fields {context_stats['fields']}")
+        
         # Prepare system and user messages for follow-up
         messages = [
             {
@@ -72,7 +83,7 @@ class LegalAnalysisChatbot:
                 You are currently discussing a {self.current_case_analysis.get('case_category', 'legal')} case.
 
                 Previous Case Analysis:
-                {json.dumps(self.current_case_analysis, indent=2)}
+                {context_text}
 
                 Your task is to:
                 1. Understand the context of the previous case analysis
@@ -90,8 +101,9 @@ class LegalAnalysisChatbot:
         
         try:
             # Create completion using Groq's DeepSeek model
-            completion = self.client.chat.completions.create(
-                model="deepseek-r1-distill-llama-70b",
+            completion = self.llm.create(
+                metrics_kind='follow_up',
+                model=LLM_MODEL,
                 messages=messages,
                 response_format={"type": "json_object"},
                 temperature=0.6,
@@ -102,10 +114,12 @@ class LegalAnalysisChatbot:
             
             # Extract and parse the response
             response_text = completion.choices[0].message.content
-            result = json.loads(response_text)
+            result = parse_completion_json(response_text, 'follow_up', LLM_MODEL)
             
             return result
         
+        except CircuitOpenError as e:
+            return degraded_response(e)
         except Exception as e:
             return {
                 "status": "error",
@@ -202,8 +216,9 @@ class LegalAnalysisChatbot:
         
         try:
             # Create completion using Groq's DeepSeek model
-            completion = self.client.chat.completions.create(
-                model="deepseek-r1-distill-llama-70b",
+            completion = self.llm.create(
+                metrics_kind='understand_case',
+                model=LLM_MODEL,
                 messages=messages,
                 response_format={"type": "json_object"},
                 temperature=0.6,
@@ -214,7 +229,7 @@ class LegalAnalysisChatbot:
             
             # Extract and parse the response
             response_text = completion.choices[0].message.content
-            result = json.loads(response_text)
+            result = parse_completion_json(response_text, 'understand_case', LLM_MODEL)
             
             # Store current case analysis for context
             self.current_case_analysis = result
@@ -225,6 +240,8 @@ class LegalAnalysisChatbot:
             
             return result
         
+        except CircuitOpenError as e:
+            return degraded_response(e)
         except Exception as e:
             return {
                 "status": "error",
@@ -304,6 +321,7 @@ def main():
             print("Ready for a new case analysis. Please describe your legal situation.")
             continue
         
+        llm_summary = begin_request_summary()
         try:
             # Determine if this is an initial case or a follow-up
             if not chatbot.current_case_analysis:
@@ -315,6 +333,8 @@ def main():
             
             # Print formatted response
             print_formatted_response(response)
+            if llm_summary.calls:
+                print(f"\n(LLM usage: {llm_summary.header_value()})")
         
         except Exception as e:
             print(f"An error occurred: {e}")
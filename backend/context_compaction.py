@@ -0,0 +1,129 @@
+import os
+import json
+from lexical_index import STOPWORDS, tokenize
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Prompt-token budget for the previous analysis embedded in follow-up prompts
+FOLLOW_UP_CONTEXT_TOKENS = int(os.environ.get('FOLLOW_UP_CONTEXT_TOKENS', 800))
+
+# Always kept: the follow-up prompt refers to the category and the case facts
+CORE_FIELDS = ('case_category', 'key_details')
+
+# Question words that point at a field even when they do not appear in it
+FIELD_HINTS = {
+    'step_by_step_guidance': {'step', 'steps', 'do', 'next', 'evidence', 'document', 'documents',
+                              'proof', 'deadline', 'limitation', 'file', 'lawyer', 'help'},
+    'recommended_next_steps': {'step', 'steps', 'do', 'next', 'should', 'now', 'start'},
+    'legal_clauses': {'law', 'laws', 'section', 'sections', 'act', 'statute', 'statutes',
+                      'clause', 'clauses', 'rights', 'legal', 'ipc'},
+    'preliminary_risk_assessment': {'risk', 'risks', 'chance', 'chances', 'win', 'lose', 'impact', 'complex'},
+    'case_duration': {'long', 'time', 'duration', 'days', 'months', 'years', 'when'},
+    'risk_assessment': {'probability', 'compensation', 'chance', 'chances', 'win', 'money'}
+}
+
+# Fields scoring below this fraction of the most relevant field are dropped, so a word
+# the question shares with several fields in passing (e.g. "legal") does not keep them all
+RELEVANCE_RATIO = 0.5
+
+# Progressively harsher limits (list items, characters per string) for oversized fields
+_SHRINK_STEPS = ((5, 400), (3, 200), (1, 100))
+
+_encoding = None
+
+
+def estimate_tokens(text):
+    """
+    Estimate the number of prompt tokens of a text locally
+
+    Uses tiktoken's cl100k_base encoding when installed; otherwise about four
+    UTF-8 bytes per token, which also accounts for Devanagari text.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Estimated token count
+    """
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding('cl100k_base')
+        return len(_encoding.encode(text))
+    return (len(text.encode('utf-8')) + 3) // 4
+
+
+def _minify(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def _shrink(value, max_items, max_chars):
+    if isinstance(value, dict):
+        return {key: _shrink(item, max_items, max_chars) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_shrink(item, max_items, max_chars) for item in value[:max_items]]
+    if isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars].rstrip() + '...'
+    return value
+
+
+def _relevance(field, value, question_tokens):
+    field_tokens = (set(tokenize(field.replace('_', ' '))) | set(tokenize(_minify(value)))) - STOPWORDS
+    score = len(question_tokens & field_tokens)
+    if question_tokens & FIELD_HINTS.get(field, set()):
+        score += 2
+    return score
+
+
+def compact_context(context, question, budget=FOLLOW_UP_CONTEXT_TOKENS):
+    """
+    Compact a previous analysis for a follow-up prompt
+
+    Keeps the core fields plus the fields most relevant to the question (or,
+    when nothing stands out, the remaining fields in their original order).
+    Relevance counts the non-stopword question words found in a field's name
+    or value, plus a bonus for FIELD_HINTS. Empty values are dropped,
+    oversized fields shrunk and the result serialised as minified JSON
+    within the token budget.
+
+    Args:
+        context (dict): Previous case analysis
+        question (str): Follow-up question
+        budget (int): Maximum estimated tokens of the compacted context
+
+    Returns:
+        tuple: (compacted JSON text, stats dict with original/compact token
+            estimates and the kept fields)
+    """
+    original_tokens = estimate_tokens(json.dumps(context, indent=2))
+    fields = {key: value for key, value in context.items() if value not in (None, '', [], {})}
+
+    question_tokens = set(tokenize(question)) - STOPWORDS
+    scores = {key: _relevance(key, value, question_tokens) for key, value in fields.items() if key not in CORE_FIELDS}
+    best = max(scores.values(), default=0)
+    relevant = sorted(
+        (key for key in scores if scores[key] > 0 and scores[key] >= best * RELEVANCE_RATIO),
+        key=lambda key: -scores[key]
+    )
+    if not relevant:
+        relevant = list(scores)
+    ordered = [key for key in CORE_FIELDS if key in fields] + relevant
+
+    compacted = {}
+    for key in ordered:
+        for candidate in [fields[key]] + [_shrink(fields[key], *step) for step in _SHRINK_STEPS]:
+            if estimate_tokens(_minify(dict(compacted, **{key: candidate}))) <= budget:
+                compacted[key] = candidate
+                break
+
+    text = _minify(compacted)
+    compact_tokens = estimate_tokens(text)
+    return text, {
+        "original_tokens": original_tokens,
+        "compact_tokens": compact_tokens,
+        "tokens_saved": original_tokens - compact_tokens,
+        "fields": list(compacted)
+    }
@@ -0,0 +1,140 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+# Flush a batch once it has this many texts...
+EMBED_BATCH_MAX_SIZE = int(os.environ.get('EMBED_BATCH_MAX_SIZE', 32))
+# ...or once the oldest text has waited this long
+EMBED_BATCH_MAX_WAIT_MS = float(os.environ.get('EMBED_BATCH_MAX_WAIT_MS', 5))
+
+
+class EmbeddingBatcher:
+    def __init__(self, encode_fn, max_batch=EMBED_BATCH_MAX_SIZE, max_wait_ms=EMBED_BATCH_MAX_WAIT_MS):
+        """
+        Collect query texts from concurrent requests and encode them together
+
+        A background thread drains the queue, waiting at most max_wait_ms after
+        the first text arrives (or until max_batch texts are queued), runs one
+        encode call for the whole batch and resolves each caller's future.
+
+        Args:
+            encode_fn (callable): Encodes a list of texts into a matrix (e.g. SentenceTransformer.encode)
+            max_batch (int): Maximum texts per encode call
+            max_wait_ms (float): Maximum time to hold a text waiting for company
+        """
+        self.encode_fn = encode_fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._max_batch_seen = 0
+        self._batch_size_counts = {}
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._encode_time_total = 0.0
+
+        self._worker = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, text):
+        """
+        Queue a text for encoding
+
+        Args:
+            text (str): Text to embed
+
+        Returns:
+            concurrent.futures.Future: Resolves to the text's embedding vector
+        """
+        future = Future()
+        self._queue.put((text, future, time.monotonic()))
+        return future
+
+    def encode(self, text, timeout=None):
+        """
+        Embed a single text, blocking until its batch has been encoded
+
+        Args:
+            text (str): Text to embed
+            timeout (float, optional): Seconds to wait for the result
+
+        Returns:
+            numpy.ndarray: Embedding vector
+        """
+        return self.submit(text).result(timeout=timeout)
+
+    def stats(self):
+        """
+        Batch-size and queue-wait metrics
+
+        Returns:
+            dict: Counters accumulated since start-up
+        """
+        with self._stats_lock:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0,
+                "max_batch_size": self._max_batch_seen,
+                "batch_size_histogram": dict(sorted(self._batch_size_counts.items())),
+                "avg_queue_wait_ms": round(self._queue_wait_total / self._items * 1000, 3) if self._items else 0,
+                "max_queue_wait_ms": round(self._queue_wait_max * 1000, 3),
+                "avg_encode_ms": round(self._encode_time_total / self._batches * 1000, 3) if self._batches else 0,
+                "queue_depth": self._queue.qsize(),
+                "config": {
+                    "max_batch": self.max_batch,
+                    "max_wait_ms": self.max_wait * 1000
+                }
+            }
+
+    def _collect_batch(self):
+        # Block for the first item, then gather more until the batch is full or the deadline passes
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            started = time.monotonic()
+            texts = [text for text, future, enqueued in batch]
+
+            try:
+                embeddings = self.encode_fn(texts)
+                # Rows are matched to callers by position, so a short (or long) result
+                # cannot be trusted; every caller gets the error instead of waiting forever
+                if len(embeddings) != len(batch):
+                    raise ValueError(f"encode_fn returned {len(embeddings)} embeddings for {len(batch)} texts")
+                for (text, future, enqueued), embedding in zip(batch, embeddings):
+                    future.set_result(embedding)
+            except Exception as e:
+                print(f"Error encoding embedding batch: {e}")
+                for text, future, enqueued in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            finished = time.monotonic()
+            with self._stats_lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._max_batch_seen = max(self._max_batch_seen, len(batch))
+                self._batch_size_counts[len(batch)] = self._batch_size_counts.get(len(batch), 0) + 1
+                self._encode_time_total += finished - started
+                for text, future, enqueued in batch:
+                    wait = started - enqueued
+                    self._queue_wait_total += wait
+                    self._queue_wait_max = max(self._queue_wait_max, wait)
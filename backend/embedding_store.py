@@ -0,0 +1,268 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+# Directory where encoded case matrices are persisted between restarts
+DEFAULT_CACHE_DIR = os.environ.get(
+    'EMBEDDING_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.embedding_cache')
+)
+
+# Fields joined (in this order) to build the text that is embedded for a case
+CASE_TEXT_FIELDS = ('category', 'description', 'key_details', 'outcome')
+
+# Bump the version whenever compose_case_text or the stored row format changes
+# so stale matrices are rebuilt (v2: rows are stored L2-normalised)
+CASE_TEXT_RECIPE = 'v2:' + ','.join(CASE_TEXT_FIELDS)
+
+
+def sha256_file(path):
+    """
+    Stream a file through SHA-256
+
+    Args:
+        path (str): File to hash
+
+    Returns:
+        str: Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def compose_case_text(case):
+    """
+    Combine key case details into a single text representation
+
+    Args:
+        case (dict): Past case row
+
+    Returns:
+        str: Text that is fed to the embedding model
+    """
+    return " ".join(str(case.get(field, '')) for field in CASE_TEXT_FIELDS)
+
+
+class EmbeddingStore:
+    def __init__(self, model_name, recipe=CASE_TEXT_RECIPE, cache_dir=None):
+        """
+        Persistent store for past-case embedding matrices
+
+        Matrices are saved as .npy files named after a key derived from the
+        dataset content hash, the embedding model name and the text recipe,
+        so a rebuild only happens when one of those changes.
+
+        Args:
+            model_name (str): Name of the sentence transformer model
+            recipe (str): Identifier of the text composition recipe
+            cache_dir (str, optional): Directory for cached matrices
+        """
+        self.model_name = model_name
+        self.recipe = recipe
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.fingerprints_path = os.path.join(self.cache_dir, 'fingerprints.json')
+
+    def dataset_fingerprint(self, dataset_path):
+        """
+        Compute the SHA-256 of the dataset file
+
+        The digest is memoised against the file size and modification time,
+        so a warm start does not have to re-read a large CSV. Only the latest
+        entry per path is kept.
+
+        Args:
+            dataset_path (str): Path to the dataset file
+
+        Returns:
+            str: Hex digest of the dataset contents
+        """
+        stat = os.stat(dataset_path)
+        abs_path = os.path.abspath(dataset_path)
+        stat_key = f"{abs_path}:{stat.st_size}:{stat.st_mtime_ns}"
+
+        fingerprints = self._read_json(self.fingerprints_path) or {}
+        if stat_key in fingerprints:
+            return fingerprints[stat_key]
+
+        fingerprint = sha256_file(dataset_path)
+
+        # Only the latest size/mtime of a path can match again; drop the older entries
+        fingerprints = {
+            key: value for key, value in fingerprints.items()
+            if key.rsplit(':', 2)[0] != abs_path
+        }
+        fingerprints[stat_key] = fingerprint
+        self._write_json(self.fingerprints_path, fingerprints)
+        return fingerprint
+
+    def cache_key(self, dataset_path, version=''):
+        """
+        Build the cache key for a dataset
+
+        Args:
+            dataset_path (str): Path to the dataset file
+            version (str): Extra discriminator, e.g. the case store generation
+
+        Returns:
+            str: Key combining dataset hash, model name, recipe and version
+        """
+        key_source = "|".join([
+            self.dataset_fingerprint(dataset_path),
+            self.model_name,
+            self.recipe,
+            str(version)
+        ])
+        return hashlib.sha256(key_source.encode('utf-8')).hexdigest()[:32]
+
+    def artifact_prefix(self, dataset_path, version=''):
+        """
+        Path prefix for files derived from the same matrix (e.g. ANN indexes)
+
+        Args:
+            dataset_path (str): Path to the dataset file
+            version (str): Extra discriminator, e.g. the case store generation
+
+        Returns:
+            str or None: Prefix inside the cache directory, None if the dataset is missing
+        """
+        if not os.path.exists(dataset_path):
+            return None
+        return os.path.join(self.cache_dir, self.cache_key(dataset_path, version))
+
+    def load_or_build(self, dataset_path, build_fn, expected_rows=None, version=''):
+        """
+        Load the embedding matrix for a dataset, building it if needed
+
+        Args:
+            dataset_path (str): Path to the dataset file
+            build_fn (callable): Returns the embedding matrix when a rebuild is required
+            expected_rows (int, optional): Number of rows the matrix must have
+            version (str): Extra discriminator, e.g. the case store generation
+
+        Returns:
+            numpy.ndarray: Read-only, memory-mapped float32 embedding matrix
+        """
+        # Nothing to key on, so fall back to encoding in memory
+        if not os.path.exists(dataset_path):
+            return np.asarray(build_fn(), dtype=np.float32)
+
+        key = self.cache_key(dataset_path, version)
+        matrix_path = os.path.join(self.cache_dir, f"{key}.npy")
+
+        if os.path.exists(matrix_path):
+            try:
+                embeddings = np.load(matrix_path, mmap_mode='r')
+                if expected_rows is None or embeddings.shape[0] == expected_rows:
+                    print(f"Loaded cached embeddings: {matrix_path}")
+                    return embeddings
+                print(f"Cached embeddings have {embeddings.shape[0]} rows, expected {expected_rows}; rebuilding")
+            except (OSError, ValueError) as e:
+                print(f"Error loading cached embeddings: {e}")
+
+        embeddings = np.ascontiguousarray(build_fn(), dtype=np.float32)
+        self.save(key, embeddings, dataset_path)
+        return np.load(matrix_path, mmap_mode='r')
+
+    def append(self, dataset_path, embeddings, version=''):
+        """
+        Append rows to the matrix's append-only segment
+
+        Rows added after the matrix was built (e.g. ingested cases) are kept in
+        a raw float32 file next to it, so adding cases never rewrites the matrix.
+
+        Args:
+            dataset_path (str): Path to the dataset file
+            embeddings (numpy.ndarray): Rows to append
+            version (str): Extra discriminator, e.g. the case store generation
+        """
+        prefix = self.artifact_prefix(dataset_path, version)
+        if prefix is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(f"{prefix}.appended.f32", 'ab') as f:
+            f.write(np.ascontiguousarray(embeddings, dtype=np.float32).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load_appended(self, dataset_path, dim, version=''):
+        """
+        Load the rows appended after the matrix was built
+
+        Args:
+            dataset_path (str): Path to the dataset file
+            dim (int): Embedding dimension
+            version (str): Extra discriminator, e.g. the case store generation
+
+        Returns:
+            numpy.ndarray: Appended rows, shape (n, dim)
+        """
+        prefix = self.artifact_prefix(dataset_path, version)
+        path = f"{prefix}.appended.f32" if prefix else None
+        if not path or not dim or not os.path.exists(path):
+            return np.empty((0, dim), dtype=np.float32)
+
+        data = np.fromfile(path, dtype=np.float32)
+        # Ignore a torn trailing row from an interrupted append
+        rows = data.shape[0] // dim
+        return data[:rows * dim].reshape(rows, dim)
+
+    def remove(self, dataset_path, version=''):
+        """
+        Delete the matrix and every derived file for a dataset version
+
+        Args:
+            dataset_path (str): Path to the dataset file
+            version (str): Version whose files should be removed
+        """
+        prefix = self.artifact_prefix(dataset_path, version)
+        if prefix is None or not os.path.isdir(self.cache_dir):
+            return
+        key = os.path.basename(prefix)
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(f"{key}."):
+                os.unlink(os.path.join(self.cache_dir, name))
+
+    def save(self, key, embeddings, dataset_path=None):
+        """
+        Atomically write an embedding matrix and its metadata
+
+        Args:
+            key (str): Cache key
+            embeddings (numpy.ndarray): Matrix to persist
+            dataset_path (str, optional): Source dataset, recorded in metadata
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        matrix_path = os.path.join(self.cache_dir, f"{key}.npy")
+
+        # Write to a temporary file first so concurrent workers never see a partial matrix
+        tmp_path = f"{matrix_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, embeddings)
+        os.replace(tmp_path, matrix_path)
+
+        self._write_json(os.path.join(self.cache_dir, f"{key}.json"), {
+            "dataset_path": dataset_path,
+            "model_name": self.model_name,
+            "recipe": self.recipe,
+            "shape": list(embeddings.shape),
+            "dtype": str(embeddings.dtype)
+        })
+        print(f"Saved embeddings: {matrix_path}")
+
+    def _read_json(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_json(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
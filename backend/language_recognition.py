@@ -0,0 +1,185 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from vad_segmentation import SEGMENT_WORKERS
+
+# Languages tried for each recording, in order of preference
+RECOGNITION_LANGUAGES = [
+    lang.strip() for lang in os.environ.get('RECOGNITION_LANGUAGES', 'en-IN,hi-IN,en-US').split(',') if lang.strip()
+]
+
+# Send every language at once instead of one after another
+RECOGNITION_CONCURRENT = os.environ.get('RECOGNITION_CONCURRENT', '1') == '1'
+
+# 'confidence': wait for all and keep the most confident; 'first': the most preferred language
+# with text among those answering within RECOGNITION_PREFERENCE_WINDOW_SECONDS of the first
+RECOGNITION_STRATEGY = os.environ.get('RECOGNITION_STRATEGY', 'confidence')
+
+# How long 'first' waits for more preferred languages after a candidate returns text. Google
+# transcribes English audio under hi-IN too, so taking whichever answers first is a race.
+RECOGNITION_PREFERENCE_WINDOW_SECONDS = float(os.environ.get('RECOGNITION_PREFERENCE_WINDOW_SECONDS', 1.0))
+
+# Upper bound on the wait for the language candidates of one recording
+RECOGNITION_TIMEOUT_SECONDS = float(os.environ.get('RECOGNITION_TIMEOUT_SECONDS', 30))
+
+# Threads shared by all recordings: by default enough for every language of every chunk
+# of one segmented recording, so no chunk's candidates queue behind another chunk's
+RECOGNITION_WORKERS = int(os.environ.get(
+    'RECOGNITION_WORKERS',
+    SEGMENT_WORKERS * max(1, len(RECOGNITION_LANGUAGES))
+))
+
+
+class MultiLanguageRecognizer:
+    def __init__(self, languages=None, concurrent=RECOGNITION_CONCURRENT, strategy=RECOGNITION_STRATEGY,
+                 timeout=RECOGNITION_TIMEOUT_SECONDS, workers=RECOGNITION_WORKERS,
+                 preference_window=RECOGNITION_PREFERENCE_WINDOW_SECONDS):
+        """
+        Try a recording in several languages and keep the best transcription
+
+        Args:
+            languages (list, optional): Language codes in order of preference
+            concurrent (bool): Submit all languages in parallel on a thread pool
+            strategy (str): 'first' or 'confidence' (concurrent mode only)
+            timeout (float): Seconds to wait for the candidates
+            workers (int): Threads shared by all recordings
+            preference_window (float): Seconds 'first' waits for more preferred languages
+        """
+        if strategy not in ('first', 'confidence'):
+            raise ValueError(f"Unknown recognition strategy: {strategy}")
+        self.languages = list(languages or RECOGNITION_LANGUAGES)
+        self.concurrent = concurrent
+        self.strategy = strategy
+        self.timeout = timeout
+        self.preference_window = preference_window
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='recognition') if concurrent else None
+        self._lock = threading.Lock()
+        self._metrics = {
+            lang: {"attempts": 0, "transcribed": 0, "empty": 0, "errors": 0, "wins": 0, "cancelled": 0,
+                   "latencies": deque(maxlen=500)}
+            for lang in self.languages
+        }
+
+    def _attempt(self, recognize, audio, language):
+        start = time.monotonic()
+        outcome = 'errors'
+        try:
+            text, confidence = recognize(audio, language)
+            outcome = 'transcribed' if text and text.strip() else 'empty'
+            return text, confidence
+        finally:
+            with self._lock:
+                metrics = self._metrics[language]
+                metrics["attempts"] += 1
+                metrics[outcome] += 1
+                metrics["latencies"].append(time.monotonic() - start)
+
+    def _won(self, language):
+        with self._lock:
+            self._metrics[language]["wins"] += 1
+
+    def recognize(self, recognize, audio, fatal_errors=()):
+        """
+        Transcribe audio in the most confident (or most preferred) language that yields text
+
+        Args:
+            recognize (callable): (audio, language) -> (text, confidence or None);
+                may raise when the language yields nothing
+            audio: Recorded audio passed to recognize
+            fatal_errors (tuple): Exceptions that stop trying further languages
+                (e.g. the service being unreachable)
+
+        Returns:
+            tuple: (text, language), or (None, None) if no language produced text
+        """
+        if not self.concurrent:
+            for language in self.languages:
+                try:
+                    text, _ = self._attempt(recognize, audio, language)
+                except fatal_errors as e:
+                    print(f"Request error for {language}: {e}")
+                    break
+                except Exception:
+                    continue
+                if text and text.strip():
+                    self._won(language)
+                    return text, language
+            return None, None
+
+        futures = {self._executor.submit(self._attempt, recognize, audio, lang): lang for lang in self.languages}
+        order = {lang: i for i, lang in enumerate(self.languages)}
+        deadline = time.monotonic() + self.timeout
+        pending = set(futures)
+        best = None
+        window_end = None
+        try:
+            while pending:
+                wait_until = deadline if window_end is None else min(deadline, window_end)
+                done, pending = wait(pending, timeout=max(0.0, wait_until - time.monotonic()),
+                                     return_when=FIRST_COMPLETED)
+                if not done:
+                    if window_end is None or deadline < window_end:
+                        print(f"Recognition timed out after {self.timeout:g}s")
+                    break
+                fatal = False
+                for future in done:
+                    error = future.exception()
+                    if error is not None:
+                        if isinstance(error, fatal_errors):
+                            print(f"Request error for {futures[future]}: {error}")
+                            fatal = True
+                        continue
+                    text, confidence = future.result()
+                    if not text or not text.strip():
+                        continue
+                    language = futures[future]
+                    if self.strategy == 'first':
+                        rank = (-order[language],)
+                    else:
+                        # Ties go to the earlier language
+                        rank = (confidence if confidence is not None else 0.0, -order[language])
+                    if best is None or rank > best[0]:
+                        best = (rank, text, language)
+                if fatal:
+                    # The service is unreachable; the other languages would fail the same way
+                    break
+                if self.strategy == 'first' and best is not None:
+                    if not any(order[futures[future]] < order[best[2]] for future in pending):
+                        break
+                    if window_end is None:
+                        window_end = time.monotonic() + self.preference_window
+        finally:
+            # Queued candidates are dropped; requests already sent finish in the background
+            for future in pending:
+                if future.cancel():
+                    with self._lock:
+                        self._metrics[futures[future]]["cancelled"] += 1
+
+        if best is None:
+            return None, None
+        self._won(best[2])
+        return best[1], best[2]
+
+    def stats(self):
+        """
+        Per-language outcome counters and latency quantiles
+
+        Returns:
+            dict: Mode plus, per language, counters and p50/p95 latency in seconds
+        """
+        with self._lock:
+            languages = {}
+            for language, metrics in self._metrics.items():
+                samples = sorted(metrics["latencies"])
+                languages[language] = dict(
+                    {key: value for key, value in metrics.items() if key != "latencies"},
+                    latency_p50=round(samples[len(samples) // 2], 3) if samples else None,
+                    latency_p95=round(samples[min(len(samples) - 1, int(0.95 * len(samples)))], 3) if samples else None
+                )
+        return {
+            "concurrent": self.concurrent,
+            "strategy": self.strategy,
+            "languages": languages
+        }
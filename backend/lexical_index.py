@@ -0,0 +1,278 @@
+import os
+import re
+import unicodedata
+import numpy as np
+
+# BM25 parameters
+BM25_K1 = float(os.environ.get('BM25_K1', 1.2))
+BM25_B = float(os.environ.get('BM25_B', 0.75))
+
+# Lexical hits scoring below this fraction of the best hit are not fused into the results
+# (dense hits must pass the cosine threshold). Relative, because absolute BM25 scores grow
+# with corpus size and query length: one rare term such as a section number scores ~4 on
+# a few hundred cases but far more on a large corpus.
+BM25_RELATIVE_MIN_SCORE = float(os.environ.get('BM25_RELATIVE_MIN_SCORE', 0.5))
+
+# Latin/digit runs, or Devanagari runs including vowel signs and virama
+# (plain \w stops at combining marks and would split Hindi words apart).
+# The danda punctuation marks U+0964/U+0965 are excluded.
+_TOKEN = re.compile(r'[a-z0-9]+|[\u0900-\u0963\u0966-\u097f]+')
+
+# Function words dropped from queries; they match nearly every case and carry no signal
+STOPWORDS = frozenset("""
+a an the and or but if of to in on at by for from with without about into over under as is are was were be been
+being am do does did have has had having not no nor so than too very can could will would shall should may might
+must this that these those it its he she they them his her their i me my we our you your who whom which what when
+where why how all any some such only own same other also just there here then now again further once per via
+है हैं था थी थे का की के में और को से ने पर यह वह ये वो एक तो भी लिए कि नहीं हो रहा रही गया गई कर किया
+""".split())
+
+
+def tokenize(text):
+    """
+    Split text into lower-cased Latin/number and Devanagari tokens
+
+    "Section 138" becomes ['section', '138'] and Hindi words keep their matras.
+
+    Args:
+        text (str): Input text
+
+    Returns:
+        list: Tokens
+    """
+    text = unicodedata.normalize('NFC', str(text)).lower()
+    return _TOKEN.findall(text)
+
+
+def text_values(value):
+    """
+    The text of a nested structure's values, without its keys
+
+    Used to build lexical queries from the analysed key details, so field
+    names such as "primary_issues" do not become search terms.
+
+    Args:
+        value: String, number, list or dict
+
+    Returns:
+        str: Leaf values joined by spaces
+    """
+    if isinstance(value, dict):
+        return ' '.join(text_values(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return ' '.join(text_values(item) for item in value)
+    return '' if value is None else str(value)
+
+
+class BM25Index:
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        """
+        BM25 inverted index over case texts
+
+        Postings are stored in CSR form (term -> doc ids and precomputed BM25
+        weights), so a query is a handful of vectorised scatter-adds.
+
+        Args:
+            k1 (float): Term-frequency saturation
+            b (float): Document-length normalisation
+        """
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {}
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.doc_ids = np.empty(0, dtype=np.int32)
+        self.weights = np.empty(0, dtype=np.float32)
+        self.doc_count = 0
+        self.avg_doc_length = 0.0
+        # Postings of documents added after the build, scored with the build-time statistics
+        self.extra_postings = {}
+
+    def __len__(self):
+        return self.doc_count
+
+    def _term_weights(self, term_counts, doc_length, document_frequency):
+        idf = np.log(1.0 + (self.doc_count - document_frequency + 0.5) / (document_frequency + 0.5))
+        norm = self.k1 * (1.0 - self.b + self.b * doc_length / (self.avg_doc_length or 1.0))
+        return idf * term_counts * (self.k1 + 1.0) / (term_counts + norm)
+
+    def build(self, texts):
+        """
+        Build the index from every case text
+
+        Args:
+            texts (iterable): Case texts in row order
+        """
+        postings = {}
+        doc_lengths = []
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings.setdefault(token, []).append((doc_id, count))
+
+        self.doc_count = len(doc_lengths)
+        self.avg_doc_length = float(np.mean(doc_lengths)) if doc_lengths else 0.0
+        doc_lengths = np.asarray(doc_lengths, dtype=np.float32)
+
+        terms = sorted(postings)
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        indptr = [0]
+        doc_ids, weights = [], []
+        for term in terms:
+            ids = np.asarray([doc_id for doc_id, count in postings[term]], dtype=np.int32)
+            counts = np.asarray([count for doc_id, count in postings[term]], dtype=np.float32)
+            doc_ids.append(ids)
+            weights.append(self._term_weights(counts, doc_lengths[ids], ids.shape[0]).astype(np.float32))
+            indptr.append(indptr[-1] + ids.shape[0])
+
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.doc_ids = np.concatenate(doc_ids) if doc_ids else np.empty(0, dtype=np.int32)
+        self.weights = np.concatenate(weights) if weights else np.empty(0, dtype=np.float32)
+        self.extra_postings = {}
+
+    def add(self, texts):
+        """
+        Index documents appended after the build
+
+        IDF and average length are kept from the build; compaction rebuilds them.
+
+        Args:
+            texts (list): Texts of the new documents, in row order
+        """
+        for text in texts:
+            doc_id = self.doc_count
+            self.doc_count += 1
+            tokens = tokenize(text)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                term = self.vocabulary.get(token)
+                df = int(self.indptr[term + 1] - self.indptr[term]) if term is not None else 0
+                df += len(self.extra_postings.get(token, ())) + 1
+                weight = float(self._term_weights(np.float32(count), len(tokens), df))
+                # Replace rather than mutate so concurrent searches see whole lists
+                self.extra_postings[token] = self.extra_postings.get(token, []) + [(doc_id, weight)]
+
+    def search(self, query, k=50):
+        """
+        Top-k documents by BM25 score
+
+        Stopwords in the query are ignored.
+
+        Args:
+            query (str): Query text
+            k (int): Number of documents to return
+
+        Returns:
+            list: (doc id, score) tuples, best first
+        """
+        tokens = set(tokenize(query)) - STOPWORDS
+        if not tokens or not self.doc_count:
+            return []
+
+        scores = np.zeros(self.doc_count, dtype=np.float32)
+        for token in tokens:
+            term = self.vocabulary.get(token)
+            if term is not None:
+                start, end = self.indptr[term], self.indptr[term + 1]
+                scores[self.doc_ids[start:end]] += self.weights[start:end]
+            for doc_id, weight in self.extra_postings.get(token, ()):
+                if doc_id < scores.shape[0]:
+                    scores[doc_id] += weight
+
+        k = min(k, scores.shape[0])
+        candidates = np.argpartition(-scores, k - 1)[:k] if k < scores.shape[0] else np.arange(scores.shape[0])
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in candidates if scores[doc_id] > 0]
+
+    def save(self, path):
+        """
+        Atomically persist the built index (appended documents are not saved)
+
+        Args:
+            path (str): Destination .npz file
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        terms = np.asarray(sorted(self.vocabulary, key=self.vocabulary.get), dtype=str)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                terms=terms,
+                indptr=self.indptr,
+                doc_ids=self.doc_ids,
+                weights=self.weights,
+                stats=np.asarray([self.doc_count, self.avg_doc_length, self.k1, self.b], dtype=np.float64)
+            )
+        os.replace(tmp_path, path)
+        print(f"Saved BM25 index: {path}")
+
+    def load(self, path):
+        """
+        Load an index saved with save()
+
+        Args:
+            path (str): .npz file
+        """
+        with np.load(path, allow_pickle=False) as data:
+            self.vocabulary = {str(term): i for i, term in enumerate(data['terms'])}
+            self.indptr = data['indptr']
+            self.doc_ids = data['doc_ids']
+            self.weights = data['weights']
+            doc_count, self.avg_doc_length, self.k1, self.b = data['stats']
+        self.doc_count = int(doc_count)
+        self.extra_postings = {}
+        print(f"Loaded BM25 index: {path}")
+
+
+def load_or_build_bm25(texts_fn, expected_docs, index_prefix=None):
+    """
+    Load the persisted BM25 index, building it when missing or stale
+
+    Args:
+        texts_fn (callable): Returns the case texts when a build is required
+        expected_docs (int): Number of documents the index must cover
+        index_prefix (str, optional): Path prefix shared with the embedding matrix
+
+    Returns:
+        BM25Index: Index over the cases
+    """
+    index = BM25Index()
+    path = f"{index_prefix}.bm25-k{index.k1}-b{index.b}.npz" if index_prefix else None
+
+    if path and os.path.exists(path):
+        try:
+            index.load(path)
+            if len(index) == expected_docs:
+                return index
+            print(f"BM25 index has {len(index)} documents, expected {expected_docs}; rebuilding")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading BM25 index: {e}")
+        index = BM25Index()
+
+    index.build(texts_fn())
+    if path:
+        index.save(path)
+    return index
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Fuse ranked lists with reciprocal rank fusion
+
+    Args:
+        rankings (list): Lists of ids, each ordered best first
+        k (int): RRF damping constant
+
+    Returns:
+        list: (id, fused score) tuples, best first
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
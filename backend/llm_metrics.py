@@ -0,0 +1,246 @@
+import json
+import time
+import threading
+import contextvars
+
+# Histogram buckets (seconds) for request latency and time to first token
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+_HELP = {
+    'llm_calls_total': ('counter', 'LLM calls by outcome'),
+    'llm_retries_total': ('counter', 'Retried LLM attempts'),
+    'llm_prompt_tokens_total': ('counter', 'Prompt tokens reported by the provider'),
+    'llm_completion_tokens_total': ('counter', 'Completion tokens reported by the provider'),
+    'llm_json_parse_failures_total': ('counter', 'Completions that were not valid JSON'),
+    'llm_request_duration_seconds': ('histogram', 'LLM call latency including retries'),
+    'llm_time_to_first_token_seconds': ('histogram', 'Time to the first streamed token')
+}
+
+_current_summary = contextvars.ContextVar('llm_request_summary', default=None)
+
+
+def usage_tokens(usage):
+    """(prompt tokens, completion tokens) from a usage object or dict, None when missing"""
+    if usage is None:
+        return None, None
+    if isinstance(usage, dict):
+        return usage.get('prompt_tokens'), usage.get('completion_tokens')
+    return getattr(usage, 'prompt_tokens', None), getattr(usage, 'completion_tokens', None)
+
+
+class RequestSummary:
+    def __init__(self):
+        """LLM calls made while serving one HTTP request"""
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def add(self, call):
+        with self._lock:
+            self.calls.append(call)
+
+    def as_dict(self):
+        """
+        Totals and per-call details
+
+        Returns:
+            dict: Call count, tokens, retries, parse failures and LLM time
+        """
+        with self._lock:
+            calls = list(self.calls)
+        return {
+            "llm_calls": sum(1 for call in calls if 'outcome' in call),
+            "prompt_tokens": sum(call.get('prompt_tokens') or 0 for call in calls),
+            "completion_tokens": sum(call.get('completion_tokens') or 0 for call in calls),
+            "retries": sum(call.get('retries', 0) for call in calls),
+            "json_parse_failures": sum(1 for call in calls if call.get('json_parse_failure')),
+            "llm_seconds": round(sum(call.get('latency', 0) for call in calls), 3),
+            "calls": calls
+        }
+
+    def header_value(self):
+        """Compact form for a response header"""
+        summary = self.as_dict()
+        return (
+            f"calls={summary['llm_calls']};prompt_tokens={summary['prompt_tokens']};"
+            f"completion_tokens={summary['completion_tokens']};retries={summary['retries']};"
+            f"llm_ms={round(summary['llm_seconds'] * 1000)}"
+        )
+
+
+def begin_request_summary():
+    """Start collecting the LLM calls of the current request (or stream)"""
+    summary = RequestSummary()
+    _current_summary.set(summary)
+    return summary
+
+
+def current_request_summary():
+    """Summary of the current request, or None outside a request"""
+    return _current_summary.get()
+
+
+class LLMMetrics:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        Process-wide counters and histograms for LLM calls
+
+        Args:
+            buckets (tuple): Upper bounds of the latency histogram buckets
+        """
+        self.buckets = tuple(buckets)
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def _inc(self, name, labels, value=1):
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def _observe(self, name, labels, value):
+        key = (name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                histogram[0][i] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+    def record_call(self, kind, model, outcome, latency, retries=0, usage=None, ttft=None):
+        """
+        Record one LLM call (after its retries)
+
+        Args:
+            kind (str): What the call was for, e.g. 'understand_case'
+            model (str): Model name
+            outcome (str): 'ok', 'error', 'circuit_open' or 'deadline'
+            latency (float): Seconds from the first attempt to the end of the response
+            retries (int): Retried attempts
+            usage: Provider usage object or dict, if reported
+            ttft (float, optional): Seconds to the first streamed token
+        """
+        prompt_tokens, completion_tokens = usage_tokens(usage)
+        labels = (('kind', kind), ('model', model))
+        with self._lock:
+            self._inc('llm_calls_total', labels + (('outcome', outcome),))
+            if retries:
+                self._inc('llm_retries_total', labels, retries)
+            if prompt_tokens:
+                self._inc('llm_prompt_tokens_total', labels, prompt_tokens)
+            if completion_tokens:
+                self._inc('llm_completion_tokens_total', labels, completion_tokens)
+            self._observe('llm_request_duration_seconds', labels, latency)
+            if ttft is not None:
+                self._observe('llm_time_to_first_token_seconds', labels, ttft)
+
+        summary = current_request_summary()
+        if summary is not None:
+            call = {
+                "kind": kind,
+                "model": model,
+                "outcome": outcome,
+                "latency": round(latency, 3),
+                "retries": retries,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens
+            }
+            if ttft is not None:
+                call["ttft"] = round(ttft, 3)
+            summary.add(call)
+
+    def record_parse_failure(self, kind, model):
+        """Count a completion that could not be parsed as JSON"""
+        with self._lock:
+            self._inc('llm_json_parse_failures_total', (('kind', kind), ('model', model)))
+        summary = current_request_summary()
+        if summary is not None:
+            summary.add({"kind": kind, "model": model, "json_parse_failure": True})
+
+    def render_prometheus(self):
+        """
+        Prometheus text exposition of every metric
+
+        Returns:
+            str: Metrics in text format 0.0.4
+        """
+        def label_text(labels, extra=()):
+            pairs = [f'{key}="{str(value)}"' for key, value in labels + tuple(extra)]
+            return '{' + ','.join(pairs) + '}' if pairs else ''
+
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in _HELP.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == 'counter':
+                    for (metric, labels), value in sorted(self.counters.items()):
+                        if metric == name:
+                            lines.append(f"{name}{label_text(labels)} {value}")
+                    continue
+                for (metric, labels), (counts, total, count) in sorted(self.histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, bucket_count in zip(self.buckets, counts):
+                        lines.append(f"{name}_bucket{label_text(labels, [('le', bound)])} {bucket_count}")
+                    lines.append(f"{name}_bucket{label_text(labels, [('le', '+Inf')])} {count}")
+                    lines.append(f"{name}_sum{label_text(labels)} {round(total, 6)}")
+                    lines.append(f"{name}_count{label_text(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+# Shared by every LLM client wrapper in the process
+METRICS = LLMMetrics()
+
+
+def parse_completion_json(text, kind, model, metrics=METRICS):
+    """
+    json.loads that counts parse failures
+
+    Args:
+        text (str): Completion content
+        kind (str): What the call was for
+        model (str): Model name
+
+    Returns:
+        Parsed JSON
+
+    Raises:
+        json.JSONDecodeError: If the text is not valid JSON
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        metrics.record_parse_failure(kind, model)
+        raise
+
+
+class MeteredStream:
+    def __init__(self, stream, on_done, started_at):
+        """
+        Iterate a streamed completion while timing the first token and collecting usage
+
+        Args:
+            stream: Iterable of completion chunks
+            on_done (callable): Called with (outcome, latency, ttft, usage) when the stream ends
+            started_at (float): time.monotonic() when the request was sent
+        """
+        self.stream = stream
+        self.on_done = on_done
+        self.started_at = started_at
+
+    def __iter__(self):
+        ttft, usage, outcome = None, None, 'error'
+        try:
+            for chunk in self.stream:
+                choices = getattr(chunk, 'choices', None)
+                if ttft is None and choices and getattr(choices[0].delta, 'content', None):
+                    ttft = time.monotonic() - self.started_at
+                # Groq reports usage on the last chunk under x_groq; OpenAI on chunk.usage
+                chunk_usage = getattr(chunk, 'usage', None) or getattr(getattr(chunk, 'x_groq', None), 'usage', None)
+                if chunk_usage is not None:
+                    usage = chunk_usage
+                yield chunk
+            outcome = 'ok'
+        finally:
+            self.on_done(outcome, time.monotonic() - self.started_at, ttft, usage)
@@ -0,0 +1,74 @@
+import os
+
+try:
+    from groq import Groq
+except ImportError:
+    Groq = None
+
+try:
+    from openai import OpenAI
+except ImportError:
+    OpenAI = None
+
+from resilient_llm import LLM_CALL_TIMEOUT_SECONDS
+
+# Which backend serves chat completions: groq, openai (any OpenAI-compatible server) or mock
+LLM_PROVIDER = os.environ.get('LLM_PROVIDER', 'groq')
+
+# Optional endpoint override, e.g. a proxy or a self-hosted OpenAI-compatible server
+LLM_BASE_URL = os.environ.get('LLM_BASE_URL')
+
+# Model requested from the provider
+LLM_MODEL = os.environ.get('LLM_MODEL', 'deepseek-r1-distill-llama-70b')
+
+# Address of mock_llm_server.py for LLM_PROVIDER=mock
+LLM_MOCK_URL = os.environ.get('LLM_MOCK_URL', 'http://127.0.0.1:8008')
+
+
+def create_llm_client(api_key=None, provider=None, base_url=None):
+    """
+    Build the chat-completions client for the configured provider
+
+    Every provider returns an object with chat.completions.create, so callers
+    (and ResilientLLM) do not depend on a particular SDK. 'mock' points the
+    Groq SDK at the local mock server, which serves the same API.
+
+    The SDK's own retries are disabled: ResilientLLM owns retries, backoff
+    and circuit-breaker accounting, and SDK retries would multiply its
+    attempts while hiding failures from its counters.
+
+    Args:
+        api_key (str, optional): API key; defaults to GROQ_API_KEY / OPENAI_API_KEY
+        provider (str, optional): 'groq', 'openai' or 'mock'; defaults to LLM_PROVIDER
+        base_url (str, optional): Endpoint override; defaults to LLM_BASE_URL
+
+    Returns:
+        Client with chat.completions.create
+    """
+    provider = provider or LLM_PROVIDER
+    base_url = base_url or LLM_BASE_URL
+
+    if provider == 'mock':
+        provider, base_url, api_key = 'groq', base_url or LLM_MOCK_URL, api_key or 'mock'
+
+    if provider == 'groq':
+        if Groq is None:
+            raise ImportError("LLM_PROVIDER=groq requires the groq package")
+        return Groq(
+            api_key=api_key or os.environ.get('GROQ_API_KEY'),
+            base_url=base_url,
+            max_retries=0,
+            timeout=LLM_CALL_TIMEOUT_SECONDS
+        )
+
+    if provider == 'openai':
+        if OpenAI is None:
+            raise ImportError("LLM_PROVIDER=openai requires the openai package")
+        return OpenAI(
+            api_key=api_key or os.environ.get('OPENAI_API_KEY', 'none'),
+            base_url=base_url,
+            max_retries=0,
+            timeout=LLM_CALL_TIMEOUT_SECONDS
+        )
+
+    raise ValueError(f"Unknown LLM provider: {provider}")
@@ -3,15 +3,24 @@ import json
 import csv
 import sys
 import random
+import threading
 from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
-from groq import Groq
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import speech_recognition as sr
 import langdetect
 from dotenv import load_dotenv
+from case_ingest import build_case_retriever, store_version
+from case_store import load_case_store
+from embedding_batcher import EmbeddingBatcher
+from embedding_store import EmbeddingStore, compose_case_text
+from lexical_index import text_values
+from llm_metrics import begin_request_summary, parse_completion_json
+from llm_provider import LLM_MODEL, create_llm_client
+from resilient_llm import CircuitOpenError, ResilientLLM, degraded_response
+from retrieval import normalize_rows
+from ttl_cache import TTLCache, text_cache_key
 import argparse
 
 load_dotenv()
@@ -34,7 +43,10 @@ class ComprehensiveLegalAnalysisModel:
         """
         # Existing initialization
         self.api_key = os.environ.get('GROQ_API_KEY')
-        self.client = Groq(api_key=self.api_key)
+        self.client = create_llm_client(self.api_key)
+        
+        # Timeouts, retries, optional hedging and a circuit breaker around every completion
+        self.llm = ResilientLLM(self.client)
         
         # Case categories
         self.case_categories = [
@@ -48,45 +60,65 @@ class ComprehensiveLegalAnalysisModel:
         ]
         
         # Initialize embedding model
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedding_model_name = 'all-MiniLM-L6-v2'
+        self.embedding_model = SentenceTransformer(self.embedding_model_name)
+        self.embedding_store = EmbeddingStore(self.embedding_model_name)
+        
+        # Query embeddings from concurrent requests are encoded together in micro-batches
+        self.query_encoder = EmbeddingBatcher(self.embedding_model.encode)
+        
+        # Repeated queries skip the transformer and the similarity scan
+        self.embedding_cache = TTLCache()
+        self.similar_cases_cache = TTLCache()
         
         # Load past cases and generate embeddings
+        self.past_cases_path = os.path.join(os.path.dirname(__file__), 'train.csv')
         self.past_cases = self.load_past_cases()
         self.case_embeddings = self.generate_case_embeddings()
+        self.case_retriever = build_case_retriever(self, self.case_embeddings)
+        
+        # Held only while the past cases and their retriever are swapped together
+        self.case_swap_lock = threading.Lock()
     
     def generate_case_embeddings(self):
         """
         Generate embeddings for past cases
         
+        The matrix is persisted by the embedding store and only re-encoded when
+        the dataset, the embedding model or the text recipe changes. It covers
+        the cases written by the last conversion or compaction; cases ingested
+        since then are added by build_case_retriever.
+        
         Returns:
             numpy.ndarray: Embedding matrix for past cases
         """
-        # Combine relevant case details into a single text representation
-        case_texts = []
-        for case in self.past_cases:
-            # Combine key case details into a single text
-            case_text = " ".join([
-                str(case.get('category', '')),
-                str(case.get('description', '')),
-                str(case.get('key_details', '')),
-                str(case.get('outcome', ''))
-            ])
-            case_texts.append(case_text)
-        
-        # Generate embeddings
-        embeddings = self.embedding_model.encode(case_texts)
-        return embeddings
+        base_rows = getattr(self.past_cases, 'base_rows', len(self.past_cases))
+        
+        def encode_past_cases():
+            # Combine key case details into a single text per case
+            case_texts = [compose_case_text(self.past_cases[row]) for row in range(base_rows)]
+            return normalize_rows(self.embedding_model.encode(case_texts))
+        
+        return self.embedding_store.load_or_build(
+            self.past_cases_path,
+            encode_past_cases,
+            expected_rows=base_rows,
+            version=store_version(self.past_cases)
+        )
     
-    def find_similar_cases(self, case_category, key_details):
+    def find_similar_cases(self, case_category, key_details, k=3, threshold=0.5):
         """
         Find similar past legal cases using embedding similarity
         
         Args:
             case_category (str): Case category
             key_details (dict): Key details of the current case
+            k (int): Maximum number of similar cases to return
+            threshold (float): Minimum cosine similarity for a match (cases found
+                lexically must instead reach BM25_RELATIVE_MIN_SCORE of the best lexical hit)
         
         Returns:
-            list: List of similar past cases with similarity scores
+            list: List of similar past cases, most similar first
         """
         # Prepare the current case text for embedding
         current_case_text = " ".join([
@@ -94,58 +126,54 @@ class ComprehensiveLegalAnalysisModel:
             json.dumps(key_details)
         ])
         
-        # Generate embedding for the current case
-        current_case_embedding = self.embedding_model.encode([current_case_text])
+        # Identical queries (retries, re-sends, double submits) are answered from the cache
+        results_key = text_cache_key(current_case_text, k, threshold)
+        cached_cases = self.similar_cases_cache.get(results_key)
+        if cached_cases is not None:
+            return list(cached_cases)
         
-        # Calculate cosine similarities
-        similarities = cosine_similarity(current_case_embedding, self.case_embeddings)[0]
+        # Generate embedding for the current case (cached, and batched with concurrent requests)
+        current_case_embedding = self.embedding_cache.get_or_compute(
+            text_cache_key(current_case_text),
+            lambda: self.query_encoder.encode(current_case_text)
+        )
         
-        # Create a list of cases with their similarity scores
-        scored_cases = [
-            {
-                'case': case, 
-                'similarity_score': score
-            } 
-            for case, score in zip(self.past_cases, similarities)
-        ]
+        # Take a consistent view of the cases and their index (compaction swaps both)
+        with self.case_swap_lock:
+            past_cases, case_retriever = self.past_cases, self.case_retriever
         
-        # Sort cases by similarity score in descending order
-        sorted_cases = sorted(
-            scored_cases, 
-            key=lambda x: x['similarity_score'], 
-            reverse=True
+        # Score the cases of the same category (or all cases if the category is unknown)
+        # with one matrix-vector product and keep the top k
+        # Statute names and section numbers are also matched lexically (BM25) on the
+        # values of the key details (not their field names)
+        matches = case_retriever.search(
+            current_case_embedding,
+            category=case_category,
+            k=k,
+            threshold=threshold,
+            query_text=" ".join([case_category, text_values(key_details)])
         )
         
-        # Filter and return top 3 similar cases
-        filtered_cases = [
-            case['case'] for case in sorted_cases 
-            if case['similarity_score'] > 0.5  # Adjust threshold as needed
-        ][:3]
+        similar_cases = [past_cases[row] for row, score in matches]
+        self.similar_cases_cache.put(results_key, similar_cases)
         
-        return filtered_cases
+        return list(similar_cases)
     
     def load_past_cases(self):
         """
-        Load past legal cases from CSV with additional preprocessing
+        Load past legal cases from the columnar case store
+        
+        Only the id, category and outcome columns are held in memory; the other
+        columns are read lazily per case. train.csv is converted into the store
+        on first use (or after it changes).
         
         Returns:
-            list: List of past legal cases
+            Sequence: Past legal cases
         """
         try:
-            past_cases_path = os.path.join(os.path.dirname(__file__), 'train.csv')
-            with open(past_cases_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                cases = list(reader)
-                
-                # Preprocess cases
-                for case in cases:
-                    # Ensure all cases have a consistent structure
-                    case['description'] = case.get('description', '')
-                    case['key_details'] = case.get('key_details', '')
-                    case['outcome'] = case.get('outcome', '')
-                
-                print(f'Dataset loaded: {len(cases)} cases')
-                return cases
+            cases = load_case_store(self.past_cases_path)
+            print(f'Dataset loaded: {len(cases)} cases')
+            return cases
         except Exception as e:
             print(f"Error loading past cases: {e}")
             return []
@@ -286,8 +314,9 @@ class ComprehensiveLegalAnalysisModel:
         
         try:
             # Create completion using Groq's DeepSeek model
-            completion = self.client.chat.completions.create(
-                model="deepseek-r1-distill-llama-70b",
+            completion = self.llm.create(
+                metrics_kind='understand_case',
+                model=LLM_MODEL,
                 messages=messages,
                 response_format={"type": "json_object"},
                 temperature=0.6,
@@ -298,7 +327,7 @@ class ComprehensiveLegalAnalysisModel:
             
             # Extract and parse the response
             response_text = completion.choices[0].message.content
-            result = json.loads(response_text)
+            result = parse_completion_json(response_text, 'understand_case', LLM_MODEL)
 
             # Calculate risk probability based on similar cases
             # similar_cases = self.find_similar_cases(
@@ -317,6 +346,8 @@ class ComprehensiveLegalAnalysisModel:
             
             return result
         
+        except CircuitOpenError as e:
+            return degraded_response(e)
         except Exception as e:
             return {
                 "status": "error",
@@ -348,8 +379,9 @@ class ComprehensiveLegalAnalysisModel:
         
         try:
             # Create streaming completion
-            completion = self.client.chat.completions.create(
-                model="deepseek-r1-distill-llama-70b",
+            completion = self.llm.create(
+                metrics_kind='stream_case_understanding',
+                model=LLM_MODEL,
                 messages=messages,
                 temperature=0.6,
                 max_tokens=4096,
@@ -386,6 +418,8 @@ def main():
     # Initialize the legal analysis model
     legal_model = ComprehensiveLegalAnalysisModel()
     
+    llm_summary = begin_request_summary()
+    
     try:
         # Determine input method
         if args.text:
@@ -406,6 +440,7 @@ def main():
         # Verbose output
         if args.verbose:
             print(json.dumps(case_analysis, indent=4))
+            print(f"LLM usage: {llm_summary.header_value()}")
         
         return case_analysis
     
@@ -0,0 +1,252 @@
+import json
+import time
+import uuid
+import random
+import hashlib
+import argparse
+import threading
+from flask import Flask, Response, jsonify, request
+
+CASE_CATEGORIES = [
+    "Eviction",
+    "Wage Theft",
+    "Employment Discrimination",
+    "Contract Dispute",
+    "Consumer Rights",
+    "Family Law",
+    "Immigration"
+]
+
+# Keywords used to pick a plausible category; anything else is assigned by hash
+CATEGORY_KEYWORDS = {
+    "Eviction": ('evict', 'landlord', 'tenant', 'rent'),
+    "Wage Theft": ('wage', 'salary', 'unpaid', 'overtime'),
+    "Employment Discrimination": ('discriminat', 'harass', 'fired'),
+    "Contract Dispute": ('contract', 'agreement', 'breach'),
+    "Consumer Rights": ('refund', 'defective', 'consumer', 'product'),
+    "Family Law": ('divorce', 'custody', 'maintenance', 'dowry'),
+    "Immigration": ('visa', 'passport', 'immigration')
+}
+
+CASE_DURATIONS = {
+    "Wage Theft": 358,
+    "Employment Discrimination": 373,
+    "Eviction": 367,
+    "Contract Dispute": 367,
+    "Consumer Rights": 332,
+    "Family Law": 558,
+    "Immigration": 324
+}
+
+
+def pick_category(text):
+    lower = text.lower()
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        if any(keyword in lower for keyword in keywords):
+            return category
+    digest = hashlib.sha256(text.encode('utf-8')).digest()
+    return CASE_CATEGORIES[digest[0] % len(CASE_CATEGORIES)]
+
+
+def canned_analysis(category, description):
+    """Full analysis matching the understand_case output template"""
+    return {
+        "case_category": category,
+        "input_language": "en",
+        "key_details": {
+            "description": description[:300],
+            "primary_issues": [f"{category} dispute"],
+            "potential_violations": [f"Applicable {category.lower()} provisions"]
+        },
+        "preliminary_risk_assessment": {
+            "complexity": "Medium",
+            "potential_impact": "Moderate"
+        },
+        "recommended_next_steps": [
+            "Collect all related documents",
+            "Send a written notice to the other party",
+            "Consult a legal aid clinic"
+        ],
+        "step_by_step_guidance": {
+            "immediate_steps": ["Write down a timeline of events"],
+            "evidence_collection": ["Keep copies of messages, receipts and agreements"],
+            "legal_actions": ["File a complaint with the appropriate authority"],
+            "documentation": ["Identity proof", "Relevant agreements"],
+            "statute_of_limitations": "3 years",
+            "legal_resources": ["District Legal Services Authority"]
+        },
+        "legal_clauses": {
+            "statutes": [
+                {
+                    "name": f"Mock statute for {category}",
+                    "explanation": "Canned clause returned by the mock LLM server.",
+                    "relevance": "Deterministic placeholder for load tests."
+                }
+            ]
+        },
+        "case_duration": f"{CASE_DURATIONS[category]} days"
+    }
+
+
+def canned_response(messages):
+    """
+    Deterministic JSON answer shaped after the request's system prompt
+
+    Args:
+        messages (list): Chat messages of the request
+
+    Returns:
+        dict: Response object
+    """
+    system = next((m.get('content', '') for m in messages if m.get('role') == 'system'), '')
+    user = next((m.get('content', '') for m in reversed(messages) if m.get('role') == 'user'), '')
+    analysis = canned_analysis(pick_category(user), user)
+
+    wants = [key for key in analysis if f'"{key}"' in system]
+    if 'follow-up' in user.lower() or 'follow-up' in system.lower():
+        return {"messages": f"Mock answer to the follow-up question: {user[-200:]}"}
+    if wants:
+        return {key: analysis[key] for key in wants}
+    return analysis
+
+
+class LatencyModel:
+    def __init__(self, spec):
+        """
+        Latency distribution parsed from 'fixed:s', 'uniform:a,b' or 'lognormal:median,sigma'
+
+        Args:
+            spec (str): Distribution spec, in seconds
+        """
+        kind, _, args = spec.partition(':')
+        self.kind = kind
+        self.args = [float(arg) for arg in args.split(',')] if args else []
+        self._random = random.Random(0)
+        self._lock = threading.Lock()
+        if kind not in ('fixed', 'uniform', 'lognormal'):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self):
+        with self._lock:
+            if self.kind == 'fixed':
+                return self.args[0] if self.args else 0.0
+            if self.kind == 'uniform':
+                return self._random.uniform(*self.args)
+            median, sigma = self.args
+            return self._random.lognormvariate(0, sigma) * median
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def create_app(latency, tokens_per_second=0.0, error_rate=0.0, chunk_chars=16):
+    """
+    OpenAI-compatible mock chat-completions server
+
+    Serves /v1/chat/completions and Groq's /openai/v1/chat/completions with
+    canned JSON, sleeping according to the latency model (time to the first
+    token when streaming) and then tokens_per_second while streaming.
+
+    Args:
+        latency (LatencyModel): Response (or first-token) latency
+        tokens_per_second (float): Streaming speed; 0 sends chunks back to back
+        error_rate (float): Fraction of requests answered with HTTP 503
+        chunk_chars (int): Characters per streamed chunk
+
+    Returns:
+        Flask: The mock app
+    """
+    app = Flask(__name__)
+    failures = random.Random(1)
+    stats = {"requests": 0, "errors": 0}
+    # Requests are served on concurrent threads (threaded=True)
+    stats_lock = threading.Lock()
+
+    def completions():
+        body = request.get_json(force=True)
+        with stats_lock:
+            stats["requests"] += 1
+            failed = bool(error_rate) and failures.random() < error_rate
+            stats["errors"] += int(failed)
+        if failed:
+            return jsonify({"error": {"message": "Mock upstream failure", "type": "server_error"}}), 503
+
+        model = body.get('model', 'mock')
+        messages = body.get('messages', [])
+        content = json.dumps(canned_response(messages), ensure_ascii=False)
+        prompt_tokens = sum(estimate_tokens(m.get('content', '')) for m in messages)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": estimate_tokens(content),
+            "total_tokens": prompt_tokens + estimate_tokens(content)
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        time.sleep(latency.sample())
+
+        if not body.get('stream'):
+            return jsonify({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+
+        def chunk(delta, finish_reason=None, **extra):
+            return "data: " + json.dumps(dict({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }, **extra), ensure_ascii=False) + "\n\n"
+
+        def generate():
+            yield chunk({"role": "assistant", "content": ""})
+            for start in range(0, len(content), chunk_chars):
+                piece = content[start:start + chunk_chars]
+                if tokens_per_second:
+                    time.sleep(estimate_tokens(piece) / tokens_per_second)
+                yield chunk({"content": piece})
+            yield chunk({}, "stop", x_groq={"usage": usage}, usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return Response(generate(), mimetype='text/event-stream')
+
+    app.add_url_rule('/v1/chat/completions', 'completions', completions, methods=['POST'])
+    app.add_url_rule('/openai/v1/chat/completions', 'groq_completions', completions, methods=['POST'])
+    def stats_view():
+        with stats_lock:
+            return jsonify(dict(stats))
+
+    app.add_url_rule('/stats', 'stats', stats_view, methods=['GET'])
+    return app
+
+
+def main():
+    """
+    Run the mock server, e.g. for LLM_PROVIDER=mock load tests
+    """
+    parser = argparse.ArgumentParser(description='Deterministic OpenAI-compatible mock LLM server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8008)
+    parser.add_argument('--latency', default='lognormal:2.0,0.4',
+                        help="fixed:s | uniform:a,b | lognormal:median,sigma (seconds)")
+    parser.add_argument('--tokens-per-second', type=float, default=250.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    app = create_app(LatencyModel(args.latency), args.tokens_per_second, args.error_rate)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+import os
+import sys
+import json
+import time
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import vosk
+except ImportError:
+    vosk = None
+
+try:
+    from faster_whisper import WhisperModel
+except ImportError:
+    WhisperModel = None
+
+# Local speech-to-text engine: 'vosk', 'whisper', or empty to disable offline recognition
+OFFLINE_STT_ENGINE = os.environ.get('OFFLINE_STT_ENGINE', '').lower()
+
+# Vosk models per language, e.g. "hi-IN=/models/vosk-model-small-hi-0.22,en-IN=/models/vosk-model-small-en-in-0.4"
+VOSK_MODELS = os.environ.get('VOSK_MODELS', '')
+
+# Whisper-family model for faster-whisper, quantised to int8 for CPU inference
+WHISPER_MODEL = os.environ.get('WHISPER_MODEL', 'small')
+WHISPER_COMPUTE_TYPE = os.environ.get('WHISPER_COMPUTE_TYPE', 'int8')
+
+# Language hint for Whisper (e.g. 'hi'); empty lets the model detect it
+OFFLINE_STT_LANGUAGE = os.environ.get('OFFLINE_STT_LANGUAGE', '') or None
+
+# Worker processes, each holding its own copy of the models, and CPU threads per worker
+OFFLINE_STT_WORKERS = int(os.environ.get('OFFLINE_STT_WORKERS', 2))
+OFFLINE_STT_THREADS = int(os.environ.get('OFFLINE_STT_THREADS', max(1, (os.cpu_count() or 2) // 2)))
+
+OFFLINE_STT_TIMEOUT_SECONDS = float(os.environ.get('OFFLINE_STT_TIMEOUT_SECONDS', 120))
+
+# 'spawn' and 'forkserver' re-import the server's main module (and its models) in every
+# worker, so Linux forks the workers. Forking is only safe while the process is still
+# single-threaded, so the pool is started before the chatbot loads its models and threads.
+OFFLINE_STT_START_METHOD = os.environ.get(
+    'OFFLINE_STT_START_METHOD',
+    'fork' if sys.platform.startswith('linux') else 'spawn'
+)
+
+# Sample rate Whisper models are trained on; other rates are resampled in the worker
+WHISPER_SAMPLE_RATE = 16000
+
+# Bytes of PCM fed to Vosk per call (0.25s at 16 kHz, 16-bit)
+_VOSK_CHUNK_BYTES = 8000
+
+# Models of this worker process, loaded once by the pool initializer
+_worker = {}
+
+
+def parse_vosk_models(spec):
+    """
+    Language -> model path pairs from VOSK_MODELS
+
+    Args:
+        spec (str): Comma-separated language=path entries
+
+    Returns:
+        dict: Language code -> model directory
+    """
+    models = {}
+    for entry in spec.split(','):
+        language, _, path = entry.partition('=')
+        if language.strip() and path.strip():
+            models[language.strip()] = path.strip()
+    return models
+
+
+def _load_worker_models(engine, settings):
+    """Pool initializer: load the engine's models once for the life of the worker"""
+    _worker['engine'] = engine
+    if engine == 'vosk':
+        vosk.SetLogLevel(-1)
+        _worker['models'] = {language: vosk.Model(path) for language, path in settings['models'].items()}
+    else:
+        _worker['model'] = WhisperModel(
+            settings['model'],
+            device='cpu',
+            compute_type=settings['compute_type'],
+            cpu_threads=settings['threads']
+        )
+        _worker['language'] = settings['language']
+
+
+def _vosk_transcribe(pcm, sample_rate):
+    best = (None, None, -1.0)
+    for language, model in _worker['models'].items():
+        recognizer = vosk.KaldiRecognizer(model, sample_rate)
+        recognizer.SetWords(True)
+        for start in range(0, len(pcm), _VOSK_CHUNK_BYTES):
+            recognizer.AcceptWaveform(pcm[start:start + _VOSK_CHUNK_BYTES])
+        result = json.loads(recognizer.FinalResult())
+        words = result.get('result', [])
+        text = result.get('text', '').strip()
+        # Each language model transcribes everything; the one most sure of its words wins
+        confidence = sum(word.get('conf', 0.0) for word in words) / len(words) if words else 0.0
+        if text and confidence > best[2]:
+            best = (text, language, confidence)
+    return best[0], best[1]
+
+
+def _whisper_transcribe(pcm, sample_rate):
+    audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+    if sample_rate != WHISPER_SAMPLE_RATE:
+        # faster-whisper assumes 16 kHz samples; linear interpolation is enough for speech
+        positions = np.arange(0, len(audio), sample_rate / WHISPER_SAMPLE_RATE)
+        audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+    segments, info = _worker['model'].transcribe(
+        audio,
+        language=_worker['language'],
+        beam_size=1
+    )
+    text = ' '.join(segment.text.strip() for segment in segments).strip()
+    return text or None, info.language
+
+
+def _worker_ready():
+    return os.getpid()
+
+
+def _transcribe_in_worker(pcm, sample_rate):
+    """Runs in a worker process; returns (text, language, seconds)"""
+    start = time.monotonic()
+    if _worker['engine'] == 'vosk':
+        text, language = _vosk_transcribe(pcm, sample_rate)
+    else:
+        text, language = _whisper_transcribe(pcm, sample_rate)
+    return text, language, time.monotonic() - start
+
+
+class OfflineTranscriber:
+    def __init__(self, engine=OFFLINE_STT_ENGINE, workers=OFFLINE_STT_WORKERS, timeout=OFFLINE_STT_TIMEOUT_SECONDS):
+        """
+        CPU speech recognition in a process pool, with the models loaded once per worker
+
+        Inference is CPU bound, so it runs in separate processes rather than
+        threads. Each worker loads the models in its initializer and keeps
+        them for its lifetime. The pool only starts in start(), which must run
+        at startup before other threads exist when workers are forked; a
+        request never starts or replaces workers. If a worker dies, offline
+        recognition reports itself unavailable until restart().
+
+        Args:
+            engine (str): 'vosk' or 'whisper'; anything else disables the transcriber
+            workers (int): Worker processes
+            timeout (float): Seconds a transcription may take
+        """
+        self.engine = engine
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.settings = {
+            'models': parse_vosk_models(VOSK_MODELS),
+            'model': WHISPER_MODEL,
+            'compute_type': WHISPER_COMPUTE_TYPE,
+            'threads': OFFLINE_STT_THREADS,
+            'language': OFFLINE_STT_LANGUAGE
+        }
+        self.unavailable_reason = self._check_engine()
+        self.crash_reason = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self.transcriptions = 0
+        self.failures = 0
+        self.inference_seconds = 0.0
+
+    def _check_engine(self):
+        if self.engine == 'vosk':
+            if vosk is None:
+                return "OFFLINE_STT_ENGINE=vosk requires the vosk package"
+            if not self.settings['models']:
+                return "OFFLINE_STT_ENGINE=vosk requires VOSK_MODELS"
+            return None
+        if self.engine == 'whisper':
+            return None if WhisperModel is not None else "OFFLINE_STT_ENGINE=whisper requires the faster-whisper package"
+        return "Offline speech recognition is disabled (set OFFLINE_STT_ENGINE)"
+
+    @property
+    def available(self):
+        return self.unavailable_reason is None
+
+    def start(self):
+        """
+        Start the workers and wait for them to load their models
+
+        With the 'fork' start method this refuses to run once the process has
+        other threads: a forked child only inherits the calling thread, so a
+        lock held elsewhere (e.g. by a model loader) would never be released.
+
+        Returns:
+            bool: True if the engine is available and the workers are up
+        """
+        if not self.available:
+            return False
+        if OFFLINE_STT_START_METHOD == 'fork' and threading.active_count() > 1:
+            print("Offline speech recognition not started: workers cannot be forked safely "
+                  "once other threads are running; start it before the server loads its models")
+            return False
+
+        with self._lock:
+            if self._pool is not None:
+                return True
+            pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(OFFLINE_STT_START_METHOD),
+                initializer=_load_worker_models,
+                initargs=(self.engine, self.settings)
+            )
+        try:
+            # One task per worker, so every worker has loaded its models before the first request
+            for future in [pool.submit(_worker_ready) for _ in range(self.workers)]:
+                future.result(timeout=self.timeout)
+        except Exception as e:
+            pool.shutdown(wait=False, cancel_futures=True)
+            print(f"Offline speech recognition failed to start: {e}")
+            return False
+        with self._lock:
+            self._pool = pool
+            self.crash_reason = None
+        return True
+
+    def restart(self):
+        """
+        Replace a crashed pool with fresh workers
+
+        Subject to the same rule as start(): with 'fork' this only succeeds
+        while the process is single-threaded, otherwise restart the server.
+
+        Returns:
+            bool: True if the workers are up again
+        """
+        self.shutdown()
+        return self.start()
+
+    def transcribe_pcm(self, pcm, sample_rate):
+        """
+        Transcribe 16-bit mono PCM on the worker pool
+
+        Args:
+            pcm (bytes): Signed 16-bit little-endian mono PCM
+            sample_rate (int): Sample rate of the PCM
+
+        Returns:
+            tuple: (text, language)
+
+        Raises:
+            ValueError: If the engine is unavailable, fails, times out or hears nothing
+        """
+        if not self.available:
+            raise ValueError(self.unavailable_reason)
+        with self._lock:
+            pool = self._pool
+        if pool is None:
+            raise ValueError(self.crash_reason or "Offline speech recognition was not started")
+
+        try:
+            future = pool.submit(_transcribe_in_worker, pcm, sample_rate)
+            text, language, seconds = future.result(timeout=self.timeout)
+        except FuturesTimeout:
+            future.cancel()
+            self._count(failed=True)
+            raise ValueError(f"Offline transcription timed out after {self.timeout:g}s")
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory). Requests do not fork replacements;
+            # offline recognition stays down until restart() is called.
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+                    self.crash_reason = "Offline transcription worker crashed; restart required"
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._count(failed=True)
+            raise ValueError("Offline transcription worker crashed")
+
+        self._count(seconds=seconds if text else 0.0, failed=not text)
+        if not text:
+            raise ValueError("Offline transcription produced no text")
+        return text, language
+
+    def _count(self, seconds=0.0, failed=False):
+        with self._lock:
+            self.transcriptions += 1
+            self.failures += int(failed)
+            self.inference_seconds += seconds
+
+    def stats(self):
+        """
+        Engine configuration and counters
+
+        Returns:
+            dict: Engine, availability, worker count and transcription counters
+        """
+        with self._lock:
+            succeeded = self.transcriptions - self.failures
+            return {
+                "engine": self.engine or None,
+                "available": self.available,
+                "reason": self.unavailable_reason,
+                "workers": self.workers,
+                "started": self._pool is not None,
+                "crash": self.crash_reason,
+                "transcriptions": self.transcriptions,
+                "failures": self.failures,
+                "mean_inference_seconds": round(self.inference_seconds / succeeded, 3) if succeeded else None
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,61 @@
+import os
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from resilient_llm import LLM_CALL_TIMEOUT_SECONDS, set_call_deadline
+
+# Shared pool for independent LLM calls made while serving one request
+LLM_FANOUT_WORKERS = int(os.environ.get('LLM_FANOUT_WORKERS', 8))
+
+_executor = ThreadPoolExecutor(max_workers=LLM_FANOUT_WORKERS, thread_name_prefix='llm-fanout')
+
+
+def run_concurrently(calls, timeout=LLM_CALL_TIMEOUT_SECONDS):
+    """
+    Run independent calls on the shared pool and collect what finishes in time
+
+    A call that raises or misses the deadline yields an {"error": ...} dict,
+    the same shape the LLM helper methods return on failure, so callers can
+    return the sections that did complete. Each call runs in a copy of the
+    caller's context, so its LLM calls count towards the request summary,
+    and with the fan-out deadline as its LLM call deadline, so a section
+    that misses it stops retrying instead of running on in the background.
+
+    Args:
+        calls (dict): Name -> zero-argument callable
+        timeout (float): Seconds each call may take, counted from submission
+
+    Returns:
+        dict: Name -> result or error dict, in the order of calls
+    """
+    deadline = time.monotonic() + timeout
+
+    def run_before_deadline(fn):
+        set_call_deadline(deadline)
+        return fn()
+
+    futures = {
+        name: _executor.submit(contextvars.copy_context().run, run_before_deadline, fn)
+        for name, fn in calls.items()
+    }
+
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FuturesTimeout:
+            # Drops the call if it has not started; a running call ends at the client timeout
+            future.cancel()
+            print(f"{name} timed out after {timeout:g}s")
+            results[name] = {"error": f"Timed out after {timeout:g}s"}
+        except Exception as e:
+            results[name] = {"error": str(e)}
+    return results
+
+
+def failed_sections(results):
+    """Names of the results that are error dicts"""
+    return [
+        name for name, value in results.items()
+        if isinstance(value, dict) and set(value) == {"error"}
+    ]
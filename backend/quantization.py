@@ -0,0 +1,193 @@
+import os
+import numpy as np
+
+# Storage mode of the resident case matrix used for the first-pass scan
+EMBEDDING_STORAGE = os.environ.get('CASE_EMBEDDING_STORAGE', 'float32')
+
+# Target dimension for PCA storage
+PCA_DIM = int(os.environ.get('CASE_PCA_DIM', 128))
+
+# Rows converted back to float32 at a time while scanning, bounding scratch memory
+SCAN_CHUNK_ROWS = 8192
+
+# Rows used to fit the PCA projection
+PCA_FIT_ROWS = 50000
+
+
+def _chunked_scores(data, query, rows=None):
+    # Score a compact matrix (or selected rows of it) against a float32 query
+    # without materialising it as float32
+    count = data.shape[0] if rows is None else rows.shape[0]
+    scores = np.empty(count, dtype=np.float32)
+    for start in range(0, count, SCAN_CHUNK_ROWS):
+        if rows is None:
+            chunk = data[start:start + SCAN_CHUNK_ROWS]
+        else:
+            chunk = data[rows[start:start + SCAN_CHUNK_ROWS]]
+        scores[start:start + chunk.shape[0]] = chunk.astype(np.float32) @ query
+    return scores
+
+
+class Float16Matrix:
+    def __init__(self, matrix):
+        """
+        Half-precision copy of an embedding matrix
+
+        Args:
+            matrix (numpy.ndarray): Normalised float32 matrix
+        """
+        self.data = np.asarray(matrix, dtype=np.float16)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def score(self, query, rows=None):
+        """Approximate dot products of all (or the given) rows with a normalised float32 query"""
+        return _chunked_scores(self.data, query, rows)
+
+
+class Int8Matrix:
+    def __init__(self, matrix):
+        """
+        Symmetric per-dimension int8 scalar quantisation of an embedding matrix
+
+        Args:
+            matrix (numpy.ndarray): Normalised float32 matrix
+        """
+        matrix = np.asarray(matrix, dtype=np.float32)
+        max_abs = np.abs(matrix).max(axis=0) if matrix.shape[0] else np.ones(matrix.shape[1], dtype=np.float32)
+        self.scale = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+        self.data = np.clip(np.rint(matrix / self.scale), -127, 127).astype(np.int8)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.scale.nbytes
+
+    def score(self, query, rows=None):
+        """Approximate dot products of all (or the given) rows with a normalised float32 query"""
+        # Fold the per-dimension scale into the query instead of dequantising the matrix
+        return _chunked_scores(self.data, query * self.scale, rows)
+
+
+class PCAMatrix:
+    def __init__(self, matrix, dim=PCA_DIM):
+        """
+        PCA projection of an embedding matrix to fewer dimensions
+
+        The projection is fitted on (a sample of) the matrix itself. Rankings
+        ignore the constant mean term, which is the same for every row.
+
+        Args:
+            matrix (numpy.ndarray): Normalised float32 matrix
+            dim (int): Number of principal components kept
+        """
+        matrix = np.asarray(matrix, dtype=np.float32)
+        dim = max(1, min(dim, matrix.shape[1], matrix.shape[0]))
+
+        sample = matrix
+        if matrix.shape[0] > PCA_FIT_ROWS:
+            rows = np.random.default_rng(0).choice(matrix.shape[0], PCA_FIT_ROWS, replace=False)
+            sample = matrix[np.sort(rows)]
+
+        self.mean = sample.mean(axis=0).astype(np.float32)
+        _, _, vt = np.linalg.svd(sample - self.mean, full_matrices=False)
+        self.components = np.ascontiguousarray(vt[:dim], dtype=np.float32)
+
+        self.data = np.empty((matrix.shape[0], dim), dtype=np.float32)
+        for start in range(0, matrix.shape[0], SCAN_CHUNK_ROWS):
+            chunk = matrix[start:start + SCAN_CHUNK_ROWS]
+            self.data[start:start + chunk.shape[0]] = (chunk - self.mean) @ self.components.T
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.components.nbytes + self.mean.nbytes
+
+    def score(self, query, rows=None):
+        """Approximate dot products (up to a constant) of all (or the given) rows with a normalised float32 query"""
+        if rows is None:
+            return self.data @ (self.components @ query)
+        return _chunked_scores(self.data, self.components @ query, rows)
+
+
+def compress_matrix(matrix, storage=EMBEDDING_STORAGE, pca_dim=PCA_DIM):
+    """
+    Build the compact first-pass representation of a matrix
+
+    Args:
+        matrix (numpy.ndarray): Normalised float32 matrix
+        storage (str): 'float32', 'float16', 'int8' or 'pca'
+        pca_dim (int): Target dimension for 'pca'
+
+    Returns:
+        Compact matrix with score() and nbytes, or None for plain float32
+    """
+    if storage == 'float32' or matrix.shape[0] == 0:
+        return None
+    if storage == 'float16':
+        return Float16Matrix(matrix)
+    if storage == 'int8':
+        return Int8Matrix(matrix)
+    if storage == 'pca':
+        return PCAMatrix(matrix, pca_dim)
+    raise ValueError(f"Unknown embedding storage mode: {storage}")
+
+
+class CompressedSubset:
+    def __init__(self, base, rows):
+        """
+        Selected rows of another compact matrix, scored in place
+
+        Lets a category partition scan its rows of the global compact copy
+        instead of keeping a compact copy of its own.
+
+        Args:
+            base: Float16Matrix, Int8Matrix or PCAMatrix of the full matrix
+            rows (numpy.ndarray): Row numbers of the subset in base
+        """
+        self.base = base
+        self.rows = rows
+
+    @property
+    def nbytes(self):
+        # Only the row mapping; the compact data belongs to base
+        return self.rows.nbytes
+
+    def score(self, query):
+        """Approximate dot products of the subset's rows with a normalised float32 query"""
+        return self.base.score(query, self.rows)
+
+
+class RowSubset:
+    def __init__(self, base, rows):
+        """
+        Read-only view of selected rows of a (memory-mapped) matrix
+
+        Rows are only read when indexed or scored, so a partition searches
+        the global float32 matrix without keeping its own copy of its rows.
+
+        Args:
+            base (numpy.ndarray): Full matrix
+            rows (numpy.ndarray): Row numbers of the subset in base
+        """
+        self.base = base
+        self.rows = rows
+
+    @property
+    def shape(self):
+        return (self.rows.shape[0], self.base.shape[1])
+
+    def __getitem__(self, index):
+        return np.asarray(self.base[self.rows[index]])
+
+    def __array__(self, dtype=None, copy=None):
+        # Full materialisation, only for one-off builds (ANN graph, compact copies)
+        return np.asarray(self.base[self.rows], dtype=dtype)
+
+    def __matmul__(self, query):
+        # Gather and score a chunk of rows at a time, bounding scratch memory
+        scores = np.empty(self.rows.shape[0], dtype=np.float32)
+        for start in range(0, self.rows.shape[0], SCAN_CHUNK_ROWS):
+            chunk = self.rows[start:start + SCAN_CHUNK_ROWS]
+            scores[start:start + chunk.shape[0]] = np.asarray(self.base[chunk]) @ query
+        return scores
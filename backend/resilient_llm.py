@@ -0,0 +1,338 @@
+import os
+import time
+import random
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from llm_metrics import METRICS, MeteredStream
+
+# Per-request timeout passed to the client
+LLM_CALL_TIMEOUT_SECONDS = float(os.environ.get('LLM_CALL_TIMEOUT_SECONDS', 60))
+
+# Retries after a timeout, connection error, 429 or 5xx, with full-jitter exponential backoff
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 2))
+LLM_RETRY_BASE_SECONDS = float(os.environ.get('LLM_RETRY_BASE_SECONDS', 0.5))
+LLM_RETRY_MAX_SECONDS = float(os.environ.get('LLM_RETRY_MAX_SECONDS', 8))
+
+# Send a duplicate request when the first is slower than this quantile of recent latencies
+# of calls of the same metrics_kind
+LLM_HEDGE = os.environ.get('LLM_HEDGE', '0') == '1'
+LLM_HEDGE_QUANTILE = float(os.environ.get('LLM_HEDGE_QUANTILE', 0.95))
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.environ.get('LLM_HEDGE_MIN_DELAY_SECONDS', 2))
+LLM_HEDGE_MIN_SAMPLES = 20
+
+# Fail fast after this many consecutive failures, then probe again after the reset timeout
+LLM_BREAKER_FAILURES = int(os.environ.get('LLM_BREAKER_FAILURES', 5))
+LLM_BREAKER_RESET_SECONDS = float(os.environ.get('LLM_BREAKER_RESET_SECONDS', 30))
+
+_RETRYABLE_STATUS = {408, 409, 429}
+
+# Absolute time.monotonic() deadline for the LLM calls of the current context, if any
+_call_deadline = contextvars.ContextVar('llm_call_deadline', default=None)
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"LLM circuit breaker is open; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(TimeoutError):
+    def __init__(self):
+        super().__init__("LLM call deadline exceeded")
+
+
+def set_call_deadline(deadline):
+    """
+    Bound the LLM calls made in the current context by a deadline
+
+    ResilientLLM.create caps each request's timeout at the time left and
+    stops retrying once the deadline has passed, so work abandoned by a
+    caller (e.g. a timed-out fan-out section) does not keep spending quota.
+
+    Args:
+        deadline (float, optional): time.monotonic() deadline; None removes it
+    """
+    _call_deadline.set(deadline)
+
+
+def is_retryable(error):
+    """
+    Whether a failed LLM call is worth retrying
+
+    Timeouts and connection errors carry no HTTP status; rate limits and
+    server errors do. Other client errors (bad request, auth) are final.
+
+    Args:
+        error (Exception): Error raised by the client
+
+    Returns:
+        bool: True for transient failures
+    """
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        return not isinstance(error, (ValueError, TypeError))
+    return status in _RETRYABLE_STATUS or status >= 500
+
+
+def degraded_response(error):
+    """
+    Response returned instead of an analysis while the LLM is unavailable
+
+    Args:
+        error (CircuitOpenError): Error raised by the wrapper
+
+    Returns:
+        dict: Degraded response for the client
+    """
+    return {
+        "status": "degraded",
+        "message": "The legal analysis service is temporarily unavailable. Please try again shortly.",
+        "retry_after": round(error.retry_after)
+    }
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=LLM_BREAKER_FAILURES, reset_timeout=LLM_BREAKER_RESET_SECONDS):
+        """
+        Consecutive-failure circuit breaker
+
+        Closed: calls pass. Open: calls fail fast until reset_timeout has
+        passed. Half-open: a single trial call decides whether to close again.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (float): Seconds before a trial call is allowed
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Reserve a call
+
+        Raises:
+            CircuitOpenError: If the circuit is open (or its trial call is running)
+        """
+        with self._lock:
+            if self.state == 'closed':
+                return
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == 'open' and remaining <= 0:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            raise CircuitOpenError(max(remaining, 1.0))
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.times_opened += 1
+                    print(f"LLM circuit breaker opened after {self.failures} failures")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class ResilientLLM:
+    def __init__(self, client, timeout=LLM_CALL_TIMEOUT_SECONDS, max_retries=LLM_MAX_RETRIES,
+                 hedge=LLM_HEDGE, breaker=None, metrics=METRICS):
+        """
+        Timeouts, jittered retries, hedging and a circuit breaker around chat completions
+
+        Args:
+            client: Groq (or OpenAI-compatible) client
+            timeout (float): Per-request timeout in seconds
+            max_retries (int): Retries after a transient failure
+            hedge (bool): Send a duplicate request when the first one is slow
+            breaker (CircuitBreaker, optional): Breaker shared by the calls
+            metrics (LLMMetrics): Per-call latency and token accounting
+        """
+        self.client = client
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.hedge = hedge
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = metrics
+        # Completed non-streaming call latencies per metrics_kind: a long analysis and a
+        # short classification have different tails, so they never share a hedge delay
+        self.latencies = {}
+        self._executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='llm-hedge') if hedge else None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failures = 0
+
+    def hedge_delay(self, kind='chat'):
+        """
+        Seconds to wait before hedging a call
+
+        Args:
+            kind (str): metrics_kind of the call
+
+        Returns:
+            float: The configured quantile of recent latencies of that kind
+        """
+        with self._lock:
+            samples = list(self.latencies.get(kind, ()))
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return max(LLM_HEDGE_MIN_DELAY_SECONDS, self.timeout / 2)
+        samples.sort()
+        quantile = samples[min(len(samples) - 1, int(LLM_HEDGE_QUANTILE * len(samples)))]
+        return max(LLM_HEDGE_MIN_DELAY_SECONDS, quantile)
+
+    def create(self, **kwargs):
+        """
+        chat.completions.create with timeouts, retries, hedging and the circuit breaker
+
+        Streaming requests are retried only until the stream is opened and
+        are never hedged. Every call is recorded in the metrics under
+        metrics_kind; a stream is recorded once it has been consumed.
+
+        Args:
+            metrics_kind (str): What the call is for, e.g. 'understand_case'
+            **kwargs: Arguments for chat.completions.create
+
+        Returns:
+            Completion (or stream) from the client
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+            DeadlineExceededError: If the context's call deadline has passed
+            Exception: The last client error once retries are exhausted
+        """
+        kind = kwargs.pop('metrics_kind', 'chat')
+        model = kwargs.get('model', '')
+        timeout = kwargs.get('timeout', self.timeout)
+        deadline = _call_deadline.get()
+        with self._lock:
+            self.calls += 1
+
+        call_start = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            kwargs['timeout'] = timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.metrics.record_call(kind, model, 'deadline', time.monotonic() - call_start, attempt)
+                    raise DeadlineExceededError()
+                kwargs['timeout'] = min(timeout, remaining)
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self.metrics.record_call(kind, model, 'circuit_open', time.monotonic() - call_start, attempt)
+                raise
+            start = time.monotonic()
+            try:
+                if self.hedge and not kwargs.get('stream'):
+                    completion = self._hedged_call(kwargs, kind)
+                else:
+                    completion = self.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                with self._lock:
+                    self.failures += 1
+                if not is_retryable(e):
+                    # The service answered (e.g. a bad request), so it is not an outage
+                    self.breaker.record_success()
+                    self.metrics.record_call(kind, model, 'error', time.monotonic() - call_start, attempt)
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    self.metrics.record_call(kind, model, 'error', time.monotonic() - call_start, attempt)
+                    raise
+                # Full jitter spreads retries from many workers after a shared outage
+                backoff = random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+                if deadline is not None and time.monotonic() + backoff >= deadline:
+                    # No time left for another attempt within the caller's deadline
+                    self.metrics.record_call(kind, model, 'error', time.monotonic() - call_start, attempt)
+                    raise
+                print(f"LLM call failed ({e}); retry {attempt + 1}/{self.max_retries} in {backoff:.2f}s")
+                with self._lock:
+                    self.retries += 1
+                time.sleep(backoff)
+                continue
+
+            self.breaker.record_success()
+            if kwargs.get('stream'):
+                # Opening a stream is not comparable to a whole completion, so it is not sampled
+                def on_done(outcome, latency, ttft, usage, retries=attempt):
+                    self.metrics.record_call(kind, model, outcome, latency, retries, usage, ttft)
+                return MeteredStream(completion, on_done, call_start)
+            with self._lock:
+                self.latencies.setdefault(kind, deque(maxlen=500)).append(time.monotonic() - start)
+            self.metrics.record_call(kind, model, 'ok', time.monotonic() - call_start, attempt,
+                                     getattr(completion, 'usage', None))
+            return completion
+
+    def _hedged_call(self, kwargs, kind):
+        primary = self._executor.submit(self.client.chat.completions.create, **kwargs)
+        done, _ = wait([primary], timeout=self.hedge_delay(kind))
+        if done:
+            return primary.result()
+
+        with self._lock:
+            self.hedges += 1
+        hedge = self._executor.submit(self.client.chat.completions.create, **kwargs)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            # The client timeout bounds both requests, so this wait always ends
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    # The slower request cannot be cancelled and finishes in the background
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def stats(self):
+        """
+        Call, retry and hedge counters with the breaker state
+
+        Returns:
+            dict: Counters, and latency quantiles in seconds per metrics_kind
+        """
+        with self._lock:
+            samples_by_kind = {kind: sorted(samples) for kind, samples in self.latencies.items()}
+            stats = {
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins
+            }
+        stats.update({
+            "breaker_state": self.breaker.state,
+            "breaker_times_opened": self.breaker.times_opened,
+            "latency": {
+                kind: {
+                    "latency_p50": round(samples[len(samples) // 2], 3),
+                    "latency_p95": round(samples[min(len(samples) - 1, int(0.95 * len(samples)))], 3),
+                    "hedge_delay": round(self.hedge_delay(kind), 3) if self.hedge else None
+                }
+                for kind, samples in samples_by_kind.items() if samples
+            }
+        })
+        return stats
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from ttl_cache import text_cache_key
+
+# SQLite file holding cached LLM responses across restarts and worker processes
+DEFAULT_CACHE_PATH = os.environ.get(
+    'RESPONSE_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.response_cache.sqlite3')
+)
+
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE', '1') == '1'
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 10000))
+RESPONSE_CACHE_TTL_SECONDS = float(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    model TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+def response_cache_key(kind, input_text, model, params, system_prompt):
+    """
+    Cache key for one LLM request
+
+    The system prompt is hashed into the key, so editing a prompt (or the
+    context embedded in it) invalidates its entries without a manual purge.
+
+    Args:
+        kind (str): Kind of request, e.g. 'understand_case'
+        input_text (str): User input; normalised before hashing
+        model (str): Model name
+        params (dict): Sampling parameters
+        system_prompt (str): Full system prompt
+
+    Returns:
+        str: Hex digest
+    """
+    prompt_hash = hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()
+    return text_cache_key(kind, input_text, model, json.dumps(params, sort_keys=True), prompt_hash)
+
+
+class ResponseCache:
+    def __init__(self, path=None, max_entries=RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds=RESPONSE_CACHE_TTL_SECONDS):
+        """
+        Disk-backed LRU/TTL cache of parsed LLM responses
+
+        Entries live in a SQLite table shared by every process using the same
+        file. Expired entries are dropped on read and the least recently used
+        ones are evicted once the table exceeds max_entries. Cache errors are
+        logged and treated as misses so they never fail an analysis.
+
+        Args:
+            path (str, optional): SQLite database file
+            max_entries (int): Maximum number of cached responses
+            ttl_seconds (float): Lifetime of an entry; 0 or less disables expiry
+        """
+        self.path = path or DEFAULT_CACHE_PATH
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connection(self):
+        # SQLite connections cannot be shared between threads, so keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name, amount=1):
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def get(self, key):
+        """
+        Look up a cached response, refreshing its LRU position
+
+        Args:
+            key (str): Key from response_cache_key
+
+        Returns:
+            Cached response, or None on a miss
+        """
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                row = conn.execute('SELECT value, created_at FROM responses WHERE key = ?', (key,)).fetchone()
+                if row is not None and self.ttl_seconds > 0 and row[1] < now - self.ttl_seconds:
+                    conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                    row = None
+                if row is not None:
+                    conn.execute(
+                        'UPDATE responses SET accessed_at = ?, hits = hits + 1 WHERE key = ?',
+                        (now, key)
+                    )
+        except sqlite3.Error as e:
+            print(f"Response cache read failed: {e}")
+            row = None
+
+        if row is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return json.loads(row[0])
+
+    def put(self, key, kind, model, value):
+        """
+        Store a response, evicting the least recently used entries when full
+
+        Args:
+            key (str): Key from response_cache_key
+            kind (str): Kind of request, for stats and purges
+            model (str): Model that produced the response
+            value: JSON-serialisable response
+        """
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO responses (key, kind, model, value, created_at, accessed_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, kind, model, json.dumps(value, ensure_ascii=False), now, now)
+                )
+                evicted = conn.execute(
+                    'DELETE FROM responses WHERE key IN '
+                    '(SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                ).rowcount
+            if evicted > 0:
+                self._count('evictions', evicted)
+        except sqlite3.Error as e:
+            print(f"Response cache write failed: {e}")
+
+    def purge(self, kind=None, expired_only=False):
+        """
+        Delete cached responses
+
+        Args:
+            kind (str, optional): Only delete entries of this kind
+            expired_only (bool): Only delete entries past their TTL
+
+        Returns:
+            int: Number of deleted entries
+        """
+        clauses, args = [], []
+        if kind:
+            clauses.append('kind = ?')
+            args.append(kind)
+        if expired_only:
+            if self.ttl_seconds <= 0:
+                return 0
+            clauses.append('created_at < ?')
+            args.append(time.time() - self.ttl_seconds)
+
+        query = 'DELETE FROM responses'
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        with self._connection() as conn:
+            deleted = conn.execute(query, args).rowcount
+        print(f"Purged {deleted} cached responses")
+        return deleted
+
+    def stats(self):
+        """
+        Entry counts and this process's hit/miss counters
+
+        Returns:
+            dict: Counters and configuration
+        """
+        with self._connection() as conn:
+            by_kind = dict(conn.execute('SELECT kind, COUNT(*) FROM responses GROUP BY kind').fetchall())
+            stored_hits = conn.execute('SELECT COALESCE(SUM(hits), 0) FROM responses').fetchone()[0]
+
+        with self._counter_lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": sum(by_kind.values()),
+                "entries_by_kind": by_kind,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "size_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+                "evictions": self.evictions,
+                "hits_on_stored_entries": stored_hits
+            }
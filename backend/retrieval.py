@@ -0,0 +1,397 @@
+import os
+import hashlib
+import threading
+import numpy as np
+from ann_index import INDEX_BACKEND, load_or_build_index
+from lexical_index import BM25_RELATIVE_MIN_SCORE, reciprocal_rank_fusion
+from quantization import EMBEDDING_STORAGE, PCA_DIM, CompressedSubset, RowSubset, compress_matrix
+
+# Fuse BM25 with dense scores when a lexical index is attached and a query text is given
+HYBRID_RETRIEVAL = os.environ.get('HYBRID_RETRIEVAL', '1') == '1'
+
+# Candidates taken from each ranking before fusion, and the RRF damping constant
+HYBRID_CANDIDATES = int(os.environ.get('HYBRID_CANDIDATES', 50))
+RRF_K = int(os.environ.get('RRF_K', 60))
+
+# Shortlist re-scored in float32 after a compressed scan: max(minimum, factor * k)
+RESCORE_MIN_CANDIDATES = int(os.environ.get('RESCORE_MIN_CANDIDATES', 64))
+RESCORE_FACTOR = int(os.environ.get('RESCORE_FACTOR', 8))
+
+
+def normalize_rows(matrix):
+    """
+    L2-normalise the rows of an embedding matrix as float32
+
+    Matrices that are already unit-norm float32 (e.g. memory-mapped from the
+    embedding store) are returned as-is so no copy is made.
+
+    Args:
+        matrix (array-like): Embedding matrix of shape (n, dim)
+
+    Returns:
+        numpy.ndarray: Row-normalised float32 matrix
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1) if matrix.size else matrix.reshape(0, 0)
+    if matrix.size == 0:
+        return matrix
+
+    norms = np.linalg.norm(matrix, axis=1)
+    if np.allclose(norms, 1.0, atol=1e-3):
+        return matrix
+
+    norms[norms == 0] = 1.0
+    return matrix / norms[:, None]
+
+
+def normalize_category(category):
+    """Canonical form of a case category used as a partition key"""
+    return str(category or '').strip().lower()
+
+
+def partition_by_category(categories):
+    """
+    Group row numbers by case category
+
+    Args:
+        categories (iterable): Category of each row, in row order
+
+    Returns:
+        dict: Normalised category -> list of row numbers (ascending)
+    """
+    partitions = {}
+    for row, category in enumerate(categories):
+        partitions.setdefault(normalize_category(category), []).append(row)
+    return partitions
+
+
+def top_k_indices(scores, k):
+    """
+    Select the indices of the k highest scores, best first
+
+    Uses argpartition so only the k winners are sorted.
+
+    Args:
+        scores (numpy.ndarray): 1-D score vector
+        k (int): Number of indices to return
+
+    Returns:
+        numpy.ndarray: Indices ordered by descending score
+    """
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.shape[0])
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+class CaseRetriever:
+    def __init__(self, embeddings, index_prefix=None, backend=INDEX_BACKEND,
+                 storage=EMBEDDING_STORAGE, pca_dim=PCA_DIM, compressed=None, **index_params):
+        """
+        Cosine-similarity search over past-case embeddings
+
+        Large corpora are served from an HNSW index when one is available;
+        small ones (or backend='exact') use a vectorised brute-force scan.
+        With a compressed storage mode the scan runs over a float16, int8 or
+        PCA-reduced copy and only the shortlist is re-scored in float32, so
+        the float32 matrix can stay memory-mapped on disk.
+
+        Args:
+            embeddings (array-like): Embedding matrix for past cases
+            index_prefix (str, optional): Path prefix for the persisted ANN index
+            backend (str): 'auto', 'exact' or 'hnsw'
+            storage (str): 'float32', 'float16', 'int8' or 'pca' for the exact scan
+            pca_dim (int): Target dimension for storage='pca'
+            compressed (optional): Compact copy to scan instead of building one,
+                e.g. a CompressedSubset of the global retriever's copy
+            **index_params: ANN knobs (min_ann_rows, m, ef_construction, ef_search)
+        """
+        # Normalise once at load time so every query is a single dot product;
+        # a RowSubset of an already normalised matrix is searched in place
+        self.matrix = embeddings if isinstance(embeddings, RowSubset) else normalize_rows(embeddings)
+        self.ann_index = None
+        self.compressed = None
+        if self.matrix.shape[0]:
+            self.ann_index = load_or_build_index(self.matrix, index_prefix, backend, **index_params)
+            if self.ann_index is None:
+                self.compressed = compressed if compressed is not None else compress_matrix(self.matrix, storage, pca_dim)
+
+        # Rows added after load and rows deleted since load. Both are replaced
+        # (never mutated) on update so concurrent searches see a consistent view
+        self.appended = np.empty((0, self.matrix.shape[1]), dtype=np.float32)
+        self.deleted = frozenset()
+        self._write_lock = threading.Lock()
+
+    def __len__(self):
+        return self.matrix.shape[0] + self.appended.shape[0]
+
+    def vectors(self, rows):
+        """
+        Normalised embedding rows, whether loaded or appended
+
+        Args:
+            rows (array-like): Row numbers
+
+        Returns:
+            numpy.ndarray: Matrix of the requested rows
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        base_rows = self.matrix.shape[0]
+        if not self.appended.shape[0]:
+            return np.asarray(self.matrix[rows])
+        combined = np.empty((rows.shape[0], self.appended.shape[1]), dtype=np.float32)
+        in_base = rows < base_rows
+        combined[in_base] = self.matrix[rows[in_base]]
+        combined[~in_base] = self.appended[rows[~in_base] - base_rows]
+        return combined
+
+    def add(self, embeddings):
+        """
+        Append rows without rebuilding the index
+
+        Args:
+            embeddings (array-like): Rows to add
+
+        Returns:
+            int: Row number of the first added row
+        """
+        vectors = normalize_rows(embeddings)
+        with self._write_lock:
+            start = len(self)
+            if not vectors.shape[0]:
+                return start
+            if self.appended.shape[1] != vectors.shape[1]:
+                # First rows of an empty retriever define its dimension
+                self.matrix = np.empty((0, vectors.shape[1]), dtype=np.float32)
+                self.appended = np.empty((0, vectors.shape[1]), dtype=np.float32)
+            if self.ann_index is not None:
+                self.ann_index.add(vectors, start)
+            self.appended = np.vstack([self.appended, vectors])
+            return start
+
+    def delete(self, rows):
+        """
+        Exclude rows from future results
+
+        Args:
+            rows (iterable): Row numbers to delete
+        """
+        with self._write_lock:
+            self.deleted = self.deleted | frozenset(int(row) for row in rows)
+
+    def set_ef(self, ef_search):
+        """
+        Tune ANN recall against latency; a no-op for exact search
+
+        Args:
+            ef_search (int): HNSW candidate list size
+        """
+        if self.ann_index is not None:
+            self.ann_index.set_ef(ef_search)
+
+    def search(self, query_embedding, k=3, threshold=0.5, exact=False):
+        """
+        Find the rows most similar to a query embedding
+
+        Args:
+            query_embedding (array-like): Embedding of the current case
+            k (int): Maximum number of rows to return
+            threshold (float): Minimum cosine similarity for a row to be returned
+            exact (bool): Force brute-force search even when an ANN index exists
+
+        Returns:
+            list: (row index, similarity score) tuples, best first
+        """
+        # Snapshot the mutable state once so a concurrent update cannot tear this query
+        appended, deleted = self.appended, self.deleted
+        if self.matrix.shape[0] + appended.shape[0] == 0:
+            return []
+
+        query = normalize_rows(query_embedding)[0]
+
+        # Over-fetch by the number of tombstones so deletions never shrink the result
+        fetch = k + len(deleted)
+
+        if self.ann_index is not None and not exact:
+            rows, scores = self.ann_index.search(query, fetch)
+        else:
+            if self.compressed is not None:
+                # Shortlist from the compact copy, then re-score it in float32
+                rows = top_k_indices(self.compressed.score(query), max(RESCORE_MIN_CANDIDATES, RESCORE_FACTOR * fetch))
+                rows = np.sort(rows)
+                all_scores = np.asarray(self.matrix[rows]) @ query
+            else:
+                rows, all_scores = None, self.matrix @ query
+            if appended.shape[0]:
+                all_scores = np.concatenate([all_scores, appended @ query])
+                if rows is not None:
+                    rows = np.concatenate([rows, self.matrix.shape[0] + np.arange(appended.shape[0])])
+            order = top_k_indices(all_scores, fetch)
+            scores = all_scores[order]
+            rows = order if rows is None else rows[order]
+
+        matches = [
+            (int(row), float(score))
+            for row, score in zip(rows, scores)
+            if score > threshold and int(row) not in deleted
+        ]
+        return matches[:k]
+
+
+class PartitionedCaseRetriever:
+    def __init__(self, embeddings, categories, index_prefix=None, backend=INDEX_BACKEND, **index_params):
+        """
+        Case retriever with one sub-index per case category
+
+        Each category gets its own retriever (and ANN index when large enough)
+        plus the mapping from partition rows back to global row offsets, so a
+        query only scans cases of its own category. Partitions read their rows
+        from the global matrix through a RowSubset rather than copying them,
+        so a memory-mapped matrix stays on disk, and scan their rows of the
+        global compact copy (if any) rather than keeping their own.
+
+        Args:
+            embeddings (array-like): Embedding matrix for past cases
+            categories (list): Category of each past case, in row order
+            index_prefix (str, optional): Path prefix for persisted ANN indexes
+            backend (str): 'auto', 'exact' or 'hnsw'
+            **index_params: ANN knobs passed to every CaseRetriever
+        """
+        self.global_retriever = CaseRetriever(embeddings, index_prefix, backend, **index_params)
+
+        # Optional BM25 index over the same rows, attached by the caller
+        self.lexical_index = None
+        self.row_categories = [normalize_category(category) for category in categories]
+
+        self.partitions = {}
+        for category, rows in partition_by_category(categories).items():
+            rows = np.asarray(rows, dtype=np.int64)
+            partition_prefix = None
+            if index_prefix:
+                partition_prefix = f"{index_prefix}.cat-{hashlib.sha1(category.encode('utf-8')).hexdigest()[:10]}"
+            compressed = None
+            if self.global_retriever.compressed is not None:
+                compressed = CompressedSubset(self.global_retriever.compressed, rows)
+            retriever = CaseRetriever(RowSubset(self.global_retriever.matrix, rows), partition_prefix, backend,
+                                      compressed=compressed, **index_params)
+            self.partitions[category] = (rows, retriever)
+
+    def __len__(self):
+        return len(self.global_retriever)
+
+    def add(self, embeddings, categories, texts=None):
+        """
+        Append rows to the global index, their category partitions and the lexical index
+
+        Args:
+            embeddings (array-like): Rows to add
+            categories (list): Category of each added row
+            texts (list, optional): Case text of each added row, for the lexical index
+
+        Returns:
+            int: Global row number of the first added row
+        """
+        vectors = normalize_rows(embeddings)
+        self.row_categories.extend(normalize_category(category) for category in categories)
+        if self.lexical_index is not None and texts is not None:
+            self.lexical_index.add(texts)
+        start = self.global_retriever.add(vectors)
+
+        for category, offsets in partition_by_category(categories).items():
+            offsets = np.asarray(offsets, dtype=np.int64)
+            new_rows = start + offsets
+            partition = self.partitions.get(category)
+            if partition is None:
+                self.partitions[category] = (new_rows, CaseRetriever(vectors[offsets], backend='exact'))
+                continue
+            rows, retriever = partition
+            # Publish the extended row mapping before the rows become searchable
+            self.partitions[category] = (np.concatenate([rows, new_rows]), retriever)
+            retriever.add(vectors[offsets])
+
+        return start
+
+    def delete(self, rows):
+        """
+        Exclude global rows from future results
+
+        Args:
+            rows (iterable): Global row numbers to delete
+        """
+        rows = np.asarray(sorted(set(int(row) for row in rows)), dtype=np.int64)
+        self.global_retriever.delete(rows)
+
+        for partition_rows, retriever in self.partitions.values():
+            # Partition rows are ascending, so local positions can be found by bisection
+            positions = np.searchsorted(partition_rows, rows)
+            positions = positions[positions < partition_rows.shape[0]]
+            local = positions[np.isin(partition_rows[positions], rows)]
+            if local.shape[0]:
+                retriever.delete(local)
+
+    def set_ef(self, ef_search):
+        """Tune ANN recall against latency on every sub-index"""
+        self.global_retriever.set_ef(ef_search)
+        for rows, retriever in self.partitions.values():
+            retriever.set_ef(ef_search)
+
+    def search(self, query_embedding, category=None, k=3, threshold=0.5, exact=False, query_text=None):
+        """
+        Find similar rows within a category, or across all cases if the category is unknown
+
+        When a lexical index is attached and query_text is given, the dense
+        and BM25 rankings are combined with reciprocal rank fusion. Only rows
+        that pass the cosine threshold, or score at least BM25_RELATIVE_MIN_SCORE
+        of the best lexical hit, are fused, so weak lexical overlaps do not fill
+        up the k results.
+
+        Args:
+            query_embedding (array-like): Embedding of the current case
+            category (str, optional): Case category to restrict the search to
+            k (int): Maximum number of rows to return
+            threshold (float): Minimum cosine similarity for a dense match
+            exact (bool): Force brute-force search even when an ANN index exists
+            query_text (str, optional): Query for the lexical index
+
+        Returns:
+            list: (global row index, score) tuples, best first; the score is the
+                cosine similarity, or the fused RRF score for hybrid searches
+        """
+        category_key = normalize_category(category) if category else None
+        partition = self.partitions.get(category_key) if category_key else None
+        hybrid = HYBRID_RETRIEVAL and self.lexical_index is not None and bool(query_text)
+        fetch = max(k, HYBRID_CANDIDATES) if hybrid else k
+
+        if partition is None:
+            dense = self.global_retriever.search(query_embedding, k=fetch, threshold=threshold, exact=exact)
+        else:
+            rows, retriever = partition
+            dense = [
+                (int(rows[row]), score)
+                for row, score in retriever.search(query_embedding, k=fetch, threshold=threshold, exact=exact)
+            ]
+
+        if not hybrid:
+            return dense
+        return self._fuse(dense, query_text, category_key if partition is not None else None, k)
+
+    def _fuse(self, dense, query_text, category, k):
+        deleted = self.global_retriever.deleted
+        row_categories = self.row_categories
+
+        # Over-fetch lexical hits when they still have to be filtered to one category
+        fetch = HYBRID_CANDIDATES * (4 if category else 1) + len(deleted)
+        candidates = [
+            (row, score) for row, score in self.lexical_index.search(query_text, fetch)
+            if row not in deleted and row < len(row_categories)
+            and (category is None or row_categories[row] == category)
+        ]
+        floor = candidates[0][1] * BM25_RELATIVE_MIN_SCORE if candidates else 0.0
+        lexical = [row for row, score in candidates if score >= floor][:HYBRID_CANDIDATES]
+
+        return reciprocal_rank_fusion([[row for row, score in dense], lexical], k=RRF_K)[:k]
@@ -0,0 +1,151 @@
+import os
+import copy
+import time
+import threading
+import numpy as np
+from retrieval import normalize_rows
+
+# Opt-in: a hit serves an analysis produced for another user's description
+SEMANTIC_CACHE_ENABLED = os.environ.get('SEMANTIC_CACHE', '0') == '1'
+SEMANTIC_CACHE_SIZE = int(os.environ.get('SEMANTIC_CACHE_SIZE', 2000))
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get('SEMANTIC_CACHE_THRESHOLD', 0.92))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.environ.get('SEMANTIC_CACHE_TTL_SECONDS', 24 * 3600))
+
+# Add "cached" / "cache_similarity" to answers served from the cache
+SEMANTIC_CACHE_FLAG = os.environ.get('SEMANTIC_CACHE_FLAG', '1') == '1'
+
+# (section, field) pairs that restate the submitter's own facts; never cached
+USER_SPECIFIC_FIELDS = (('key_details', 'description'),)
+
+
+def shareable_analysis(analysis):
+    """
+    Copy of an analysis without the fields specific to the user who submitted it
+
+    Args:
+        analysis (dict): Case analysis
+
+    Returns:
+        dict: Analysis safe to serve for another user's description
+    """
+    shared = copy.deepcopy(analysis)
+    for section, field in USER_SPECIFIC_FIELDS:
+        if isinstance(shared.get(section), dict):
+            shared[section].pop(field, None)
+    return shared
+
+
+class SemanticCache:
+    def __init__(self, max_entries=SEMANTIC_CACHE_SIZE, threshold=SEMANTIC_CACHE_THRESHOLD,
+                 ttl_seconds=SEMANTIC_CACHE_TTL_SECONDS):
+        """
+        In-memory cache of answers looked up by embedding similarity
+
+        Embeddings live in a fixed-size float32 matrix, so a lookup is one
+        matrix-vector product. Entries carry a scope (model, parameters and
+        prompt) and only match queries of the same scope. When full, the
+        least recently used slot is overwritten.
+
+        Args:
+            max_entries (int): Maximum number of cached answers
+            threshold (float): Minimum cosine similarity for a hit
+            ttl_seconds (float): Lifetime of an entry; 0 or less disables expiry
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.matrix = None
+        self.values = [None] * self.max_entries
+        self.scopes = [None] * self.max_entries
+        self.created_at = np.zeros(self.max_entries)
+        self.used_at = np.full(self.max_entries, -np.inf)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return sum(value is not None for value in self.values)
+
+    def lookup(self, embedding, scope=''):
+        """
+        Find the most similar cached answer above the threshold
+
+        Args:
+            embedding (array-like): Query embedding
+            scope (str): Only entries stored with this scope can match
+
+        Returns:
+            tuple: (copy of the answer, similarity), or None on a miss
+        """
+        query = normalize_rows(embedding)[0]
+        now = time.time()
+        with self._lock:
+            if self.matrix is not None and self.matrix.shape[1] == query.shape[0]:
+                scores = self.matrix @ query
+                live = np.array([value is not None and s == scope for value, s in zip(self.values, self.scopes)])
+                if self.ttl_seconds > 0:
+                    live &= self.created_at > now - self.ttl_seconds
+                scores[~live] = -np.inf
+                slot = int(np.argmax(scores))
+                if scores[slot] >= self.threshold:
+                    self.used_at[slot] = now
+                    self.hits += 1
+                    return copy.deepcopy(self.values[slot]), float(scores[slot])
+            self.misses += 1
+            return None
+
+    def add(self, embedding, value, scope=''):
+        """
+        Cache an answer under its embedding
+
+        Args:
+            embedding (array-like): Embedding of the input that produced the answer
+            value: Answer to return for similar inputs
+            scope (str): Scope the entry can be matched in
+        """
+        vector = normalize_rows(embedding)[0]
+        now = time.time()
+        with self._lock:
+            if self.matrix is None or self.matrix.shape[1] != vector.shape[0]:
+                self.matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                self.values = [None] * self.max_entries
+                self.scopes = [None] * self.max_entries
+                self.used_at[:] = -np.inf
+
+            # Free slots have used_at = -inf, so they are taken before any eviction
+            slot = int(np.argmin(self.used_at))
+            if self.values[slot] is not None:
+                self.evictions += 1
+            self.matrix[slot] = vector
+            self.values[slot] = copy.deepcopy(value)
+            self.scopes[slot] = scope
+            self.created_at[slot] = now
+            self.used_at[slot] = now
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self.values = [None] * self.max_entries
+            self.scopes = [None] * self.max_entries
+            self.used_at[:] = -np.inf
+
+    def stats(self):
+        """
+        Hit/miss counters
+
+        Returns:
+            dict: Counters and configuration
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": sum(value is not None for value in self.values),
+                "max_size": self.max_entries,
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+                "evictions": self.evictions
+            }
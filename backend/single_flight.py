@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        Coalesce concurrent calls that share a key into one execution
+
+        The first caller for a key runs the function; callers arriving while
+        it is in flight wait for the same result (or exception). Nothing is
+        cached once the call completes.
+        """
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        Run fn for key, or wait for the call already in flight
+
+        Args:
+            key (str): Identity of the call
+            fn (callable): Zero-argument function producing the result
+
+        Returns:
+            tuple: (result, shared) where shared is True for callers that
+                waited on another caller's execution
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self):
+        """
+        Leader/follower counters
+
+        Returns:
+            dict: Counters and the number of calls in flight
+        """
+        with self._lock:
+            return {
+                "in_flight": len(self._in_flight),
+                "executions": self.leaders,
+                "coalesced": self.coalesced
+            }
@@ -0,0 +1,118 @@
+import json
+
+
+def format_sse_event(event, data):
+    """
+    Encode one server-sent event
+
+    Args:
+        event (str): Event name
+        data: JSON-serialisable payload
+
+    Returns:
+        str: SSE frame
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class JsonSectionParser:
+    def __init__(self):
+        """
+        Incremental parser for the top-level members of a streamed JSON object
+
+        Text is fed as it arrives and each top-level key is reported as soon
+        as its value is complete, without waiting for the rest of the object.
+        Anything before the opening brace (e.g. a reasoning preamble) is
+        skipped, and a missing comma between members is tolerated.
+        """
+        self.buffer = []
+        self.position = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.string_start = None
+        self.key = None
+        self.pending_key = None
+        self.value_start = None
+        self.finished = False
+
+    def feed(self, text):
+        """
+        Consume a chunk of model output
+
+        Args:
+            text (str): Next piece of the response
+
+        Returns:
+            list: (key, value) tuples for members completed by this chunk
+        """
+        completed = []
+        self.buffer.append(text)
+        for char in text:
+            if not self.finished:
+                self._consume(char, completed)
+            self.position += 1
+        return completed
+
+    def _text(self, start, end):
+        # Join lazily; members are usually completed a few times per response
+        joined = ''.join(self.buffer)
+        self.buffer = [joined]
+        return joined[start:end]
+
+    def _emit(self, end, completed):
+        raw = self._text(self.value_start, end)
+        try:
+            completed.append((self.key, json.loads(raw)))
+        except json.JSONDecodeError:
+            pass
+        self.key = None
+        self.value_start = None
+
+    def _consume(self, char, completed):
+        if self.in_string:
+            if self.escaped:
+                self.escaped = False
+            elif char == '\\':
+                self.escaped = True
+            elif char == '"':
+                self.in_string = False
+                if self.depth == 1 and self.key is None:
+                    # Closed a top-level key; its value starts after the colon
+                    self.pending_key = json.loads(self._text(self.string_start, self.position + 1))
+                elif self.depth == 1 and self.value_start == self.string_start:
+                    self._emit(self.position + 1, completed)
+            return
+
+        if self.depth == 0:
+            # Skip any preamble up to the opening brace of the object
+            if char == '{':
+                self.depth = 1
+            return
+
+        # A scalar value (number, true, false, null) ends at the first delimiter
+        if self.depth == 1 and self.value_start is not None and char in ',}\n\r\t ':
+            self._emit(self.position, completed)
+
+        if char == '"':
+            self.in_string = True
+            self.string_start = self.position
+            if self.depth == 1 and self.key is not None and self.value_start is None:
+                self.value_start = self.position
+        elif char in '{[':
+            if self.depth == 1 and self.key is not None and self.value_start is None:
+                self.value_start = self.position
+            self.depth += 1
+        elif char in '}]':
+            if self.depth == 0:
+                return
+            self.depth -= 1
+            if self.depth == 1 and self.value_start is not None:
+                self._emit(self.position + 1, completed)
+            elif self.depth == 0:
+                self.finished = True
+        elif char == ':' and self.depth == 1 and self.pending_key is not None:
+            self.key = self.pending_key
+            self.pending_key = None
+        elif self.depth == 1 and self.key is not None and self.value_start is None and not char.isspace():
+            self.value_start = self.position
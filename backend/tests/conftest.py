@@ -0,0 +1,86 @@
+import os
+import csv
+import sys
+import zlib
+import threading
+from types import SimpleNamespace
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from case_ingest import CaseIngestor, build_case_retriever, store_version
+from case_store import load_case_store
+from embedding_store import EmbeddingStore, compose_case_text
+from lexical_index import tokenize
+from retrieval import normalize_rows
+from ttl_cache import TTLCache
+
+SAMPLE_CASES = [
+    {"id": "c1", "category": "Criminal", "description": "Theft of a motorcycle from a parking lot",
+     "key_details": "Section 379 IPC theft", "outcome": "Convicted"},
+    {"id": "c2", "category": "Criminal", "description": "Cheque bounce after a loan repayment",
+     "key_details": "Section 138 Negotiable Instruments Act", "outcome": "Fined"},
+    {"id": "c3", "category": "Civil", "description": "Landlord refused to return the security deposit",
+     "key_details": "Rent agreement deposit refund", "outcome": "Refund ordered"},
+    {"id": "c4", "category": "Civil", "description": "Boundary wall dispute between neighbours",
+     "key_details": "Property survey encroachment", "outcome": "Settled"},
+    {"id": "c5", "category": "Family", "description": "Maintenance claim by a divorced wife",
+     "key_details": "Section 125 CrPC maintenance", "outcome": "Maintenance granted"},
+]
+
+
+class HashingEncoder:
+    """Deterministic bag-of-words encoder standing in for the sentence transformer"""
+
+    dim = 64
+
+    def encode(self, texts):
+        if isinstance(texts, str):
+            return self.encode([texts])[0]
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                vectors[row, zlib.crc32(token.encode('utf-8')) % self.dim] += 1.0
+        return vectors + 1e-3
+
+
+def write_cases_csv(path, cases):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(cases[0]))
+        writer.writeheader()
+        writer.writerows(cases)
+    return str(path)
+
+
+@pytest.fixture
+def cases_csv(tmp_path):
+    return write_cases_csv(tmp_path / 'train.csv', SAMPLE_CASES)
+
+
+@pytest.fixture
+def chatbot(tmp_path, cases_csv, monkeypatch):
+    """Just the retrieval state of LegalAnalysisChatbot, built over SAMPLE_CASES"""
+    # Compaction only when a test asks for it, not in a background thread
+    monkeypatch.setattr('case_ingest.COMPACT_TOMBSTONE_RATIO', 2.0)
+    encoder = HashingEncoder()
+    bot = SimpleNamespace(
+        embedding_model=encoder,
+        embedding_store=EmbeddingStore('hashing-encoder', cache_dir=str(tmp_path / 'embeddings')),
+        similar_cases_cache=TTLCache(),
+        case_swap_lock=threading.Lock(),
+        past_cases_path=cases_csv,
+        past_cases=load_case_store(cases_csv, str(tmp_path / 'stores'))
+    )
+    bot.case_embeddings = bot.embedding_store.load_or_build(
+        cases_csv,
+        lambda: normalize_rows(encoder.encode([compose_case_text(case) for case in bot.past_cases])),
+        expected_rows=bot.past_cases.base_rows,
+        version=store_version(bot.past_cases)
+    )
+    bot.case_retriever = build_case_retriever(bot, bot.case_embeddings)
+    bot.case_ingestor = CaseIngestor(bot)
+    bot.add_past_cases = bot.case_ingestor.add_cases
+    bot.remove_past_cases = bot.case_ingestor.remove_cases
+    bot.compact_past_cases = bot.case_ingestor.compact
+    return bot
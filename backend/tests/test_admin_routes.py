@@ -0,0 +1,99 @@
+import pytest
+
+ADMIN_TOKEN = 'test-admin-token'
+AUTH = {'Authorization': f'Bearer {ADMIN_TOKEN}'}
+
+
+def live_ids(chatbot):
+    store = chatbot.past_cases
+    return [case_id for row, case_id in enumerate(store.column('id')) if row not in store.tombstones]
+
+
+def test_ingestor_add_delete_compact(chatbot):
+    ids = chatbot.add_past_cases([
+        {"category": "Criminal", "description": "Forged signature on a sale deed", "key_details": "Section 467 IPC"}
+    ])
+    assert len(ids) == 1
+    assert live_ids(chatbot)[-1] == ids[0]
+    row = chatbot.past_cases.row_for_id(ids[0])
+    assert chatbot.past_cases[row]['description'] == "Forged signature on a sale deed"
+
+    query = chatbot.embedding_model.encode("forged signature sale deed section 467")
+    assert chatbot.case_retriever.search(query, category='Criminal', k=1, threshold=0.0)[0][0] == row
+
+    result = chatbot.remove_past_cases(['c2', 'missing'])
+    assert result == {"deleted": ['c2'], "not_found": ['missing']}
+    assert 'c2' not in live_ids(chatbot)
+
+    result = chatbot.compact_past_cases()
+    assert result["rows_after"] == len(live_ids(chatbot)) == 5
+    assert chatbot.past_cases.tombstones == frozenset()
+    assert chatbot.past_cases.row_for_id('c2') is None
+    assert chatbot.past_cases[chatbot.past_cases.row_for_id(ids[0])]['key_details'] == "Section 467 IPC"
+
+
+@pytest.fixture
+def client(chatbot, monkeypatch):
+    flask = pytest.importorskip('flask')
+    from admin_routes import create_admin_blueprint
+
+    monkeypatch.setenv('ADMIN_TOKEN', ADMIN_TOKEN)
+    app = flask.Flask(__name__)
+    app.register_blueprint(create_admin_blueprint(chatbot))
+    return app.test_client()
+
+
+def test_admin_routes_disabled_without_token(client, monkeypatch):
+    monkeypatch.delenv('ADMIN_TOKEN')
+    assert client.post('/admin/cases/compact', headers=AUTH).status_code == 404
+
+
+def test_admin_routes_reject_wrong_token(client):
+    assert client.post('/admin/cases/compact').status_code == 401
+    assert client.post('/admin/cases/compact', headers={'X-Admin-Token': 'wrong'}).status_code == 401
+
+
+def test_add_cases_route(client, chatbot):
+    response = client.post('/admin/cases', headers=AUTH, json={
+        "cases": [{"category": "Civil", "description": "Unpaid invoice for delivered goods"}]
+    })
+    assert response.status_code == 200
+    assert response.get_json()["ids"] == live_ids(chatbot)[-1:]
+
+    assert client.post('/admin/cases', headers=AUTH, data='not json').status_code == 400
+    assert client.post('/admin/cases', headers=AUTH, json={"cases": []}).status_code == 400
+    assert client.post('/admin/cases', headers=AUTH, json={"cases": [{"category": "Civil"}]}).status_code == 400
+
+
+def test_remove_cases_route(client, chatbot):
+    response = client.delete('/admin/cases', headers=AUTH, json={"ids": ['c1']})
+    assert response.status_code == 200
+    assert response.get_json()["deleted"] == ['c1']
+    assert 'c1' not in live_ids(chatbot)
+
+    assert client.delete('/admin/cases', headers=AUTH, data='[').status_code == 400
+    assert client.delete('/admin/cases', headers=AUTH, json={}).status_code == 400
+
+
+def test_compact_route(client, chatbot):
+    client.delete('/admin/cases', headers=AUTH, json={"ids": ['c1', 'c3']})
+    response = client.post('/admin/cases/compact', headers=AUTH)
+    assert response.status_code == 200
+    assert response.get_json()["rows_after"] == 3
+    assert len(chatbot.past_cases) == 3
+
+
+def test_response_cache_routes_require_token(client, chatbot, tmp_path):
+    from response_cache import ResponseCache
+
+    chatbot.response_cache = ResponseCache(str(tmp_path / 'responses.sqlite3'))
+    chatbot.response_cache.put('key', 'understand_case', 'model', {"answer": 1})
+
+    assert client.get('/admin/response-cache').status_code == 401
+    assert client.delete('/admin/response-cache').status_code == 401
+    assert chatbot.response_cache.get('key') == {"answer": 1}
+
+    assert client.get('/admin/response-cache', headers=AUTH).status_code == 200
+    response = client.delete('/admin/response-cache', headers=AUTH)
+    assert response.get_json()["deleted"] == 1
+    assert chatbot.response_cache.get('key') is None
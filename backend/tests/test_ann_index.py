@@ -0,0 +1,78 @@
+import threading
+import numpy as np
+import pytest
+from ann_index import HNSWIndex, ReadWriteLock
+
+pytest.importorskip('hnswlib')
+
+
+def unit_rows(rng, rows, dim=16):
+    matrix = rng.normal(size=(rows, dim)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def test_searches_stay_valid_while_rows_are_added():
+    rng = np.random.default_rng(0)
+    base = unit_rows(rng, 200)
+    index = HNSWIndex(16, ef_search=32)
+    index.build(base)
+
+    batches = [unit_rows(rng, 50) for _ in range(40)]
+    errors = []
+    done = threading.Event()
+
+    def search():
+        local = np.random.default_rng(threading.get_ident() % 1000)
+        while not done.is_set():
+            try:
+                k = int(local.integers(1, 80))
+                rows, scores = index.search(base[int(local.integers(0, 200))], k)
+                assert len(rows) == k and rows.min() >= 0 and rows.max() < len(index)
+                index.set_ef(int(local.integers(32, 96)))
+            except Exception as e:
+                errors.append(e)
+                return
+
+    searchers = [threading.Thread(target=search) for _ in range(4)]
+    for thread in searchers:
+        thread.start()
+    start = base.shape[0]
+    for batch in batches:
+        index.add(batch, start)
+        start += batch.shape[0]
+    done.set()
+    for thread in searchers:
+        thread.join()
+
+    assert not errors
+    assert len(index) == 200 + 40 * 50
+    rows, scores = index.search(batches[-1][0], 1)
+    assert rows[0] == start - 50
+
+
+def test_read_write_lock_excludes_readers_from_writes():
+    lock = ReadWriteLock()
+    state = {"readers": 0, "violations": 0}
+    guard = threading.Lock()
+
+    def reader():
+        for _ in range(200):
+            with lock.read():
+                with guard:
+                    state["readers"] += 1
+                with guard:
+                    state["readers"] -= 1
+
+    def writer():
+        for _ in range(200):
+            with lock.write():
+                with guard:
+                    if state["readers"]:
+                        state["violations"] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(3)] + [threading.Thread(target=writer)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert state["violations"] == 0
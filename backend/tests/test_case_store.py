@@ -0,0 +1,74 @@
+import os
+import pytest
+import case_store
+from case_store import CaseStore, load_case_store
+
+NEW_CASE = {"category": "Civil", "description": "Unpaid invoice for delivered goods", "outcome": "Decreed"}
+
+
+def test_appended_rows_survive_reopen(cases_csv, tmp_path):
+    store = load_case_store(cases_csv, str(tmp_path / 'stores'))
+    rows = store.append([dict(NEW_CASE, id='n1'), dict(NEW_CASE, id='n2', description='Second')])
+    assert rows == [5, 6]
+
+    reopened = CaseStore(store.store_dir)
+    assert len(reopened) == 7
+    assert reopened.column('id')[-2:] == ['n1', 'n2']
+    assert reopened[6]['description'] == 'Second'
+    assert reopened[0]['description'] == store[0]['description']
+
+
+def test_append_interrupted_before_commit_is_invisible(cases_csv, tmp_path, monkeypatch):
+    store = load_case_store(cases_csv, str(tmp_path / 'stores'))
+    store.append([dict(NEW_CASE, id='kept')])
+
+    def crash(path, data, **kwargs):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(case_store, '_write_json', crash)
+        with pytest.raises(OSError):
+            store.append([dict(NEW_CASE, id='lost', description='x' * 500)])
+
+    # Same process: the failed rows were never published
+    assert len(store) == 6
+    assert store.row_for_id('lost') is None
+
+    # A fresh process sees only committed rows and can append after them
+    reopened = CaseStore(store.store_dir)
+    assert len(reopened) == 6
+    assert reopened.column('id')[-1] == 'kept'
+    [row] = reopened.append([dict(NEW_CASE, id='next', description='After the crash')])
+    assert reopened[row]['description'] == 'After the crash'
+    assert reopened[row]['id'] == 'next'
+
+    again = CaseStore(store.store_dir)
+    assert again.column('id')[-2:] == ['kept', 'next']
+    assert again[row]['description'] == 'After the crash'
+
+
+def test_compact_keeps_appended_rows(cases_csv, tmp_path):
+    store = load_case_store(cases_csv, str(tmp_path / 'stores'))
+    store.append([dict(NEW_CASE, id='n1')])
+    store.delete([store.row_for_id('c1')])
+
+    compacted, kept_rows = store.compact()
+    assert kept_rows == [1, 2, 3, 4, 5]
+    assert compacted.column('id') == ['c2', 'c3', 'c4', 'c5', 'n1']
+    assert compacted[4]['description'] == NEW_CASE['description']
+    assert compacted.base_rows == 5
+
+
+def test_compact_keeps_old_generation_until_next_load(cases_csv, tmp_path):
+    store = load_case_store(cases_csv, str(tmp_path / 'stores'))
+    store.append([dict(NEW_CASE, id='n1')])
+    store.delete([0])
+    compacted, _ = store.compact()
+
+    # The old store is still readable after the switch
+    assert store[1]['description'] == compacted[0]['description']
+    assert os.path.exists(os.path.join(store.store_dir, 'records-0.bin'))
+
+    reloaded = load_case_store(cases_csv, str(tmp_path / 'stores'))
+    assert reloaded.generation == 1
+    assert sorted(os.listdir(store.store_dir)) == ['meta.json', 'offsets-1.npy', 'records-1.bin', 'resident-1.json']
@@ -0,0 +1,35 @@
+import json
+from context_compaction import compact_context
+
+ANALYSIS = {
+    "case_category": "Criminal",
+    "key_details": {"description": "Cheque of Rs 2 lakh bounced", "parties": ["complainant", "accused"]},
+    "primary_issues": ["dishonour of cheque", "recovery of money"],
+    "step_by_step_guidance": [
+        "Send a legal notice within 30 days of the bank memo",
+        "File a complaint before the magistrate",
+        "Collect the bank return memo as evidence"
+    ],
+    "recommended_next_steps": ["Consult a lawyer about the legal notice", "Keep copies of all documents"],
+    "legal_clauses": ["Section 138 Negotiable Instruments Act", "Section 142 Negotiable Instruments Act"],
+    "preliminary_risk_assessment": "Moderate risk; the legal position favours the complainant if notice was sent on time",
+    "case_duration": "6-12 months"
+}
+
+
+def kept_fields(question):
+    text, stats = compact_context(ANALYSIS, question, budget=10000)
+    assert list(json.loads(text)) == stats["fields"]
+    return stats["fields"]
+
+
+def test_unrelated_fields_are_dropped():
+    fields = kept_fields("Can you elaborate on the legal clauses?")
+    assert fields == ["case_category", "key_details", "legal_clauses"]
+
+    fields = kept_fields("clarify what is the duration")
+    assert fields == ["case_category", "key_details", "case_duration"]
+
+
+def test_question_without_a_match_keeps_every_field():
+    assert kept_fields("thank you") == list(ANALYSIS)
@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+from embedding_batcher import EmbeddingBatcher
+
+
+def test_batch_resolves_each_caller_with_its_row():
+    batcher = EmbeddingBatcher(lambda texts: np.array([[len(text)] for text in texts], dtype=np.float32),
+                               max_wait_ms=50)
+    futures = [batcher.submit('a' * n) for n in range(1, 5)]
+    assert [future.result(timeout=5)[0] for future in futures] == [1, 2, 3, 4]
+
+
+def test_short_encode_result_fails_every_caller():
+    # An encoder that drops a row must not leave any caller blocked
+    batcher = EmbeddingBatcher(lambda texts: np.zeros((len(texts) - 1, 4), dtype=np.float32), max_wait_ms=50)
+    futures = [batcher.submit(text) for text in ['one', 'two', 'three']]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
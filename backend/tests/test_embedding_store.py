@@ -0,0 +1,24 @@
+import os
+import json
+from embedding_store import EmbeddingStore
+
+
+def test_fingerprints_keep_only_latest_entry_per_path(tmp_path):
+    store = EmbeddingStore('hashing-encoder', cache_dir=str(tmp_path / 'embeddings'))
+    dataset = tmp_path / 'train.csv'
+    other = tmp_path / 'other.csv'
+    other.write_text('id\nx\n')
+    store.dataset_fingerprint(str(other))
+
+    for revision in range(3):
+        dataset.write_text(f'id\n{revision}\n')
+        os.utime(dataset, ns=(revision * 10**9, revision * 10**9))
+        latest = store.dataset_fingerprint(str(dataset))
+
+    with open(store.fingerprints_path) as f:
+        fingerprints = json.load(f)
+    entries = [key for key in fingerprints if key.startswith(str(dataset))]
+    assert len(entries) == 1
+    assert fingerprints[entries[0]] == latest
+    # Other datasets' entries are untouched
+    assert any(key.startswith(str(other)) for key in fingerprints)
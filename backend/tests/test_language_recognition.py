@@ -0,0 +1,60 @@
+import time
+import pytest
+from language_recognition import RECOGNITION_STRATEGY, MultiLanguageRecognizer
+
+LANGUAGES = ['en-IN', 'hi-IN', 'en-US']
+
+
+class ServiceDown(Exception):
+    pass
+
+
+def scripted(results):
+    """recognize() returning (or raising) a per-language result after a per-language delay"""
+    def recognize(audio, language):
+        delay, result = results[language]
+        time.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return recognize
+
+
+def test_default_strategy_is_confidence():
+    assert RECOGNITION_STRATEGY == 'confidence'
+
+
+def test_first_prefers_earlier_language_answering_within_window():
+    recognizer = MultiLanguageRecognizer(LANGUAGES, strategy='first', preference_window=1.0, workers=3)
+    # Google returns text for English audio under hi-IN too, and sometimes answers faster
+    recognize = scripted({
+        'en-IN': (0.2, ("file a complaint", None)),
+        'hi-IN': (0.0, ("फाइल अ कंप्लेंट", None)),
+        'en-US': (0.0, ("file a complaint", None)),
+    })
+    assert recognizer.recognize(recognize, b'') == ("file a complaint", 'en-IN')
+
+
+def test_first_does_not_wait_past_window():
+    recognizer = MultiLanguageRecognizer(LANGUAGES, strategy='first', preference_window=0.1, workers=3)
+    recognize = scripted({
+        'en-IN': (2.0, ("late", None)),
+        'hi-IN': (0.0, ("नमस्ते", None)),
+        'en-US': (0.0, ("", None)),
+    })
+    start = time.monotonic()
+    assert recognizer.recognize(recognize, b'') == ("नमस्ते", 'hi-IN')
+    assert time.monotonic() - start < 1.0
+
+
+@pytest.mark.parametrize('strategy', ['first', 'confidence'])
+def test_concurrent_stops_on_fatal_error(strategy):
+    recognizer = MultiLanguageRecognizer(LANGUAGES, strategy=strategy, workers=3)
+    recognize = scripted({
+        'en-IN': (0.0, ServiceDown("unreachable")),
+        'hi-IN': (2.0, ("", None)),
+        'en-US': (2.0, ("", None)),
+    })
+    start = time.monotonic()
+    assert recognizer.recognize(recognize, b'', fatal_errors=(ServiceDown,)) == (None, None)
+    assert time.monotonic() - start < 1.0
@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+import resilient_llm
+from llm_metrics import LLMMetrics
+from resilient_llm import ResilientLLM
+
+
+class FakeClient:
+    """Chat client whose calls take a scripted time per metrics_kind"""
+
+    def __init__(self, clock, seconds_by_model):
+        self.clock = clock
+        self.seconds_by_model = seconds_by_model
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, stream=False, **kwargs):
+        self.clock[0] += self.seconds_by_model[model]
+        if stream:
+            return iter([])
+        return SimpleNamespace(usage=None)
+
+
+def test_latency_samples_are_kept_per_kind(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(resilient_llm.time, 'monotonic', lambda: clock[0])
+    client = FakeClient(clock, {'fast': 1.0, 'slow': 30.0, 'stream': 0.5})
+    llm = ResilientLLM(client, timeout=60, metrics=LLMMetrics())
+
+    for _ in range(resilient_llm.LLM_HEDGE_MIN_SAMPLES):
+        llm.create(model='fast', metrics_kind='classify')
+        llm.create(model='slow', metrics_kind='analysis')
+        llm.create(model='stream', metrics_kind='classify', stream=True)
+
+    # The short calls' hedge delay is not pulled up by the long analyses,
+    # nor down by stream-open times
+    assert llm.hedge_delay('classify') == max(resilient_llm.LLM_HEDGE_MIN_DELAY_SECONDS, 1.0)
+    assert llm.hedge_delay('analysis') == 30.0
+    assert len(llm.latencies['classify']) == resilient_llm.LLM_HEDGE_MIN_SAMPLES
@@ -0,0 +1,77 @@
+import numpy as np
+from lexical_index import BM25Index
+from retrieval import PartitionedCaseRetriever
+
+
+def statute_corpus(rows=300, target=137):
+    rng = np.random.default_rng(0)
+    sections = [n for n in range(200, 600)]
+    texts = [
+        f"Section {sections[row % len(sections)]} IPC dispute between the parties over a property sale"
+        for row in range(rows)
+    ]
+    texts[target] = "Section 107 IPC abetment of suicide after harassment by in-laws"
+    categories = ['criminal' if row % 2 else 'civil' for row in range(rows)]
+    embeddings = rng.normal(size=(rows, 32)).astype(np.float32)
+    return texts, categories, embeddings
+
+
+def test_statute_number_query_returns_matching_case():
+    texts, categories, embeddings = statute_corpus()
+    retriever = PartitionedCaseRetriever(embeddings, categories, backend='exact')
+    retriever.lexical_index = BM25Index()
+    retriever.lexical_index.build(texts)
+
+    query = np.random.default_rng(1).normal(size=32).astype(np.float32)
+    # No dense match clears the threshold, so only the lexical channel can find the case
+    assert retriever.search(query, k=3, threshold=0.99) == []
+
+    results = retriever.search(query, k=3, threshold=0.99, query_text="Section 107")
+    # Cases sharing only "section" with the query are not fused in
+    assert [row for row, score in results] == [137]
+
+    results = retriever.search(query, category='criminal', k=3, threshold=0.99, query_text="Section 107")
+    assert [row for row, score in results] == [137]
+
+
+def test_partitions_search_the_global_matrix_in_place(tmp_path):
+    rng = np.random.default_rng(2)
+    embeddings = rng.normal(size=(400, 16)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    np.save(tmp_path / 'matrix.npy', embeddings)
+    matrix = np.load(tmp_path / 'matrix.npy', mmap_mode='r')
+    categories = [['civil', 'criminal', 'family'][row % 3] for row in range(400)]
+
+    retriever = PartitionedCaseRetriever(matrix, categories, backend='exact')
+    # No copies: the global matrix is a view of the memmap and partitions read through it
+    assert np.shares_memory(retriever.global_retriever.matrix, matrix)
+    for rows, partition in retriever.partitions.values():
+        assert partition.matrix.base is retriever.global_retriever.matrix
+
+    query = rng.normal(size=16).astype(np.float32)
+    query /= np.linalg.norm(query)
+    criminal = np.flatnonzero(np.array(categories) == 'criminal')
+    expected = criminal[np.argsort(-(embeddings[criminal] @ query))[:5]]
+    results = retriever.search(query, category='Criminal', k=5, threshold=-1.0)
+    assert [row for row, score in results] == expected.tolist()
+
+
+def test_partitions_scan_the_global_compact_copy():
+    rng = np.random.default_rng(3)
+    embeddings = rng.normal(size=(600, 32)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    categories = [['civil', 'criminal', 'family'][row % 3] for row in range(600)]
+
+    retriever = PartitionedCaseRetriever(embeddings, categories, backend='exact', storage='int8')
+    compressed = retriever.global_retriever.compressed
+    for rows, partition in retriever.partitions.values():
+        # No compact copy per partition, only its row mapping into the global one
+        assert partition.compressed.base is compressed
+        assert partition.compressed.nbytes == rows.nbytes
+
+    query = rng.normal(size=32).astype(np.float32)
+    query /= np.linalg.norm(query)
+    family = np.flatnonzero(np.array(categories) == 'family')
+    expected = family[np.argsort(-(embeddings[family] @ query))[:3]]
+    results = retriever.search(query, category='family', k=3, threshold=-1.0)
+    assert [row for row, score in results] == expected.tolist()
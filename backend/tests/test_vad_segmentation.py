@@ -0,0 +1,44 @@
+import numpy as np
+from vad_segmentation import FRAME_MS, split_on_silence
+
+SAMPLE_RATE = 16000
+
+
+def tone(seconds, amplitude=8000):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.int16)
+
+
+def durations(segments):
+    return [(end - start) / (SAMPLE_RATE * 2) for start, end in segments]
+
+
+def test_continuous_speech_leaves_no_tiny_trailing_chunk():
+    # Just over two max-length chunks with no silence to cut at
+    pcm = tone(30.09).tobytes()
+    segments = split_on_silence(pcm, SAMPLE_RATE, max_seconds=15, min_seconds=1.0)
+    assert len(segments) == 2
+    assert min(durations(segments)) >= 1.0
+    # The leftover frames are transcribed with the chunk before them, not dropped
+    assert len(pcm) - segments[-1][1] < SAMPLE_RATE * FRAME_MS // 1000 * 2
+
+
+def test_short_speech_burst_joins_previous_chunk():
+    pcm = np.concatenate([tone(10), silence(1), tone(0.3)]).tobytes()
+    segments = split_on_silence(pcm, SAMPLE_RATE, max_seconds=10.5, min_seconds=1.0)
+    assert len(segments) == 1
+
+
+def test_long_recording_is_split_into_at_most_max_segments():
+    pcm = np.concatenate([np.concatenate([tone(4), silence(0.5)]) for _ in range(30)]).tobytes()
+    segments = split_on_silence(pcm, SAMPLE_RATE, max_seconds=15, max_segments=4)
+    assert len(segments) == 4
+    # Chunks still end in silences, and together they cover all the speech
+    assert segments[0][0] == 0
+    assert segments[-1][1] >= len(tone(4)) * 2 * 29
+    for (_, end), (start, _) in zip(segments, segments[1:]):
+        assert end <= start
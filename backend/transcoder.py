@@ -0,0 +1,177 @@
+import os
+import re
+import time
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# ffmpeg processes allowed at once; further jobs wait in the queue
+TRANSCODER_WORKERS = int(os.environ.get('TRANSCODER_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Jobs allowed to wait for a worker; beyond this, requests are turned away
+TRANSCODER_QUEUE_SIZE = int(os.environ.get('TRANSCODER_QUEUE_SIZE', 16))
+
+# Seconds a request waits for a queue slot before giving up
+TRANSCODER_QUEUE_TIMEOUT_SECONDS = float(os.environ.get('TRANSCODER_QUEUE_TIMEOUT_SECONDS', 2))
+
+# Decoders worth reporting for browser and phone voice notes
+VOICE_NOTE_DECODERS = ('opus', 'libopus', 'vorbis', 'aac', 'mp3', 'amrnb', 'flac', 'pcm_s16le')
+
+_probe_lock = threading.Lock()
+_capabilities = None
+
+
+class TranscoderBusyError(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Too many audio conversions in progress; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def probe_ffmpeg(refresh=False):
+    """
+    Check once whether ffmpeg is installed and which voice-note decoders it has
+
+    Args:
+        refresh (bool): Probe again instead of returning the cached result
+
+    Returns:
+        dict: available, version and decoders (those of VOICE_NOTE_DECODERS present)
+    """
+    global _capabilities
+    with _probe_lock:
+        if _capabilities is not None and not refresh:
+            return _capabilities
+        capabilities = {"available": False, "version": None, "decoders": []}
+        try:
+            version = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True, check=True)
+            decoders = subprocess.run(['ffmpeg', '-hide_banner', '-decoders'], capture_output=True, text=True)
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            _capabilities = capabilities
+            return capabilities
+
+        match = re.match(r'ffmpeg version (\S+)', version.stdout)
+        # Decoder lines look like " A....D opus   Opus (Opus Interactive Audio Codec)"
+        names = {line.split()[1] for line in decoders.stdout.splitlines() if len(line.split()) > 1}
+        capabilities.update({
+            "available": True,
+            "version": match.group(1) if match else version.stdout.split('\n', 1)[0],
+            "decoders": [name for name in VOICE_NOTE_DECODERS if name in names]
+        })
+        _capabilities = capabilities
+        return capabilities
+
+
+class Transcoder:
+    def __init__(self, workers=TRANSCODER_WORKERS, queue_size=TRANSCODER_QUEUE_SIZE,
+                 queue_timeout=TRANSCODER_QUEUE_TIMEOUT_SECONDS):
+        """
+        Bounded pool running ffmpeg jobs
+
+        At most `workers` ffmpeg processes run at once and at most
+        `queue_size` more jobs wait for one. A job that cannot get a slot
+        within queue_timeout raises TranscoderBusyError, so a burst of
+        uploads is shed instead of forking an ffmpeg process per request.
+
+        Args:
+            workers (int): Concurrent ffmpeg processes
+            queue_size (int): Jobs allowed to wait for a worker
+            queue_timeout (float): Seconds to wait for a slot
+        """
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='transcoder')
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.run_time_total = 0.0
+
+    def run(self, cmd, input=None, timeout=None, text=False):
+        """
+        Run an ffmpeg command on the pool and wait for it
+
+        Args:
+            cmd (list): Command and arguments
+            input (bytes, optional): Data for the process's stdin
+            timeout (float, optional): Seconds the process may run
+            text (bool): Decode stdout and stderr as text
+
+        Returns:
+            subprocess.CompletedProcess: Result with captured output
+
+        Raises:
+            TranscoderBusyError: If no slot frees up within queue_timeout
+            subprocess.TimeoutExpired: If the process exceeds the timeout
+        """
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise TranscoderBusyError(max(1.0, self.queue_timeout))
+
+        submitted = time.monotonic()
+        with self._lock:
+            self.pending += 1
+
+        def job():
+            started = time.monotonic()
+            try:
+                return subprocess.run(cmd, input=input, capture_output=True, timeout=timeout, text=text)
+            finally:
+                with self._lock:
+                    self.queue_wait_total += started - submitted
+                    self.run_time_total += time.monotonic() - started
+
+        try:
+            result = self._executor.submit(job).result()
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.pending -= 1
+            self._slots.release()
+
+        with self._lock:
+            if result.returncode == 0:
+                self.completed += 1
+            else:
+                self.failed += 1
+        return result
+
+    def stats(self):
+        """
+        Pool limits, load and job counters
+
+        Returns:
+            dict: Counters with mean queue wait and run time in seconds
+        """
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "pending": self.pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "mean_queue_wait": round(self.queue_wait_total / finished, 3) if finished else None,
+                "mean_run_time": round(self.run_time_total / finished, 3) if finished else None
+            }
+
+
+_transcoder = None
+_transcoder_lock = threading.Lock()
+
+
+def get_transcoder():
+    """Process-wide transcoder pool, created on first use"""
+    global _transcoder
+    with _transcoder_lock:
+        if _transcoder is None:
+            _transcoder = Transcoder()
+        return _transcoder
@@ -0,0 +1,153 @@
+import os
+import re
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# Default bounds for the query embedding / retrieval caches
+QUERY_CACHE_SIZE = int(os.environ.get('QUERY_CACHE_SIZE', 2048))
+QUERY_CACHE_TTL_SECONDS = float(os.environ.get('QUERY_CACHE_TTL_SECONDS', 3600))
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """
+    Canonical form of a text for cache lookups
+
+    Applies Unicode NFC normalisation, lower-casing and whitespace collapsing,
+    so re-sends that differ only in spacing or case share an entry.
+
+    Args:
+        text (str): Input text
+
+    Returns:
+        str: Normalised text
+    """
+    text = unicodedata.normalize('NFC', str(text))
+    return _WHITESPACE.sub(' ', text).strip().lower()
+
+
+def text_cache_key(*parts):
+    """
+    Hash one or more values into a cache key
+
+    Args:
+        *parts: Values making up the key; strings are normalised first
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        value = normalize_text(part) if isinstance(part, str) else repr(part)
+        digest.update(value.encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()
+
+
+class TTLCache:
+    def __init__(self, max_size=QUERY_CACHE_SIZE, ttl_seconds=QUERY_CACHE_TTL_SECONDS):
+        """
+        Thread-safe LRU cache whose entries also expire after a TTL
+
+        Args:
+            max_size (int): Maximum number of entries kept
+            ttl_seconds (float): Lifetime of an entry; 0 or less disables expiry
+        """
+        self.max_size = max(1, int(max_size))
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """
+        Look up a key, refreshing its LRU position
+
+        Args:
+            key (str): Cache key
+            default: Returned on a miss
+
+        Returns:
+            Cached value or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """
+        Store a value, evicting the least recently used entry when full
+
+        Args:
+            key (str): Cache key
+            value: Value to cache
+        """
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute_fn):
+        """
+        Return the cached value for key, computing and storing it on a miss
+
+        Args:
+            key (str): Cache key
+            compute_fn (callable): Produces the value on a miss
+
+        Returns:
+            Cached or freshly computed value
+        """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute_fn()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Hit/miss counters
+
+        Returns:
+            dict: Counters and configuration
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
@@ -0,0 +1,180 @@
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import webrtcvad
+except ImportError:
+    webrtcvad = None
+
+# Recordings shorter than this are transcribed in one piece
+SEGMENT_MIN_RECORDING_SECONDS = float(os.environ.get('SEGMENT_MIN_RECORDING_SECONDS', 20))
+
+# Upper bound on a chunk sent to a recognizer; chunks are cut at silences below it
+SEGMENT_MAX_SECONDS = float(os.environ.get('SEGMENT_MAX_SECONDS', 15))
+
+# Chunks shorter than this (e.g. a few frames left over after a cut) join the previous chunk
+SEGMENT_MIN_SECONDS = float(os.environ.get('SEGMENT_MIN_SECONDS', 1.0))
+
+# Silence long enough to cut at, and speech context kept on each side of a chunk
+SEGMENT_MIN_SILENCE_MS = int(os.environ.get('SEGMENT_MIN_SILENCE_MS', 300))
+SEGMENT_PADDING_MS = int(os.environ.get('SEGMENT_PADDING_MS', 150))
+
+# webrtcvad aggressiveness (0-3), used when the package is installed
+VAD_AGGRESSIVENESS = int(os.environ.get('VAD_AGGRESSIVENESS', 2))
+
+# Energy detector: speech is this many dB above the recording's noise floor
+VAD_ENERGY_MARGIN_DB = float(os.environ.get('VAD_ENERGY_MARGIN_DB', 12))
+VAD_ENERGY_FLOOR_DBFS = -55.0
+
+# Chunks transcribed at once, and the most chunks a recording is split into: every chunk
+# runs in the same round, so latency is that of the slowest chunk. Recordings longer than
+# SEGMENT_WORKERS x SEGMENT_MAX_SECONDS (2 minutes by default) get longer chunks instead
+# of more rounds. language_recognition sizes its thread pool from this fan-out.
+SEGMENT_WORKERS = max(1, int(os.environ.get('SEGMENT_WORKERS', 8)))
+
+# webrtcvad accepts 10, 20 or 30 ms frames
+FRAME_MS = 30
+
+_executor = ThreadPoolExecutor(max_workers=SEGMENT_WORKERS, thread_name_prefix='segments')
+
+
+def speech_frames(pcm, sample_rate, frame_ms=FRAME_MS):
+    """
+    Voice activity per frame
+
+    Uses webrtcvad when it is installed and the sample rate is supported,
+    otherwise frames louder than the noise floor by VAD_ENERGY_MARGIN_DB.
+
+    Args:
+        pcm (bytes): Signed 16-bit mono PCM
+        sample_rate (int): Sample rate of the PCM
+        frame_ms (int): Frame length in milliseconds
+
+    Returns:
+        numpy.ndarray: Boolean per whole frame, True where there is speech
+    """
+    frame_samples = sample_rate * frame_ms // 1000
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    n_frames = len(samples) // frame_samples
+    if n_frames == 0:
+        return np.zeros(0, dtype=bool)
+
+    if webrtcvad is not None and sample_rate in (8000, 16000, 32000, 48000):
+        vad = webrtcvad.Vad(VAD_AGGRESSIVENESS)
+        frame_bytes = frame_samples * 2
+        return np.array([
+            vad.is_speech(pcm[i * frame_bytes:(i + 1) * frame_bytes], sample_rate)
+            for i in range(n_frames)
+        ], dtype=bool)
+
+    frames = samples[:n_frames * frame_samples].reshape(n_frames, frame_samples).astype(np.float32)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1)) / 32768.0
+    level = 20 * np.log10(rms + 1e-10)
+    noise_floor, peak = np.percentile(level, [5, 95])
+    # Mostly-speech recordings have a high "floor"; never ask for more than halfway to the peak
+    threshold = max(min(noise_floor + VAD_ENERGY_MARGIN_DB, (noise_floor + peak) / 2), VAD_ENERGY_FLOOR_DBFS)
+    return level > threshold
+
+
+def split_on_silence(pcm, sample_rate, max_seconds=SEGMENT_MAX_SECONDS,
+                     min_silence_ms=SEGMENT_MIN_SILENCE_MS, padding_ms=SEGMENT_PADDING_MS,
+                     max_segments=SEGMENT_WORKERS, min_seconds=SEGMENT_MIN_SECONDS):
+    """
+    Byte ranges of speech chunks no longer than max_seconds, cut in silences
+
+    Each chunk ends at the middle of the last long-enough silence that keeps
+    it under max_seconds; speech with no such silence is cut at the limit.
+    Leading, trailing and between-chunk silence is dropped. A chunk shorter
+    than min_seconds joins the one before it (the first joins the next). Recordings that would need more
+    than max_segments chunks get a proportionally longer limit, and if the
+    silences still yield too many, the shortest neighbouring chunks are joined.
+
+    Args:
+        pcm (bytes): Signed 16-bit mono PCM
+        sample_rate (int): Sample rate of the PCM
+        max_seconds (float): Longest chunk, unless the recording needs more than max_segments
+        min_silence_ms (int): Shortest silence to cut at
+        padding_ms (int): Audio kept around the speech at each end of a chunk
+        max_segments (int): Most chunks to return
+        min_seconds (float): Shortest chunk kept on its own
+
+    Returns:
+        list: (start, end) byte offsets into pcm, in order
+    """
+    flags = speech_frames(pcm, sample_rate)
+    speech = np.flatnonzero(flags)
+    if len(speech) == 0:
+        return []
+
+    max_segments = max(1, max_segments)
+    max_frames = max(1, int(max_seconds * 1000 // FRAME_MS), -(-len(flags) // max_segments))
+    min_frames = int(min_seconds * 1000 // FRAME_MS)
+    min_silence = max(1, min_silence_ms // FRAME_MS)
+    padding = padding_ms // FRAME_MS
+
+    # Cut points: the middle of every silence of at least min_silence frames between speech
+    gaps = np.diff(speech)
+    long_gaps = np.flatnonzero(gaps > min_silence)
+    cuts = (speech[long_gaps] + speech[long_gaps + 1] + 1) // 2
+
+    segments = []
+    start = max(0, speech[0] - padding)
+    last = speech[-1] + 1 + padding
+    while start < last:
+        limit = start + max_frames
+        if last <= limit:
+            end = last
+        else:
+            candidates = cuts[(cuts > start) & (cuts <= limit)]
+            end = int(candidates[-1]) if len(candidates) else limit
+        segments.append((start, min(end, len(flags))))
+
+        following = speech[speech >= end]
+        if len(following) == 0:
+            break
+        start = max(end, following[0] - padding)
+
+    merged = []
+    for segment in segments:
+        if merged and segment[1] - segment[0] < min_frames:
+            merged[-1] = (merged[-1][0], segment[1])
+        else:
+            merged.append(segment)
+    if len(merged) > 1 and merged[0][1] - merged[0][0] < min_frames:
+        merged[:2] = [(merged[0][0], merged[1][1])]
+    segments = merged
+    while len(segments) > max_segments:
+        # Join the neighbouring pair that makes the shortest chunk
+        i = min(range(len(segments) - 1), key=lambda i: segments[i + 1][1] - segments[i][0])
+        segments[i:i + 2] = [(segments[i][0], segments[i + 1][1])]
+
+    frame_bytes = sample_rate * FRAME_MS // 1000 * 2
+    return [(int(start) * frame_bytes, int(end) * frame_bytes) for start, end in segments]
+
+
+def transcribe_segments(pcm, segments, transcribe):
+    """
+    Transcribe chunks in parallel and return their results in order
+
+    split_on_silence returns at most SEGMENT_WORKERS chunks, so they all
+    run at once and the wait is that of the slowest transcribe call. A
+    failed chunk yields None, so the rest of the text survives.
+
+    Args:
+        pcm (bytes): Signed 16-bit mono PCM
+        segments (list): (start, end) byte offsets from split_on_silence
+        transcribe (callable): PCM chunk -> result
+
+    Returns:
+        list: Result (or None) per segment
+    """
+    futures = [_executor.submit(transcribe, pcm[start:end]) for start, end in segments]
+    results = []
+    for i, future in enumerate(futures):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            print(f"Transcription of segment {i + 1}/{len(segments)} failed: {e}")
+            results.append(None)
+    return results